@@ -1,6 +1,7 @@
 import gradio as gr
 import os
-from typing import Generator, Tuple
+import time
+from typing import Generator, Optional, Tuple
 
 from utils import (
     SwarmClient,
@@ -11,7 +12,34 @@ from utils import (
     APIError,
     ConfigurationError,
 )
-from utils.validation import validate_task, validate_temperature, validate_max_tokens
+from utils.compare import format_comparison_report, format_comparison_table, stream_comparison
+from utils.compression import compress_and_record
+from utils.config import ConfigWatcher
+from utils.credentials import CredentialPool
+from utils.export import save_export
+from utils.limiter import AdaptiveLimiters
+from utils.mapreduce import run_map_reduce
+from utils.metrics import SwarmMetrics
+from utils.preflight import Preflight
+from utils.preview import DRAFT_CLOSE_TIMEOUT_S, stream_with_preview
+from utils.session import SwarmSession, SwarmSessions
+from utils.streaming import (
+    AgentSections,
+    BufferStats,
+    CoalesceStats,
+    buffered_stream,
+    coalesce_stream,
+    expand_section,
+)
+from utils.tracing import RequestProfiler, RequestTrace
+from utils.usage import TokenUsage, UsageLedger
+from utils.validation import (
+    validate_compare_models,
+    validate_document,
+    validate_max_tokens,
+    validate_task,
+    validate_temperature,
+)
 
 
 def run_swarm(
@@ -19,25 +47,342 @@ def run_swarm(
     model: str,
     temperature: float,
     max_tokens: int,
+    preview: Optional[bool] = None,
+    request: gr.Request = None,
 ) -> Generator[str, None, None]:
     """
     Execute a swarm task and stream the response.
     
+    Every call is traced with a request-scoped ID, and a sampled fraction of
+    calls is profiled (see SWARM_TRACE_FILE and SWARM_PROFILE_SAMPLE_RATE).
+    
     Args:
         task: The user's task description.
         model: The model identifier to use.
         temperature: Sampling temperature (0.0-2.0).
         max_tokens: Maximum tokens to generate.
+        preview: Stream a fast draft from the preview model until the selected
+            model starts responding. Defaults to SWARM_PREVIEW.
+        request: The Gradio request (injected by Gradio); its session is
+            charged for token usage and checked against the session budget.
         
     Yields:
         Response chunks as strings.
     """
+    yield from _traced_swarm(task, model, temperature, max_tokens, preview, _session_id(request))
+
+
+def run_swarm_turn(
+    task: str,
+    history: Optional[list],
+    session_id: Optional[str],
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    preview: Optional[bool] = None,
+    request: gr.Request = None,
+) -> Generator[Tuple[list, str], None, None]:
+    """
+    Execute one turn of a multi-turn swarm session and stream the chat.
+    
+    Recent turns are sent to the model as messages and older ones as a rolling
+    summary (see SWARM_SESSION_WINDOW_TURNS), so follow-ups can refine earlier
+    output without re-pasting context.
+    
+    Each agent's section is shown as its own chat message (see
+    SWARM_SPLIT_AGENTS), so an update re-renders only the active agent.
+    
+    Args:
+        task: The user's task or follow-up request.
+        history: The chatbot history as [user_message, bot_message] pairs.
+        session_id: The session held in gr.State (None starts a new session).
+        model: The model identifier to use.
+        temperature: Sampling temperature (0.0-2.0).
+        max_tokens: Maximum tokens to generate.
+        preview: Stream a fast draft from the preview model. Defaults to SWARM_PREVIEW.
+        request: The Gradio request (injected by Gradio) used for budgets.
+        
+    Yields:
+        Tuples of (chat_history, session_id).
+    """
+    session_id = session_id or SwarmSessions.new_session_id()
+    history = list(history or [])
+    sections = AgentSections(collapse=SwarmConfig.get_collapse_agents()) if SwarmConfig.get_split_agents() else None
+    # Held for the whole turn so the session is not spilled to disk mid-request
+    with SwarmSessions.use(session_id) as session:
+        for chunk in _traced_swarm(
+            task,
+            model,
+            temperature,
+            max_tokens,
+            preview,
+            _session_id(request) or session_id,
+            session=session,
+        ):
+            if sections is None:
+                SwarmMetrics.increment("chat.updated_chars", len(chunk))
+                yield history + [[task, chunk]], session_id
+                continue
+            messages = sections.update(chunk)
+            SwarmMetrics.increment("chat.updated_chars", len(messages[-1]))
+            yield history + [[task, messages[0]]] + [[None, message] for message in messages[1:]], session_id
+
+
+def _traced_swarm(
+    task: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    preview: Optional[bool],
+    budget_session_id: Optional[str],
+    session: Optional[SwarmSession] = None,
+) -> Generator[str, None, None]:
+    """Run a swarm under a request trace, profiling the request if it is sampled."""
+    trace = RequestTrace("run_swarm", model=model)
+    profiler = RequestProfiler.maybe_start(trace.request_id)
+    try:
+        stream = _run_swarm(task, model, temperature, max_tokens, preview, trace, budget_session_id, session, profiler)
+        yield from profiler.profile_steps(stream) if profiler is not None else stream
+    finally:
+        try:
+            if profiler is not None:
+                profiler.stop()
+        finally:
+            trace.finish()
+
+
+def _run_swarm(
+    task: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    preview: Optional[bool],
+    trace: RequestTrace,
+    session_id: Optional[str] = None,
+    session: Optional[SwarmSession] = None,
+    profiler: Optional[RequestProfiler] = None,
+) -> Generator[str, None, None]:
+    """Body of run_swarm, with each stage recorded as a span on trace (and profiler's threads profiled)."""
     # Validate inputs
+    with trace.span("validate"):
+        is_valid, error_msg = validate_task(task)
+        if not is_valid:
+            yield f"❌ {error_msg}"
+            return
+        
+        is_valid, error_msg = validate_temperature(temperature)
+        if not is_valid:
+            yield f"❌ {error_msg}"
+            return
+        
+        is_valid, error_msg = validate_max_tokens(max_tokens)
+        if not is_valid:
+            yield f"❌ {error_msg}"
+            return
+    
+    # Validate token (and fail fast if the startup preflight rejected it)
+    with trace.span("validate_token"):
+        is_valid, error_msg = SwarmConfig.validate_token(model)
+        if is_valid and SwarmConfig.is_hf_model(model) and Preflight.token_error():
+            is_valid, error_msg = False, f"HF_TOKEN was rejected by Hugging Face: {Preflight.token_error()}"
+    if not is_valid:
+        yield f"❌ Error: {error_msg}"
+        SwarmLogger.log_error("ConfigurationError", error_msg, task)
+        return
+    
+    # Enforce session and daily budgets (rejecting, or downgrading the model)
+    with trace.span("budget"):
+        allowed, model, budget_msg = UsageLedger.check_budget(model, session_id)
+    if not allowed:
+        yield f"❌ {budget_msg}"
+        SwarmLogger.log_error("BudgetExceeded", budget_msg, task)
+        return
+    if budget_msg:
+        yield f"💸 {budget_msg}\n\n"
+    
+    if preview is None:
+        preview = SwarmConfig.get_preview_enabled()
+    preview_model = SwarmConfig.get_preview_model()
+    
+    # Initialize client with selected model (and the draft model for previews)
+    draft_client = None
+    try:
+        with trace.span("client_init", preview=bool(preview)):
+            pool = CredentialPool.shared()
+            swarm_client = SwarmClient(model=model, token=SwarmConfig.get_token(), trace=trace, pool=pool)
+            if preview and preview_model != model:
+                draft_client = SwarmClient(model=preview_model, token=SwarmConfig.get_token(), trace=trace, pool=pool)
+    except Exception as e:
+        error_msg = f"Failed to initialize client: {str(e)}"
+        yield f"❌ {error_msg}"
+        SwarmLogger.log_error("ConfigurationError", error_msg, task)
+        return
+    
+    # Optionally compress long inputs before they are inlined into the prompt
+    prompt_task = task
+    if SwarmConfig.get_compress_input():
+        summary_client = swarm_client if SwarmConfig.get_summarize_input() else None
+        if summary_client is not None:
+            yield "🗜️ Compressing input...\n\n"
+        with trace.span("compress"):
+            compression = compress_and_record(task, summary_client)
+        prompt_task = compression.text
+    
+    # Fold turns that left the session window into its rolling summary
+    if session is not None and session.needs_compaction:
+        yield "🧠 Summarizing earlier turns...\n\n"
+        with trace.span("summarize_session"):
+            session.compact(swarm_client)
+    
+    # Build prompt (or the conversation for a multi-turn session) and log
+    messages = None
+    with trace.span("build_prompt"):
+        if session is not None:
+            messages = session.build_messages(prompt_task)
+            full_prompt = messages[-1]["content"]
+        else:
+            full_prompt = build_swarm_prompt(prompt_task)
+    SwarmLogger.log_swarm_start(task, model)
+    
+    yield "🚀 Deploying Builder Swarm...\n\n"
+    
+    flush_interval_ms = SwarmConfig.get_ui_flush_interval_ms()
+    flush_chars = SwarmConfig.get_ui_flush_chars()
+    buffer_size = SwarmConfig.get_stream_buffer_size()
+    coalesce_stats = CoalesceStats()
+    buffer_stats = BufferStats()
+    stream_span = trace.start_span("ttft")
+    last_chunk = ""
+    # The upstream streams run on producer and pump threads, which the profiler must follow
+    step_hook = profiler.profile_steps if profiler is not None else None
+    started = time.perf_counter()
+    try:
+        first_content_s = None
+        if draft_client is not None:
+            for chunk, is_draft in coalesce_stream(
+                buffered_stream(
+                    stream_with_preview(
+                        swarm_client,
+                        draft_client,
+                        full_prompt,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        messages=messages,
+                        step_hook=step_hook,
+                    ),
+                    buffer_size,
+                    stats=buffer_stats,
+                    name="preview",
+                    step_hook=step_hook,
+                ),
+                flush_interval_ms,
+                flush_chars,
+                stats=coalesce_stats,
+                size=lambda item: len(item[0]),
+            ):
+                if first_content_s is None:
+                    first_content_s = time.perf_counter() - started
+                    stream_span.end()
+                    stream_span = trace.start_span("stream")
+                if is_draft:
+                    yield f"⚡ Draft preview ({draft_client.model}) while {model} warms up...\n\n{chunk}"
+                else:
+                    last_chunk = chunk
+                    yield chunk
+        else:
+            if messages is not None:
+                stream = swarm_client.stream_chat_response(messages, max_tokens=max_tokens, temperature=temperature)
+            else:
+                stream = swarm_client.stream_swarm_response(
+                    full_prompt,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                )
+            for chunk in coalesce_stream(
+                buffered_stream(stream, buffer_size, stats=buffer_stats, step_hook=step_hook),
+                flush_interval_ms,
+                flush_chars,
+                stats=coalesce_stats,
+            ):
+                if first_content_s is None:
+                    first_content_s = time.perf_counter() - started
+                    stream_span.end()
+                    stream_span = trace.start_span("stream")
+                last_chunk = chunk  # Track the last chunk (which contains the full accumulated response)
+                yield chunk
+        stream_span.set(ui_messages=coalesce_stats.emitted, chars=len(last_chunk))
+        stream_span.end()
+        
+        with trace.span("log"):
+            if first_content_s is not None:
+                SwarmMetrics.observe(
+                    "swarm.first_content_seconds",
+                    first_content_s,
+                    labels={"preview": "on" if draft_client is not None else "off"},
+                )
+            
+            _record_coalescing(coalesce_stats)
+            _record_buffering(buffer_stats)
+            
+            # Log the total response length using the final accumulated chunk
+            SwarmLogger.log_swarm_complete(task, len(last_chunk))
+            
+            if session is not None:
+                session.add_turn(prompt_task, last_chunk)
+        
+    except APIError as e:
+        error_msg = f"API error: {str(e)}"
+        yield f"❌ {error_msg}\n\nPlease check your HF_TOKEN and model access."
+        SwarmLogger.log_error("APIError", error_msg, task)
+    except Exception as e:
+        error_msg = f"Unexpected error: {str(e)}"
+        yield f"❌ {error_msg}\n\nPlease check your configuration and try again."
+        SwarmLogger.log_error("UnexpectedError", error_msg, task)
+    finally:
+        elapsed_s = time.perf_counter() - started
+        _record_usage(swarm_client, model, session_id, full_prompt, last_chunk, elapsed_s)
+        if draft_client is not None:
+            # The draft may still be streaming on its own thread; stop it and let it record its usage first
+            draft_client.cancel()
+            draft_client.wait_idle(DRAFT_CLOSE_TIMEOUT_S)
+            _record_usage(draft_client, draft_client.model, session_id, full_prompt, "", elapsed_s)
+
+
+def run_document_swarm(
+    task: str,
+    document: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    request: gr.Request = None,
+) -> Generator[str, None, None]:
+    """
+    Execute a swarm over a large document using map-reduce and stream progress.
+    
+    Re-running the same task and document after a partial failure resumes from
+    the completed sections stored in the checkpoint directory.
+    
+    Args:
+        task: The user's task description.
+        document: The large document to analyze.
+        model: The model identifier to use.
+        temperature: Sampling temperature (0.0-2.0).
+        max_tokens: Maximum tokens for the final synthesis.
+        request: The Gradio request (injected by Gradio) used for session budgets.
+        
+    Yields:
+        Accumulated progress and response text.
+    """
     is_valid, error_msg = validate_task(task)
     if not is_valid:
         yield f"❌ {error_msg}"
         return
     
+    is_valid, error_msg = validate_document(document, SwarmConfig.get_max_document_chars())
+    if not is_valid:
+        yield f"❌ {error_msg}"
+        return
+    
     is_valid, error_msg = validate_temperature(temperature)
     if not is_valid:
         yield f"❌ {error_msg}"
@@ -48,57 +393,250 @@ def run_swarm(
         yield f"❌ {error_msg}"
         return
     
-    # Validate token
-    is_valid, error_msg = SwarmConfig.validate_token()
+    is_valid, error_msg = SwarmConfig.validate_token(model)
     if not is_valid:
         yield f"❌ Error: {error_msg}"
         SwarmLogger.log_error("ConfigurationError", error_msg, task)
         return
     
-    # Initialize client with selected model
+    session_id = _session_id(request)
+    allowed, model, budget_msg = UsageLedger.check_budget(model, session_id)
+    if not allowed:
+        yield f"❌ {budget_msg}"
+        SwarmLogger.log_error("BudgetExceeded", budget_msg, task)
+        return
+    
     try:
-        swarm_client = SwarmClient(model=model, token=SwarmConfig.get_token())
+        swarm_client = SwarmClient(model=model, token=SwarmConfig.get_token(), pool=CredentialPool.shared())
     except Exception as e:
         error_msg = f"Failed to initialize client: {str(e)}"
         yield f"❌ {error_msg}"
         SwarmLogger.log_error("ConfigurationError", error_msg, task)
         return
     
-    # Build prompt and log
-    full_prompt = build_swarm_prompt(task)
     SwarmLogger.log_swarm_start(task, model)
     
-    yield "🚀 Deploying Builder Swarm...\n\n"
-    
+    last_chunk = ""
+    coalesce_stats = CoalesceStats()
+    buffer_stats = BufferStats()
+    started = time.perf_counter()
     try:
-        last_chunk = ""
-        for chunk in swarm_client.stream_swarm_response(
-            full_prompt,
-            max_tokens=max_tokens,
-            temperature=temperature,
+        for chunk in coalesce_stream(
+            buffered_stream(
+                run_map_reduce(
+                    task,
+                    document,
+                    swarm_client,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    chunk_chars=SwarmConfig.get_mapreduce_chunk_chars(),
+                    overlap_chars=SwarmConfig.get_mapreduce_overlap_chars(),
+                    max_workers=SwarmConfig.get_mapreduce_max_workers(),
+                    fan_in=SwarmConfig.get_mapreduce_fan_in(),
+                    checkpoint_dir=SwarmConfig.get_checkpoint_dir(),
+                    checkpoint_ttl_s=SwarmConfig.get_checkpoint_ttl_seconds(),
+                ),
+                SwarmConfig.get_stream_buffer_size(),
+                stats=buffer_stats,
+                name="mapreduce",
+            ),
+            SwarmConfig.get_ui_flush_interval_ms(),
+            SwarmConfig.get_ui_flush_chars(),
+            stats=coalesce_stats,
         ):
-            last_chunk = chunk  # Track the last chunk (which contains the full accumulated response)
+            last_chunk = chunk
             yield chunk
         
-        # Log the total response length using the final accumulated chunk
+        _record_coalescing(coalesce_stats)
+        _record_buffering(buffer_stats)
         SwarmLogger.log_swarm_complete(task, len(last_chunk))
         
     except APIError as e:
         error_msg = f"API error: {str(e)}"
-        yield f"❌ {error_msg}\n\nPlease check your HF_TOKEN and model access."
+        yield f"{last_chunk}\n\n❌ {error_msg}\n\nCompleted sections are saved; deploy again to resume."
         SwarmLogger.log_error("APIError", error_msg, task)
     except Exception as e:
         error_msg = f"Unexpected error: {str(e)}"
         yield f"❌ {error_msg}\n\nPlease check your configuration and try again."
         SwarmLogger.log_error("UnexpectedError", error_msg, task)
+    finally:
+        _record_usage(swarm_client, model, session_id, document, last_chunk, time.perf_counter() - started)
+
+
+def run_comparison(
+    task: str,
+    models: list[str],
+    temperature: float,
+    max_tokens: int,
+    save_report: bool = False,
+    request: gr.Request = None,
+) -> Generator[tuple, None, None]:
+    """
+    Run one task on several models concurrently and stream them side by side.
+    
+    Args:
+        task: The user's task description.
+        models: The models to compare (2 to SwarmConfig.MAX_COMPARE_MODELS).
+        temperature: Sampling temperature (0.0-2.0).
+        max_tokens: Maximum tokens to generate per model.
+        save_report: Whether to write the finished comparison to a report file.
+        request: The Gradio request (injected by Gradio) used for session budgets.
+        
+    Yields:
+        Tuples of (stats_table, pane_1, ..., pane_N, report_path), with one
+        pane per selectable model; report_path is None until the report is written.
+    """
+    empty_panes = ("",) * SwarmConfig.MAX_COMPARE_MODELS
+    models = list(models or [])
+    
+    for is_valid, error_msg in (
+        validate_task(task),
+        validate_compare_models(models, SwarmConfig.get_available_models(), SwarmConfig.MAX_COMPARE_MODELS),
+        validate_temperature(temperature),
+        validate_max_tokens(max_tokens),
+    ):
+        if not is_valid:
+            yield (f"❌ {error_msg}", *empty_panes, None)
+            return
+    
+    for model in models:
+        is_valid, error_msg = SwarmConfig.validate_token(model)
+        if not is_valid:
+            yield (f"❌ Error: {error_msg}", *empty_panes, None)
+            SwarmLogger.log_error("ConfigurationError", error_msg, task)
+            return
+    
+    # A downgraded model would defeat the comparison, so any used-up budget rejects
+    session_id = _session_id(request)
+    for model in models:
+        allowed, budget_model, budget_msg = UsageLedger.check_budget(model, session_id)
+        if not allowed or budget_model != model:
+            yield (f"❌ {budget_msg}", *empty_panes, None)
+            SwarmLogger.log_error("BudgetExceeded", budget_msg, task)
+            return
+    
+    try:
+        pool = CredentialPool.shared()
+        clients = {model: SwarmClient(model=model, token=SwarmConfig.get_token(), pool=pool) for model in models}
+    except Exception as e:
+        error_msg = f"Failed to initialize client: {str(e)}"
+        yield (f"❌ {error_msg}", *empty_panes, None)
+        SwarmLogger.log_error("ConfigurationError", error_msg, task)
+        return
+    
+    SwarmLogger.log_swarm_start(task, ", ".join(models))
+    prompt = build_swarm_prompt(task)
+    started = time.perf_counter()
+    runs = []
+    updates = coalesce_stream(
+        stream_comparison(clients, prompt, max_tokens=max_tokens, temperature=temperature),
+        SwarmConfig.get_ui_flush_interval_ms(),
+        SwarmConfig.get_ui_flush_chars(),
+        size=lambda runs: sum(len(run.text) for run in runs),
+    )
+    try:
+        for runs in updates:
+            yield (*_comparison_panes(runs, time.perf_counter() - started), None)
+        
+        report_path = None
+        panes = _comparison_panes(runs, time.perf_counter() - started)
+        if save_report:
+            report = format_comparison_report(task, runs, {"Temperature": temperature, "Max Tokens": max_tokens})
+            try:
+                report_path = save_export(report, prefix="swarmmaster_compare_")
+            except OSError as e:
+                error_msg = f"Could not save the comparison report: {str(e)}"
+                SwarmLogger.log_error("ExportError", error_msg, task)
+                panes = (f"{panes[0]}\n\n❌ {error_msg}", *panes[1:])
+        yield (*panes, report_path)
+        SwarmLogger.log_swarm_complete(task, sum(len(run.text) for run in runs))
+    finally:
+        # Closing cancels the unfinished models and waits for their streams, so their usage is final
+        updates.close()
+        for run in runs:
+            _record_usage(clients[run.model], run.model, session_id, prompt, run.text, run.total_s or 0.0)
+
+
+def _comparison_panes(runs: list, now_s: float) -> tuple:
+    """Render the stats table and one Markdown pane per model (unused panes are empty)."""
+    panes = []
+    for run in runs:
+        body = run.text or ("" if run.done else "⏳ Waiting for the first token...")
+        if run.error:
+            body = f"{body}\n\n❌ {run.error}".strip()
+        panes.append(f"### {run.model}\n\n{body}")
+    panes.extend([""] * (SwarmConfig.MAX_COMPARE_MODELS - len(panes)))
+    return (format_comparison_table(runs, now_s), *panes)
+
 
+def _session_id(request) -> Optional[str]:
+    """Get the Gradio session ID used for per-session usage and budgets."""
+    session_hash = getattr(request, "session_hash", None)
+    return session_hash if isinstance(session_hash, str) else None
 
-def clear_chat() -> Tuple[list, str]:
-    """Clear the chatbot and reset the task input."""
-    return [], ""
 
+def _record_usage(
+    client,
+    model: str,
+    session_id: Optional[str],
+    prompt: str,
+    response: str,
+    elapsed_s: float,
+) -> None:
+    """Charge a client's token usage (estimated from text if it tracks none) to the ledger."""
+    usage = getattr(client, "usage", None)
+    if not isinstance(usage, TokenUsage):
+        usage = TokenUsage.estimate(prompt, response)
+    if usage.total_tokens:
+        UsageLedger.record(model, usage, session_id, elapsed_s)
+
+
+def _record_coalescing(stats: CoalesceStats) -> None:
+    """Publish how many UI updates were saved by stream coalescing."""
+    SwarmMetrics.increment("ui.chunks_received", stats.received)
+    SwarmMetrics.increment("ui.messages_emitted", stats.emitted)
+    SwarmMetrics.increment("ui.messages_saved", stats.received - stats.emitted)
+    SwarmMetrics.observe("ui.coalesce_reduction", stats.reduction)
+
+
+def _record_buffering(stats: BufferStats) -> None:
+    """Publish how far the upstream reader got ahead of the consumer."""
+    SwarmMetrics.observe("stream.buffer_high_water", stats.high_water)
+    SwarmMetrics.set_gauge("stream.buffer_high_water_last", stats.high_water)
+    SwarmMetrics.increment("stream.frames_received", stats.received)
+    SwarmMetrics.increment("stream.frames_dropped", stats.dropped)
+
+
+def refresh_model_choices():
+    """Update the model dropdown with availability and latency from the preflight."""
+    return gr.update(
+        choices=Preflight.model_choices(
+            SwarmConfig.get_available_models(),
+            SwarmConfig.get_preflight_slow_seconds(),
+        )
+    )
+
+
+def get_metrics() -> dict:
+    """Get a snapshot of in-process metrics, credential usage and token spend for the metrics panel."""
+    pool = CredentialPool.shared()
+    return {
+        **SwarmMetrics.snapshot(),
+        "credentials": pool.stats() if pool else [],
+        "usage": UsageLedger.summary(),
+        "config": SwarmConfig.current().summary(),
+        "sessions": SwarmSessions.stats(),
+        "limiters": AdaptiveLimiters.stats(),
+    }
 
-def export_results(chatbot_history: list, task: str, model: str) -> str:
+
+def clear_chat(session_id: Optional[str] = None) -> Tuple[list, str, None]:
+    """Clear the chatbot, reset the task input and start a new session."""
+    SwarmSessions.discard(session_id)
+    return [], "", None
+
+
+def export_results(chatbot_history: list, task: str, model: str) -> Optional[str]:
     """
     Export swarm results to a downloadable text file.
     
@@ -108,19 +646,21 @@ def export_results(chatbot_history: list, task: str, model: str) -> str:
         model: The model used.
         
     Returns:
-        Path to the exported file.
+        Path to the exported file, or None if it could not be written.
     """
-    import tempfile
-    from utils.export import format_export_content, export_to_file
+    from utils.export import format_export_content
     
     # Extract the last response from chatbot history
     response = ""
     if chatbot_history:
-        # Chatbot history is typically [(user_msg, bot_msg), ...]
-        # Get the last bot response
+        # Chatbot history is [user_msg, bot_msg] pairs; a response split into
+        # agent messages continues with [None, bot_msg] pairs
         for entry in chatbot_history:
-            if isinstance(entry, tuple) and len(entry) == 2:
-                response = entry[1] if entry[1] else response
+            if isinstance(entry, (tuple, list)) and len(entry) == 2:
+                if entry[0] is not None:
+                    response = expand_section(entry[1]) if entry[1] else response
+                elif entry[1]:
+                    response += expand_section(entry[1])
             elif isinstance(entry, str):
                 response = entry
     
@@ -133,14 +673,13 @@ def export_results(chatbot_history: list, task: str, model: str) -> str:
     }
     
     content = format_export_content(task, response, model, metadata)
-    filename = export_to_file(content)
     
-    # Create temporary file
-    temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, prefix='swarmmaster_')
-    temp_file.write(content)
-    temp_file.close()
-    
-    return temp_file.name
+    # Written to the managed export directory, which prunes earlier exports
+    try:
+        return save_export(content)
+    except OSError as e:
+        SwarmLogger.log_error("ExportError", f"Could not export results: {str(e)}", task)
+        return None
 
 
 with gr.Blocks(theme=gr.themes.Dark()) as demo:
@@ -150,6 +689,9 @@ with gr.Blocks(theme=gr.themes.Dark()) as demo:
         "Configure your swarm below, then enter a task to deploy specialized agents."
     )
     
+    # Multi-turn session ID for this browser tab (None until the first turn)
+    session_state = gr.State(None)
+    
     chatbot = gr.Chatbot(
         height=600,
         show_copy_button=True,
@@ -167,7 +709,9 @@ with gr.Blocks(theme=gr.themes.Dark()) as demo:
             )
         with gr.Column(scale=1):
             btn = gr.Button("Deploy Swarm 🚀", scale=1, variant="primary")
-            clear_btn = gr.Button("Clear", scale=1, variant="secondary")
+            clear_btn = gr.Button("New Session", scale=1, variant="secondary")
+            # Keeps the single-shot "swarm" API endpoint available to existing clients
+            swarm_api_btn = gr.Button(visible=False)
     
     with gr.Row():
         export_btn = gr.Button("📥 Export Results", scale=1, variant="secondary")
@@ -176,7 +720,7 @@ with gr.Blocks(theme=gr.themes.Dark()) as demo:
     with gr.Accordion("⚙️ Advanced Settings", open=False):
         with gr.Row():
             model_dropdown = gr.Dropdown(
-                choices=SwarmConfig.AVAILABLE_MODELS,
+                choices=SwarmConfig.get_available_models(),
                 value=SwarmConfig.get_model(),
                 label="Model",
                 info="Select the model to use for swarm execution",
@@ -197,6 +741,50 @@ with gr.Blocks(theme=gr.themes.Dark()) as demo:
                 label="Max Tokens",
                 info="Maximum number of tokens to generate",
             )
+        with gr.Row():
+            refresh_models_btn = gr.Button("🔄 Refresh Model Status", variant="secondary")
+            preview_checkbox = gr.Checkbox(
+                value=SwarmConfig.get_preview_enabled(),
+                label="Fast Preview",
+                info=f"Stream a draft from {SwarmConfig.get_preview_model()} until the selected model responds",
+            )
+    
+    with gr.Accordion("📄 Large Document Mode", open=False):
+        gr.Markdown(
+            "Paste a document far larger than a single prompt. It is split into overlapping "
+            "sections, analyzed in parallel, merged, and synthesized by the swarm using the "
+            "task above. Deploying the same task and document again resumes a partially failed run."
+        )
+        document_txt = gr.Textbox(
+            label="Document",
+            placeholder="Paste the large document here...",
+            lines=10,
+            max_lines=20,
+        )
+        document_btn = gr.Button("Analyze Document 📄", variant="primary")
+    
+    with gr.Accordion("⚖️ Compare Models", open=False):
+        gr.Markdown(
+            "Run the task above on several models at once and watch them side by side, "
+            "with live time to first token, tokens per second and total time."
+        )
+        with gr.Row():
+            compare_models = gr.CheckboxGroup(
+                choices=SwarmConfig.get_available_models(),
+                label="Models",
+                info=f"Select 2 to {SwarmConfig.MAX_COMPARE_MODELS} models",
+            )
+            with gr.Column(scale=0):
+                compare_report_checkbox = gr.Checkbox(value=False, label="Save report")
+                compare_btn = gr.Button("Compare ⚖️", variant="primary")
+        compare_stats = gr.Markdown()
+        with gr.Row():
+            compare_panes = [gr.Markdown() for _ in range(SwarmConfig.MAX_COMPARE_MODELS)]
+        compare_report = gr.File(label="Comparison Report")
+    
+    with gr.Accordion("📊 Metrics", open=False):
+        metrics_json = gr.JSON(label="Metrics")
+        metrics_btn = gr.Button("Refresh Metrics", variant="secondary")
     
     gr.Examples(
         examples=[
@@ -209,19 +797,56 @@ with gr.Blocks(theme=gr.themes.Dark()) as demo:
     
     # Event handlers
     btn.click(
-        lambda: [],
-        None,
-        chatbot,
-    ).then(
+        run_swarm_turn,
+        inputs=[txt, chatbot, session_state, model_dropdown, temperature_slider, max_tokens_slider, preview_checkbox],
+        outputs=[chatbot, session_state],
+        api_name="swarm_chat",
+    )
+    
+    swarm_api_btn.click(
         run_swarm,
-        inputs=[txt, model_dropdown, temperature_slider, max_tokens_slider],
+        inputs=[txt, model_dropdown, temperature_slider, max_tokens_slider, preview_checkbox],
         outputs=chatbot,
         api_name="swarm",
     )
     
+    document_btn.click(
+        lambda: ([], None),
+        None,
+        [chatbot, session_state],
+    ).then(
+        run_document_swarm,
+        inputs=[txt, document_txt, model_dropdown, temperature_slider, max_tokens_slider],
+        outputs=chatbot,
+        api_name="swarm_document",
+    )
+    
+    compare_btn.click(
+        run_comparison,
+        inputs=[txt, compare_models, temperature_slider, max_tokens_slider, compare_report_checkbox],
+        outputs=[compare_stats, *compare_panes, compare_report],
+        api_name="swarm_compare",
+    )
+    
+    refresh_models_btn.click(
+        refresh_model_choices,
+        outputs=model_dropdown,
+    )
+    
+    demo.load(
+        refresh_model_choices,
+        outputs=model_dropdown,
+    )
+    
+    metrics_btn.click(
+        get_metrics,
+        outputs=metrics_json,
+    )
+    
     clear_btn.click(
         clear_chat,
-        outputs=[chatbot, txt],
+        inputs=session_state,
+        outputs=[chatbot, txt, session_state],
     )
     
     export_btn.click(
@@ -234,4 +859,9 @@ with gr.Blocks(theme=gr.themes.Dark()) as demo:
     )
 
 if __name__ == "__main__":
+    # Reload settings on SIGHUP or config file changes without dropping running swarms
+    ConfigWatcher.start()
+    # Warm connections and probe models in the background; launch does not wait
+    if SwarmConfig.get_preflight_enabled():
+        Preflight.start(SwarmConfig.get_hf_models(), SwarmConfig.get_token(), pool_tokens=SwarmConfig.get_tokens())
     demo.queue(max_size=20).launch()
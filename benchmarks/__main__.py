@@ -0,0 +1,162 @@
+"""Command-line entry point for the benchmark suite.
+
+Usage:
+    python -m benchmarks run -o benchmarks/baselines/current.json
+    python -m benchmarks compare benchmarks/baselines/baseline.json benchmarks/baselines/current.json
+    python -m benchmarks soak --duration 4h --interval 60 -o soak.json
+"""
+
+import argparse
+import json
+import logging
+import sys
+from typing import Optional
+
+from .harness import compare_results, format_duration, load_results, run_suite, save_results
+
+
+def _run(args: argparse.Namespace) -> int:
+    from .suite import build_benchmarks
+
+    # Swarm start/complete logs would otherwise flood the benchmark output
+    logging.disable(logging.INFO)
+
+    def progress(name: str, result: dict) -> None:
+        print(f"{name:<40} {format_duration(result['median_s']):>14}  peak {result['peak_bytes'] / 1024:>10.1f} KiB")
+
+    results = run_suite(
+        build_benchmarks(),
+        repeat=args.repeat,
+        min_time=args.min_time,
+        name_filter=args.filter,
+        progress=progress,
+    )
+    if args.output:
+        save_results(results, args.output)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+def _compare(args: argparse.Namespace) -> int:
+    rows = compare_results(
+        load_results(args.baseline),
+        load_results(args.current),
+        threshold=args.threshold,
+        memory_threshold=args.memory_threshold,
+    )
+    regressions = 0
+    for row in rows:
+        flags = []
+        if row["time_regression"]:
+            flags.append("TIME REGRESSION")
+        if row["memory_regression"]:
+            flags.append("MEMORY REGRESSION")
+        regressions += bool(flags)
+        print(
+            f"{row['name']:<40} {format_duration(row['baseline_s']):>14} -> {format_duration(row['current_s']):>14}"
+            f"  x{row['time_ratio']:.2f} time  x{row['memory_ratio']:.2f} mem  {' '.join(flags)}"
+        )
+    print(f"\n{regressions} regression(s) beyond thresholds "
+          f"(time {args.threshold:.0%}, memory {args.memory_threshold:.0%})")
+    return 1 if regressions else 0
+
+
+def _duration(value: str) -> float:
+    """Parse a duration in seconds, or with an s/m/h suffix."""
+    units = {"s": 1, "m": 60, "h": 3600}
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def _soak(args: argparse.Namespace) -> int:
+    from .soak import DEFAULT_SLOPE_LIMITS, soak
+
+    logging.disable(logging.INFO)
+    limits = dict(DEFAULT_SLOPE_LIMITS)
+    mib = 1024 * 1024
+    for series, limit, scale in (
+        ("rss_bytes", args.max_rss_mib_per_hour, mib),
+        ("traced_bytes", args.max_traced_mib_per_hour, mib),
+        ("open_fds", args.max_fds_per_hour, 1),
+        ("threads", args.max_threads_per_hour, 1),
+        ("tmp_files", args.max_tmp_files_per_hour, 1),
+        ("tmp_bytes", args.max_tmp_mib_per_hour, mib),
+    ):
+        if limit is not None:
+            limits[series] = limit * scale
+
+    def progress(sample: dict) -> None:
+        print(
+            f"{sample['elapsed_s']:>8.0f}s {sample['iterations']:>7} runs"
+            f"  rss {sample['rss_bytes'] / 1024 / 1024 if sample['rss_bytes'] else 0:>8.1f} MiB"
+            f"  fds {sample['open_fds']}  threads {sample['threads']}"
+            f"  tmp {sample['tmp_files']} files / {sample['tmp_bytes'] / 1024:.1f} KiB"
+        )
+
+    result = soak(
+        duration_s=args.duration,
+        interval_s=args.interval,
+        limits=limits,
+        warmup_s=args.warmup,
+        trace_frames=args.trace_frames,
+        keep_files=args.keep_files,
+        progress=progress,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+        print(f"\nTime series written to {args.output}")
+
+    print("\nGrowth per hour after warmup:")
+    for series, slope in result["slopes_per_hour"].items():
+        print(f"  {series:<14} {'n/a' if slope is None else f'{slope:,.1f}'}")
+    if result["samples"][-1]["top_allocations"]:
+        print("\nTop allocation growth since start:")
+        for allocation in result["samples"][-1]["top_allocations"]:
+            print(f"  {allocation['size_diff_bytes'] / 1024:>+10.1f} KiB  {allocation['where']}")
+    for violation in result["violations"]:
+        print(f"LEAK: {violation}")
+    print(f"\n{len(result['violations'])} series grew beyond limits")
+    return 1 if result["violations"] else 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Parse arguments and run the requested benchmark command."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="SwarmMaster benchmark suite")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run benchmarks and optionally save results")
+    run.add_argument("-o", "--output", help="Write results JSON to this path")
+    run.add_argument("-k", "--filter", help="Only run benchmarks whose name contains this text")
+    run.add_argument("--repeat", type=int, default=5, help="Timing samples per benchmark")
+    run.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timing sample")
+
+    compare = subparsers.add_parser("compare", help="Compare results against a baseline")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.2, help="Allowed median slowdown (0.2 = 20%%)")
+    compare.add_argument("--memory-threshold", type=float, default=0.2, help="Allowed peak memory growth")
+
+    soak = subparsers.add_parser("soak", help="Drive the app for a long time and fail on resource growth")
+    soak.add_argument("--duration", type=_duration, default=3600.0, help="Run time, e.g. 900, 30m or 4h")
+    soak.add_argument("--interval", type=_duration, default=30.0, help="Time between resource samples")
+    soak.add_argument("--warmup", type=_duration, default=60.0, help="Time ignored before fitting growth")
+    soak.add_argument("-o", "--output", help="Write the time series JSON to this path")
+    soak.add_argument("--trace-frames", type=int, default=1, help="tracemalloc frames per allocation (0 disables)")
+    soak.add_argument("--keep-files", action="store_true", help="Keep the soak temp directory for inspection")
+    soak.add_argument("--max-rss-mib-per-hour", type=float, default=None)
+    soak.add_argument("--max-traced-mib-per-hour", type=float, default=None)
+    soak.add_argument("--max-fds-per-hour", type=float, default=None)
+    soak.add_argument("--max-threads-per-hour", type=float, default=None)
+    soak.add_argument("--max-tmp-files-per-hour", type=float, default=None)
+    soak.add_argument("--max-tmp-mib-per-hour", type=float, default=None)
+
+    args = parser.parse_args(argv)
+    commands = {"run": _run, "compare": _compare, "soak": _soak}
+    return commands[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
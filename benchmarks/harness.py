@@ -0,0 +1,178 @@
+"""Timing, memory measurement and baseline comparison for benchmarks."""
+
+import json
+import platform
+import statistics
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+
+class Benchmark:
+    """A named benchmark function belonging to a reporting group."""
+
+    def __init__(self, name: str, fn: Callable[[], object], group: str) -> None:
+        self.name = name
+        self.fn = fn
+        self.group = group
+
+
+def measure_peak_memory(fn: Callable[[], object]) -> int:
+    """
+    Run fn once under tracemalloc and return its peak traced allocation.
+
+    Args:
+        fn: The function to measure.
+
+    Returns:
+        Peak bytes allocated while fn ran.
+    """
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+    return max(0, peak - baseline)
+
+
+def run_benchmark(benchmark: Benchmark, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """
+    Time a benchmark and measure its peak memory.
+
+    The number of calls per timing sample is chosen so each sample takes at
+    least min_time; the reported times are per call.
+
+    Args:
+        benchmark: The benchmark to run.
+        repeat: Number of timing samples.
+        min_time: Minimum duration of each sample in seconds.
+
+    Returns:
+        Dictionary with min/median/mean seconds per call, calls per sample,
+        sample count and peak bytes.
+    """
+    timer = timeit.Timer(benchmark.fn)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    samples = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "group": benchmark.group,
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "number": number,
+        "repeat": repeat,
+        "peak_bytes": measure_peak_memory(benchmark.fn),
+    }
+
+
+def run_suite(
+    benchmarks: list[Benchmark],
+    repeat: int = 5,
+    min_time: float = 0.2,
+    name_filter: Optional[str] = None,
+    progress: Optional[Callable[[str, dict], None]] = None,
+) -> dict:
+    """
+    Run a list of benchmarks and collect results with environment metadata.
+
+    Args:
+        benchmarks: Benchmarks to run.
+        repeat: Number of timing samples per benchmark.
+        min_time: Minimum duration of each sample in seconds.
+        name_filter: Only run benchmarks whose name contains this substring.
+        progress: Optional callback invoked with (name, result) after each run.
+
+    Returns:
+        Results document suitable for saving as a JSON baseline.
+    """
+    results = {}
+    for benchmark in benchmarks:
+        if name_filter and name_filter not in benchmark.name:
+            continue
+        result = run_benchmark(benchmark, repeat=repeat, min_time=min_time)
+        results[benchmark.name] = result
+        if progress:
+            progress(benchmark.name, result)
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+        },
+        "benchmarks": results,
+    }
+
+
+def save_results(results: dict, path: str) -> None:
+    """Write results to a JSON file."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_results(path: str) -> dict:
+    """Read results from a JSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(
+    baseline: dict,
+    current: dict,
+    threshold: float = 0.2,
+    memory_threshold: float = 0.2,
+) -> list[dict]:
+    """
+    Compare benchmark results against a baseline.
+
+    Args:
+        baseline: Baseline results document.
+        current: Current results document.
+        threshold: Allowed relative slowdown of the median time (0.2 = 20%).
+        memory_threshold: Allowed relative growth of peak memory.
+
+    Returns:
+        One row per benchmark present in both documents with the time and
+        memory ratios and whether each is a regression.
+    """
+    rows = []
+    base = baseline.get("benchmarks", {})
+    for name, result in sorted(current.get("benchmarks", {}).items()):
+        if name not in base:
+            continue
+        time_ratio = result["median_s"] / base[name]["median_s"] if base[name]["median_s"] else 1.0
+        base_peak = base[name].get("peak_bytes", 0)
+        memory_ratio = result.get("peak_bytes", 0) / base_peak if base_peak else 1.0
+        rows.append({
+            "name": name,
+            "baseline_s": base[name]["median_s"],
+            "current_s": result["median_s"],
+            "time_ratio": time_ratio,
+            "memory_ratio": memory_ratio,
+            "time_regression": time_ratio > 1 + threshold,
+            "memory_regression": memory_ratio > 1 + memory_threshold,
+        })
+    return rows
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration with an appropriate unit."""
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} ms"
+    return f"{seconds * 1e6:.3f} us"
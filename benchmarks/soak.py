@@ -0,0 +1,335 @@
+"""Long-running soak test for resource leaks.
+
+Drives run_swarm and export_results continuously against a local fake
+OpenAI-compatible backend (so upstream connections are real sockets), and
+samples process resources at intervals: RSS, open file descriptors, thread
+count, temp directory usage and the tracemalloc allocation sites that grew
+most. A least-squares slope per hour is fitted to each series after warmup,
+and the run fails if any slope passes its configured limit.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from utils.metrics import process_memory
+
+SOAK_MODEL = "soak/fake"
+SOAK_TASK = "Design a habit tracker that nudges users with AI-written reminders"
+
+# Default growth allowed per hour after warmup
+DEFAULT_SLOPE_LIMITS = {
+    "rss_bytes": 64 * 1024 * 1024,
+    "traced_bytes": 32 * 1024 * 1024,
+    "open_fds": 10,
+    "threads": 5,
+    "tmp_files": 60,
+    "tmp_bytes": 1024 * 1024,
+}
+
+
+class FakeOpenAIServer:
+    """
+    OpenAI-compatible streaming server on localhost with a canned answer.
+
+    Args:
+        chunks: Number of content chunks streamed per request.
+    """
+
+    def __init__(self, chunks: int = 200) -> None:
+        words = [f"**Agent: Role {i % 5}**\nStep {i} of the plan." for i in range(chunks)]
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.0"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                try:
+                    for word in words:
+                        event = {"choices": [{"delta": {"content": f"{word}\n"}}]}
+                        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                    usage = {"choices": [], "usage": {"prompt_tokens": 200, "completion_tokens": chunks * 8}}
+                    self.wfile.write(f"data: {json.dumps(usage)}\n\ndata: [DONE]\n\n".encode())
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="swarm-soak-server", daemon=True)
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _dir_usage(path: str) -> tuple[int, int]:
+    """Count files and bytes under path."""
+    files = size = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+                files += 1
+            except OSError:
+                continue
+    return files, size
+
+
+def _open_fds() -> Optional[int]:
+    """Count this process's open file descriptors (None where /proc is unavailable)."""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def sample_resources(tmp_dir: str, baseline: Optional[tracemalloc.Snapshot] = None, top: int = 5) -> dict:
+    """
+    Sample the process's resource usage.
+
+    Args:
+        tmp_dir: Temp directory whose files and bytes are counted.
+        baseline: tracemalloc snapshot to diff against for the top allocations.
+        top: Number of allocation sites to report.
+
+    Returns:
+        Dictionary with rss_bytes, open_fds, threads, tmp_files, tmp_bytes,
+        traced_bytes and top_allocations (the sites that grew most since
+        baseline, or the largest ones without a baseline).
+    """
+    tmp_files, tmp_bytes = _dir_usage(tmp_dir)
+    sample = {
+        "rss_bytes": process_memory()["rss_bytes"],
+        "open_fds": _open_fds(),
+        "threads": threading.active_count(),
+        "tmp_files": tmp_files,
+        "tmp_bytes": tmp_bytes,
+        "traced_bytes": None,
+        "top_allocations": [],
+    }
+    if tracemalloc.is_tracing():
+        sample["traced_bytes"] = tracemalloc.get_traced_memory()[0]
+        snapshot = tracemalloc.take_snapshot()
+        stats = snapshot.compare_to(baseline, "lineno") if baseline else snapshot.statistics("lineno")
+        sample["top_allocations"] = [
+            {
+                "where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_bytes": stat.size,
+                "size_diff_bytes": getattr(stat, "size_diff", None),
+                "count": stat.count,
+            }
+            for stat in stats[:top]
+        ]
+    return sample
+
+
+def fit_slope(points: list[tuple[float, float]]) -> Optional[float]:
+    """
+    Least-squares slope of (x, y) points.
+
+    Returns:
+        The slope, or None with fewer than three points or no spread in x.
+    """
+    if len(points) < 3:
+        return None
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if spread == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def check_slopes(samples: list[dict], limits: dict[str, float], warmup_s: float = 0.0) -> tuple[dict, list[str]]:
+    """
+    Fit growth per hour to each sampled series and compare it to the limits.
+
+    Args:
+        samples: Samples with "elapsed_s" and the series in limits.
+        limits: Allowed growth per hour per series (None leaves a series unchecked).
+        warmup_s: Samples taken before this are ignored (caches and pools filling up).
+
+    Returns:
+        (slopes per hour by series, descriptions of the limits that were passed).
+    """
+    steady = [sample for sample in samples if sample["elapsed_s"] >= warmup_s]
+    slopes = {}
+    violations = []
+    for series, limit in limits.items():
+        points = [(s["elapsed_s"] / 3600, s[series]) for s in steady if s.get(series) is not None]
+        slope = fit_slope(points)
+        slopes[series] = slope
+        if slope is not None and limit is not None and slope > limit:
+            violations.append(f"{series} grows {slope:,.1f}/h (limit {limit:,.1f}/h)")
+    return slopes, violations
+
+
+def run_soak(
+    workload: Callable[[int], None],
+    duration_s: float,
+    interval_s: float,
+    tmp_dir: str,
+    trace_frames: int = 1,
+    progress: Optional[Callable[[dict], None]] = None,
+    clock: Callable[[], float] = time.monotonic,
+) -> list[dict]:
+    """
+    Run a workload repeatedly for duration_s, sampling resources every interval_s.
+
+    Args:
+        workload: Called with the iteration number, back to back.
+        duration_s: Total run time in seconds.
+        interval_s: Seconds between samples.
+        tmp_dir: Temp directory whose usage is sampled.
+        trace_frames: Frames kept per tracemalloc allocation (0 disables tracemalloc).
+        progress: Optional callback invoked with each sample.
+        clock: Monotonic clock in seconds, injectable for tests.
+
+    Returns:
+        The samples, each with elapsed_s and iterations completed so far.
+    """
+    tracing = trace_frames > 0 and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start(trace_frames)
+    baseline = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+    samples = []
+    iterations = 0
+    started = clock()
+
+    def take_sample() -> None:
+        sample = {"elapsed_s": clock() - started, "iterations": iterations}
+        sample.update(sample_resources(tmp_dir, baseline))
+        samples.append(sample)
+        if progress:
+            progress(sample)
+
+    try:
+        take_sample()
+        next_sample = started + interval_s
+        while clock() - started < duration_s:
+            workload(iterations)
+            iterations += 1
+            if clock() >= next_sample:
+                take_sample()
+                while next_sample <= clock():
+                    next_sample += interval_s
+        if samples[-1]["iterations"] != iterations:
+            take_sample()
+    finally:
+        if tracing:
+            tracemalloc.stop()
+    return samples
+
+
+def build_swarm_workload(base_url: str, work_dir: str, abandon_every: int = 3) -> Callable[[int], None]:
+    """
+    Build a workload that runs the app's swarm and export paths like the UI does.
+
+    Every abandon_every-th run is dropped after a few chunks, as when a browser
+    tab is closed mid-stream, to exercise upstream stream cleanup.
+
+    Args:
+        base_url: Root of the fake OpenAI-compatible backend.
+        work_dir: Directory for usage totals and spilled sessions.
+        abandon_every: Abandon every Nth run (0 never abandons).
+
+    Returns:
+        The workload, called with the iteration number.
+    """
+    os.environ.update({
+        "SWARM_MODEL_BACKENDS": json.dumps({SOAK_MODEL: {"backend": "openai", "base_url": base_url}}),
+        "SWARM_PREVIEW": "false",
+        "SWARM_USAGE_FILE": os.path.join(work_dir, "usage.json"),
+        "SWARM_SESSION_SPILL_DIR": os.path.join(work_dir, "sessions"),
+    })
+    from .suite import _import_app
+
+    app = _import_app()
+    app.SwarmConfig.reset()
+
+    def run(iteration: int) -> None:
+        stream = app.run_swarm(SOAK_TASK, SOAK_MODEL, 0.7, 2048, preview=False)
+        last_chunk = ""
+        try:
+            for chunks, last_chunk in enumerate(stream, start=1):
+                if abandon_every and iteration % abandon_every == abandon_every - 1 and chunks >= 5:
+                    break
+        finally:
+            stream.close()
+        app.export_results([(SOAK_TASK, last_chunk)], SOAK_TASK, SOAK_MODEL)
+
+    return run
+
+
+def soak(
+    duration_s: float,
+    interval_s: float,
+    limits: dict[str, float],
+    warmup_s: float = 0.0,
+    trace_frames: int = 1,
+    keep_files: bool = False,
+    progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Soak the swarm and export paths against a local fake backend.
+
+    Temp files created during the run go to a private temp directory, so
+    its usage reflects only this process.
+
+    Args:
+        duration_s: Total run time in seconds.
+        interval_s: Seconds between samples.
+        limits: Allowed growth per hour per series.
+        warmup_s: Seconds ignored before fitting slopes.
+        trace_frames: Frames kept per tracemalloc allocation (0 disables tracemalloc).
+        keep_files: Keep the temp directory (e.g. to inspect leaked exports).
+        progress: Optional callback invoked with each sample.
+
+    Returns:
+        Results document with the samples, slopes and violations.
+    """
+    work_dir = tempfile.mkdtemp(prefix="swarm_soak_")
+    tmp_dir = os.path.join(work_dir, "tmp")
+    os.makedirs(tmp_dir)
+    previous_tempdir = tempfile.tempdir
+    tempfile.tempdir = tmp_dir
+    server = FakeOpenAIServer().start()
+    try:
+        workload = build_swarm_workload(server.base_url, work_dir)
+        samples = run_soak(workload, duration_s, interval_s, tmp_dir, trace_frames=trace_frames, progress=progress)
+    finally:
+        server.stop()
+        tempfile.tempdir = previous_tempdir
+        if not keep_files:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    slopes, violations = check_slopes(samples, limits, warmup_s=warmup_s)
+    return {
+        "meta": {
+            "duration_s": duration_s,
+            "interval_s": interval_s,
+            "warmup_s": warmup_s,
+            "limits_per_hour": limits,
+            "work_dir": work_dir if keep_files else None,
+        },
+        "samples": samples,
+        "slopes_per_hour": slopes,
+        "violations": violations,
+    }
@@ -0,0 +1,108 @@
+"""Benchmark definitions for SwarmMaster hot paths."""
+
+import os
+import sys
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from utils.api import SwarmClient
+from utils.cassette import ReplayInferenceClient, synthetic_cassette
+from utils.compression import compress_text
+from utils.export import format_export_content
+from utils.prompts import build_swarm_prompt
+from utils.streaming import coalesce_stream
+from utils.validation import validate_max_tokens, validate_model, validate_task, validate_temperature
+
+from .harness import Benchmark
+
+STREAM_SIZES = (1000, 4000, 8000)
+
+TASK_10K = ("Redesign the onboarding flow for our analytics dashboard. " * 200)[:10000]
+LOG_INPUT = "\n".join(
+    f"2025-01-01 10:00:{i % 60:02d},000 WARN worker-{i % 4} retrying upstream connection"
+    for i in range(150)
+)
+
+
+def _consume(iterable) -> None:
+    for _ in iterable:
+        pass
+
+
+def _stream_benchmark(tokens: int) -> Benchmark:
+    cassette = synthetic_cassette(tokens, seed=tokens)
+
+    def run() -> None:
+        client = SwarmClient(model="bench", token="bench", client=ReplayInferenceClient(cassette, speed=0))
+        _consume(client.stream_swarm_response("prompt"))
+
+    return Benchmark(f"stream.chunks_{tokens // 1000}k", run, "streaming")
+
+
+def _coalesce_benchmark(tokens: int) -> Benchmark:
+    cassette = synthetic_cassette(tokens, seed=tokens)
+
+    def run() -> None:
+        client = SwarmClient(model="bench", token="bench", client=ReplayInferenceClient(cassette, speed=0))
+        _consume(coalesce_stream(client.stream_swarm_response("prompt"), min_interval_ms=50))
+
+    return Benchmark(f"stream.coalesced_{tokens // 1000}k", run, "streaming")
+
+
+def _import_app():
+    """Import app.py without building the Gradio UI, as tests/test_app.py does."""
+    if "app" not in sys.modules:
+        sys.modules.setdefault("gradio", MagicMock())
+    import app
+
+    return app
+
+
+def _run_swarm_benchmark(tokens: int) -> Benchmark:
+    app = _import_app()
+    cassette = synthetic_cassette(tokens, seed=tokens)
+
+    def client_factory(model, token=None, **kwargs):
+        return SwarmClient(model=model, token=token, client=ReplayInferenceClient(cassette, speed=0), **kwargs)
+
+    # Keep benchmark usage totals out of the real usage file
+    usage_file = os.path.join(tempfile.mkdtemp(prefix="swarm_bench_"), "usage.json")
+    snapshot = app.SwarmConfig.load_snapshot({**os.environ, "HF_TOKEN": "bench", "SWARM_USAGE_FILE": usage_file})
+
+    def run() -> None:
+        with patch.object(app, "SwarmClient", client_factory), \
+                patch.object(app.SwarmConfig, "validate_token", return_value=(True, None)), \
+                patch.object(app.SwarmConfig, "_snapshot", snapshot):
+            _consume(app.run_swarm("Design a viral AI tool", "bench-model", 0.7, 8192, preview=False))
+
+    return Benchmark(f"e2e.run_swarm_{tokens // 1000}k", run, "end_to_end")
+
+
+def _export_benchmark() -> Benchmark:
+    response = synthetic_cassette(8000, seed=1).text
+
+    def run() -> None:
+        format_export_content(TASK_10K, response, "bench-model", {"Temperature": 0.7, "Max Tokens": 8192})
+
+    return Benchmark("export.format_8k", run, "export")
+
+
+def build_benchmarks() -> list[Benchmark]:
+    """Build the full benchmark list in reporting order."""
+    benchmarks = [_stream_benchmark(tokens) for tokens in STREAM_SIZES]
+    benchmarks.append(_coalesce_benchmark(8000))
+    benchmarks.extend([
+        Benchmark("prompt.build_swarm_prompt_10k", lambda: build_swarm_prompt(TASK_10K), "prompt"),
+        Benchmark("validation.validate_task_10k", lambda: validate_task(TASK_10K), "validation"),
+        Benchmark("validation.validate_temperature", lambda: validate_temperature(0.7), "validation"),
+        Benchmark("validation.validate_max_tokens", lambda: validate_max_tokens(4096), "validation"),
+        Benchmark(
+            "validation.validate_model",
+            lambda: validate_model("google/gemma-7b-it", [f"model-{i}" for i in range(3)] + ["google/gemma-7b-it"]),
+            "validation",
+        ),
+        Benchmark("compression.compress_text_logs", lambda: compress_text(LOG_INPUT), "prompt"),
+        _export_benchmark(),
+        _run_swarm_benchmark(4000),
+    ])
+    return benchmarks
@@ -0,0 +1,401 @@
+"""Lean SSE/HTTP API for programmatic SwarmMaster clients.
+
+The Gradio ``swarm`` endpoint negotiates a queue slot, diffs JSON state and
+resends the full accumulated response on every token. Machine clients can use
+this ASGI app instead: it streams only the new text of each chunk as
+Server-Sent Events and accepts batch submissions, reusing the same validation,
+SwarmClient and logging as the web UI.
+
+Endpoints (mounted under /api when run with ``python server.py``):
+    POST /v1/swarm        Stream one swarm as SSE (start, delta..., done | error)
+    POST /v1/swarm/batch  Run several swarms concurrently and return JSON results
+    GET  /v1/metrics      In-process metrics, per-credential usage and token spend
+    GET  /health          Liveness check
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Generator, Optional
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from utils import (
+    SwarmClient,
+    build_swarm_prompt,
+    SwarmConfig,
+    SwarmLogger,
+    APIError,
+)
+from utils.compression import compress_and_record
+from utils.config import ConfigWatcher
+from utils.credentials import CredentialPool
+from utils.limiter import AdaptiveLimiters
+from utils.metrics import SwarmMetrics
+from utils.preflight import Preflight
+from utils.session import SwarmSessions
+from utils.streaming import BufferStats, buffered_stream
+from utils.tracing import RequestTrace
+from utils.usage import UsageLedger
+from utils.validation import validate_task, validate_model, validate_temperature, validate_max_tokens
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stop reverse proxies from buffering the event stream
+    "X-Accel-Buffering": "no",
+}
+
+
+def parse_swarm_request(payload: Any) -> tuple[Optional[dict], Optional[str]]:
+    """
+    Validate a swarm request body and fill in configured defaults.
+
+    Args:
+        payload: Decoded JSON body with "task" and optional "model",
+            "temperature", "max_tokens" and "session_id" (charged for usage).
+
+    Returns:
+        Tuple of (params, error_message); params is None when invalid.
+    """
+    if not isinstance(payload, dict):
+        return None, "Request body must be a JSON object."
+
+    task = payload.get("task")
+    if task is not None and not isinstance(task, str):
+        return None, "Task must be a string."
+    is_valid, error_msg = validate_task(task)
+    if not is_valid:
+        return None, error_msg
+
+    model = payload.get("model") or SwarmConfig.get_model()
+    is_valid, error_msg = validate_model(model, SwarmConfig.get_available_models())
+    if not is_valid:
+        return None, error_msg
+
+    temperature = payload.get("temperature", SwarmConfig.get_temperature())
+    is_valid, error_msg = validate_temperature(temperature)
+    if isinstance(temperature, bool) or not is_valid:
+        return None, error_msg or "Temperature must be a number."
+
+    max_tokens = payload.get("max_tokens", SwarmConfig.get_max_tokens())
+    is_valid, error_msg = validate_max_tokens(max_tokens)
+    if isinstance(max_tokens, bool) or not is_valid:
+        return None, error_msg or "Max tokens must be an integer."
+
+    session_id = payload.get("session_id")
+    if session_id is not None and not isinstance(session_id, str):
+        return None, "Session ID must be a string."
+
+    return {
+        "task": task,
+        "model": model,
+        "temperature": float(temperature),
+        "max_tokens": max_tokens,
+        "session_id": session_id,
+    }, None
+
+
+def check_token(model: Optional[str] = None) -> tuple[bool, Optional[str]]:
+    """Check HF_TOKEN (unless model has a non-HF backend), failing fast if the startup preflight rejected it."""
+    if model is not None and not SwarmConfig.is_hf_model(model):
+        return True, None
+    is_valid, error_msg = SwarmConfig.validate_token()
+    if is_valid and Preflight.token_error():
+        return False, f"HF_TOKEN was rejected by Hugging Face: {Preflight.token_error()}"
+    return is_valid, error_msg
+
+
+def _build_prompt(task: str, swarm_client: SwarmClient) -> str:
+    """Build the swarm prompt, compressing the task when configured."""
+    if SwarmConfig.get_compress_input():
+        task = compress_and_record(task, swarm_client if SwarmConfig.get_summarize_input() else None).text
+    return build_swarm_prompt(task)
+
+
+def stream_swarm_deltas(params: dict, trace: Optional[RequestTrace] = None) -> Generator[str, None, None]:
+    """
+    Run a swarm and yield only the new text of each upstream chunk.
+
+    Args:
+        params: Validated request parameters from parse_swarm_request.
+        trace: Optional request trace for upstream spans.
+
+    Token usage is charged to the request's model and session when the
+    stream ends, including after a failure.
+
+    Yields:
+        Text deltas; joined together they form the full response.
+
+    Raises:
+        APIError: If the upstream request fails.
+    """
+    swarm_client = SwarmClient(
+        model=params["model"],
+        token=SwarmConfig.get_token(),
+        trace=trace,
+        pool=CredentialPool.shared(),
+    )
+    started = time.perf_counter()
+    try:
+        prompt = _build_prompt(params["task"], swarm_client)
+        sent = 0
+        buffer_stats = BufferStats()
+        # Read upstream on its own thread so a slow HTTP client never stalls it;
+        # skipped snapshots lose nothing because deltas are taken from the latest one
+        for accumulated in buffered_stream(
+            swarm_client.stream_swarm_response(
+                prompt,
+                max_tokens=params["max_tokens"],
+                temperature=params["temperature"],
+            ),
+            SwarmConfig.get_stream_buffer_size(),
+            stats=buffer_stats,
+            name="api",
+        ):
+            delta = accumulated[sent:]
+            sent = len(accumulated)
+            if delta:
+                yield delta
+        SwarmMetrics.observe("stream.buffer_high_water", buffer_stats.high_water, labels={"endpoint": "api"})
+        SwarmMetrics.increment("stream.frames_dropped", buffer_stats.dropped, labels={"endpoint": "api"})
+    finally:
+        if swarm_client.usage.total_tokens:
+            UsageLedger.record(
+                params["model"],
+                swarm_client.usage,
+                params["session_id"],
+                time.perf_counter() - started,
+            )
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Encode one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def swarm_events(params: dict) -> Generator[str, None, None]:
+    """
+    Stream a swarm as SSE: one start event, delta events, then done or error.
+
+    Args:
+        params: Validated request parameters from parse_swarm_request.
+
+    Yields:
+        Encoded SSE messages.
+    """
+    trace = RequestTrace("api_swarm", model=params["model"])
+    task = params["task"]
+    started = time.perf_counter()
+    chars = 0
+    events = 0
+    try:
+        start = {"request_id": trace.request_id, "model": params["model"]}
+        if params.get("notice"):
+            start["notice"] = params["notice"]
+        yield format_sse("start", start)
+        SwarmLogger.log_swarm_start(task, params["model"])
+
+        for delta in stream_swarm_deltas(params, trace):
+            chars += len(delta)
+            events += 1
+            yield format_sse("delta", {"text": delta})
+
+        SwarmMetrics.observe("api.delta_events", events)
+        SwarmLogger.log_swarm_complete(task, chars)
+        yield format_sse("done", {"chars": chars, "seconds": round(time.perf_counter() - started, 3)})
+
+    except APIError as e:
+        error_msg = f"API error: {str(e)}"
+        SwarmLogger.log_error("APIError", error_msg, task)
+        yield format_sse("error", {"error": error_msg})
+    except Exception as e:
+        error_msg = f"Unexpected error: {str(e)}"
+        SwarmLogger.log_error("UnexpectedError", error_msg, task)
+        yield format_sse("error", {"error": error_msg})
+    finally:
+        trace.finish()
+
+
+def apply_budget(params: dict) -> Optional[str]:
+    """
+    Check the session and daily budgets, switching params to the downgrade model if configured.
+
+    Returns:
+        An error message if the request must be rejected, otherwise None.
+    """
+    allowed, model, budget_msg = UsageLedger.check_budget(params["model"], params["session_id"])
+    if not allowed:
+        SwarmLogger.log_error("BudgetExceeded", budget_msg, params["task"])
+        return budget_msg
+    params["model"] = model
+    params["notice"] = budget_msg
+    return None
+
+
+def run_batch_item(params: dict) -> dict:
+    """Run one batch task to completion and describe the outcome."""
+    started = time.perf_counter()
+    budget_error = apply_budget(params)
+    if budget_error:
+        return {"ok": False, "error": budget_error, "seconds": 0.0}
+    SwarmLogger.log_swarm_start(params["task"], params["model"])
+    try:
+        text = "".join(stream_swarm_deltas(params))
+    except Exception as e:
+        error_msg = f"API error: {str(e)}" if isinstance(e, APIError) else f"Unexpected error: {str(e)}"
+        SwarmLogger.log_error(type(e).__name__, error_msg, params["task"])
+        return {"ok": False, "error": error_msg, "seconds": round(time.perf_counter() - started, 3)}
+    SwarmLogger.log_swarm_complete(params["task"], len(text))
+    result = {"ok": True, "model": params["model"], "text": text, "seconds": round(time.perf_counter() - started, 3)}
+    if params.get("notice"):
+        result["notice"] = params["notice"]
+    return result
+
+
+def run_batch(items: list[Any], max_workers: int) -> list[dict]:
+    """
+    Validate and run a batch of swarm requests with bounded concurrency.
+
+    Invalid items fail individually without affecting the rest of the batch.
+
+    Args:
+        items: Request bodies in the same shape as POST /v1/swarm.
+        max_workers: Maximum swarms running at once.
+
+    Returns:
+        One result dict per item, in submission order.
+    """
+    results: list[Optional[dict]] = [None] * len(items)
+    runnable = []
+    for index, item in enumerate(items):
+        params, error_msg = parse_swarm_request(item)
+        if params is None:
+            results[index] = {"index": index, "ok": False, "error": error_msg}
+        else:
+            runnable.append((index, params))
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="swarm-batch") as pool:
+        outcomes = pool.map(lambda entry: run_batch_item(entry[1]), runnable)
+        for (index, _), outcome in zip(runnable, outcomes):
+            results[index] = {"index": index, **outcome}
+    return results
+
+
+async def _read_json(request: Request) -> tuple[Any, Optional[JSONResponse]]:
+    """Decode a JSON body, or build the 400 response for a malformed one."""
+    try:
+        return await request.json(), None
+    except ValueError:
+        return None, JSONResponse({"error": "Request body must be valid JSON."}, status_code=400)
+
+
+async def swarm_endpoint(request: Request):
+    """POST /v1/swarm: stream one swarm as Server-Sent Events."""
+    SwarmMetrics.increment("api.requests", labels={"endpoint": "swarm"})
+    payload, error_response = await _read_json(request)
+    if error_response is not None:
+        return error_response
+
+    params, error_msg = parse_swarm_request(payload)
+    if params is None:
+        return JSONResponse({"error": error_msg}, status_code=400)
+    params["session_id"] = params["session_id"] or request.headers.get("x-session-id")
+
+    is_valid, error_msg = check_token(params["model"])
+    if not is_valid:
+        SwarmLogger.log_error("ConfigurationError", error_msg, params["task"])
+        return JSONResponse({"error": error_msg}, status_code=503)
+
+    budget_error = apply_budget(params)
+    if budget_error:
+        return JSONResponse({"error": budget_error}, status_code=402)
+
+    return StreamingResponse(swarm_events(params), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+async def batch_endpoint(request: Request):
+    """POST /v1/swarm/batch: run several swarms and return all results as JSON."""
+    SwarmMetrics.increment("api.requests", labels={"endpoint": "batch"})
+    payload, error_response = await _read_json(request)
+    if error_response is not None:
+        return error_response
+
+    items = payload.get("tasks") if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        return JSONResponse({"error": 'Request body must contain a non-empty "tasks" list.'}, status_code=400)
+    max_batch = SwarmConfig.get_api_max_batch()
+    if len(items) > max_batch:
+        return JSONResponse({"error": f"Batch is too large (maximum {max_batch} tasks)."}, status_code=400)
+
+    # Only batches with a Hugging Face model need HF_TOKEN; items are validated individually
+    models = [(item.get("model") if isinstance(item, dict) else None) or SwarmConfig.get_model() for item in items]
+    is_valid, error_msg = True, None
+    if any(not isinstance(model, str) or SwarmConfig.is_hf_model(model) for model in models):
+        is_valid, error_msg = check_token()
+    if not is_valid:
+        SwarmLogger.log_error("ConfigurationError", error_msg, "")
+        return JSONResponse({"error": error_msg}, status_code=503)
+
+    session_id = request.headers.get("x-session-id")
+    if session_id:
+        items = [{"session_id": session_id, **item} if isinstance(item, dict) else item for item in items]
+    results = await run_in_threadpool(run_batch, items, SwarmConfig.get_api_batch_max_workers())
+    SwarmMetrics.increment("api.batch_tasks", len(items))
+    return JSONResponse({"results": results})
+
+
+async def metrics_endpoint(request: Request):
+    """GET /v1/metrics: in-process metrics snapshot with per-credential usage and token spend."""
+    pool = CredentialPool.shared()
+    return JSONResponse({
+        **SwarmMetrics.snapshot(),
+        "credentials": pool.stats() if pool else [],
+        "usage": UsageLedger.summary(),
+        "config": SwarmConfig.current().summary(),
+        "sessions": SwarmSessions.stats(),
+        "limiters": AdaptiveLimiters.stats(),
+    })
+
+
+async def health_endpoint(request: Request):
+    """GET /health: liveness check."""
+    return JSONResponse({"status": "ok"})
+
+
+def create_app() -> Starlette:
+    """Create the ASGI app serving the programmatic API."""
+    return Starlette(routes=[
+        Route("/v1/swarm", swarm_endpoint, methods=["POST"]),
+        Route("/v1/swarm/batch", batch_endpoint, methods=["POST"]),
+        Route("/v1/metrics", metrics_endpoint, methods=["GET"]),
+        Route("/health", health_endpoint, methods=["GET"]),
+    ])
+
+
+if __name__ == "__main__":
+    import gradio as gr
+    import uvicorn
+    from fastapi import FastAPI
+
+    from app import demo
+
+    parser = argparse.ArgumentParser(description="Serve the SwarmMaster API under /api and the web UI at /")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7860)
+    args = parser.parse_args()
+
+    # Warm connections and probe models in the background; startup does not wait
+    if SwarmConfig.get_preflight_enabled():
+        Preflight.start(SwarmConfig.get_hf_models(), SwarmConfig.get_token())
+    # Reload settings on SIGHUP or config file changes without dropping running streams
+    ConfigWatcher.start()
+
+    root = FastAPI()
+    root.mount("/api", create_app())
+    root = gr.mount_gradio_app(root, demo.queue(max_size=20), path="/")
+    uvicorn.run(root, host=args.host, port=args.port)
@@ -0,0 +1,33 @@
+"""Shared pytest fixtures."""
+
+import pytest
+from utils.config import SwarmConfig
+from utils.limiter import AdaptiveLimiters
+from utils.usage import UsageLedger
+
+
+@pytest.fixture(autouse=True)
+def fresh_config():
+    """
+    Start and end every test without a cached config snapshot.
+
+    Set environment variables with monkeypatch.setenv or patch.dict before
+    the code under test first reads a setting; a test that changes them
+    afterwards calls SwarmConfig.reset() (or reload()) itself.
+    """
+    SwarmConfig.reset()
+    yield
+    SwarmConfig.reset()
+
+
+@pytest.fixture(autouse=True)
+def isolated_usage_ledger(tmp_path, monkeypatch):
+    """Keep usage totals, spilled sessions, exports and concurrency limits from one test out of the others."""
+    monkeypatch.setenv("SWARM_USAGE_FILE", str(tmp_path / "usage.json"))
+    monkeypatch.setenv("SWARM_SESSION_SPILL_DIR", str(tmp_path / "sessions"))
+    monkeypatch.setenv("SWARM_EXPORT_DIR", str(tmp_path / "exports"))
+    UsageLedger.reset()
+    AdaptiveLimiters.reset()
+    yield
+    UsageLedger.reset()
+    AdaptiveLimiters.reset()
@@ -27,6 +27,15 @@ class TestSwarmClient:
                 assert client.token == "env-token"
                 mock_client.assert_called_once_with(model="test-model", token="env-token")
     
+    def test_init_with_injected_client(self):
+        """Test that a pre-built client is used instead of InferenceClient."""
+        injected = Mock()
+        with patch('utils.api.InferenceClient') as mock_client:
+            client = SwarmClient(model="test-model", token="test-token", client=injected)
+            
+            assert client.client is injected
+            mock_client.assert_not_called()
+    
     def test_stream_swarm_response_accumulates_chunks(self):
         """Test that streaming responses accumulate correctly."""
         # Mock the chat_completion response
@@ -123,3 +132,20 @@ class TestSwarmClient:
             with pytest.raises(Exception, match="API Error"):
                 list(client.stream_swarm_response("test prompt"))
 
+    
+    def test_stream_chat_response_passes_messages(self):
+        """Test that multi-turn messages are sent as given."""
+        injected = Mock()
+        injected.chat_completion.return_value = []
+        messages = [
+            {"role": "user", "content": "first"},
+            {"role": "assistant", "content": "answer"},
+            {"role": "user", "content": "follow-up"},
+        ]
+        
+        client = SwarmClient(model="test-model", token="test-token", client=injected)
+        list(client.stream_chat_response(messages, max_tokens=512))
+        
+        call_kwargs = injected.chat_completion.call_args[1]
+        assert call_kwargs["messages"] == messages
+        assert call_kwargs["max_tokens"] == 512
@@ -1,6 +1,7 @@
 """Integration tests for app.py run_swarm function."""
 
 import os
+import time
 from unittest.mock import patch, MagicMock
 import pytest
 
@@ -8,7 +9,7 @@ import pytest
 import sys
 sys.modules['gradio'] = MagicMock()
 
-from app import run_swarm
+from app import export_results, run_comparison, run_swarm, run_swarm_turn
 from utils import SwarmConfig
 
 
@@ -115,7 +116,7 @@ class TestRunSwarm:
     @patch('app.SwarmConfig.validate_token')
     @patch('app.SwarmClient')
     @patch('app.build_swarm_prompt')
-    @patch.dict(os.environ, {"HF_TOKEN": "test-token"})
+    @patch.dict(os.environ, {"HF_TOKEN": "test-token", "SWARM_UI_FLUSH_INTERVAL_MS": "0"})
     def test_run_swarm_streaming_chunks_accumulate(self, mock_build_prompt, mock_client_class, mock_validate):
         """Test that streaming chunks are yielded correctly."""
         # Setup mocks
@@ -139,3 +140,236 @@ class TestRunSwarm:
         assert result[2] == "Chunk 1 Chunk 2"
         assert result[3] == "Chunk 1 Chunk 2 Chunk 3"
 
+    
+    @patch('app.SwarmConfig.validate_token')
+    @patch('app.SwarmClient')
+    @patch('app.stream_with_preview')
+    @patch('app.build_swarm_prompt')
+    @patch.dict(os.environ, {"HF_TOKEN": "test-token", "SWARM_UI_FLUSH_INTERVAL_MS": "0"})
+    def test_run_swarm_preview_replaces_draft(self, mock_build_prompt, mock_preview, mock_client_class, mock_validate):
+        """Test that draft chunks are labelled and replaced by the primary output."""
+        mock_validate.return_value = (True, None)
+        mock_build_prompt.return_value = "formatted prompt"
+        mock_client_class.side_effect = lambda model, token, **kwargs: MagicMock(model=model)
+        mock_preview.return_value = [
+            ("Draft", True),
+            ("Final", False),
+            ("Final answer", False),
+        ]
+        
+        result = list(run_swarm("test task", SwarmConfig.DEFAULT_MODEL, 0.7, 4096, preview=True))
+        
+        assert mock_client_class.call_count == 2
+        assert "Draft preview" in result[1]
+        assert result[1].endswith("Draft")
+        assert result[2:] == ["Final", "Final answer"]
+    
+    @patch('app.SwarmConfig.validate_token')
+    @patch('app.SwarmClient')
+    @patch('app.build_swarm_prompt')
+    @patch.dict(os.environ, {"HF_TOKEN": "test-token"})
+    def test_run_swarm_preview_skipped_for_preview_model(self, mock_build_prompt, mock_client_class, mock_validate):
+        """Test that no draft is started when the selected model is the preview model."""
+        mock_validate.return_value = (True, None)
+        mock_build_prompt.return_value = "formatted prompt"
+        mock_client = MagicMock()
+        mock_client.stream_swarm_response.return_value = ["Chunk"]
+        mock_client_class.return_value = mock_client
+        
+        result = list(run_swarm("test task", SwarmConfig.get_preview_model(), 0.7, 4096, preview=True))
+        
+        assert mock_client_class.call_count == 1
+        assert result[-1] == "Chunk"
+    
+    @patch('app.SwarmConfig.validate_token')
+    @patch('app.SwarmClient')
+    @patch('app.build_swarm_prompt')
+    @patch.dict(os.environ, {"HF_TOKEN": "test-token", "SWARM_COMPRESS_INPUT": "1"})
+    def test_run_swarm_compresses_input(self, mock_build_prompt, mock_client_class, mock_validate):
+        """Test that the compressed task is used to build the prompt."""
+        mock_validate.return_value = (True, None)
+        mock_build_prompt.return_value = "formatted prompt"
+        mock_client = MagicMock()
+        mock_client.stream_swarm_response.return_value = ["Chunk"]
+        mock_client_class.return_value = mock_client
+        
+        task = "Summarize these logs:\n" + "ERROR disk full\n" * 20
+        result = list(run_swarm(task, "model", 0.7, 4096))
+        
+        prompt_task = mock_build_prompt.call_args[0][0]
+        assert prompt_task.count("ERROR disk full") == 1
+        assert "repeated 19 more times" in prompt_task
+        assert result[-1] == "Chunk"
+    
+    @patch('app.SwarmConfig.validate_token')
+    @patch('app.SwarmClient')
+    @patch('app.build_swarm_prompt')
+    @patch.dict(os.environ, {"HF_TOKEN": "test-token", "SWARM_UI_FLUSH_INTERVAL_MS": "1000", "SWARM_STREAM_BUFFER_SIZE": "0"})
+    def test_run_swarm_coalesces_chunks(self, mock_build_prompt, mock_client_class, mock_validate):
+        """Test that fast chunks are coalesced into fewer chatbot updates."""
+        mock_validate.return_value = (True, None)
+        mock_build_prompt.return_value = "formatted prompt"
+        mock_client = MagicMock()
+        chunks = ["token " * i for i in range(1, 101)]
+        mock_client.stream_swarm_response.return_value = chunks
+        mock_client_class.return_value = mock_client
+        
+        result = list(run_swarm("test task", "model", 0.7, 4096))
+        
+        # Deployment message, the first chunk, then the final flush
+        assert result == ["🚀 Deploying Builder Swarm...\n\n", chunks[0], chunks[-1]]
+    
+    @patch('app.SwarmConfig.validate_token')
+    @patch('app.SwarmClient')
+    @patch('app.build_swarm_prompt')
+    @patch.dict(os.environ, {"HF_TOKEN": "test-token"})
+    def test_run_swarm_records_stage_spans(self, mock_build_prompt, mock_client_class, mock_validate):
+        """Test that each run_swarm stage is recorded as a span."""
+        from utils.tracing import SwarmTracer
+        
+        SwarmTracer.clear()
+        mock_validate.return_value = (True, None)
+        mock_build_prompt.return_value = "formatted prompt"
+        mock_client = MagicMock()
+        mock_client.stream_swarm_response.return_value = ["Chunk 1", "Chunk 1 Chunk 2"]
+        mock_client_class.return_value = mock_client
+        
+        list(run_swarm("test task", "model", 0.7, 4096))
+        
+        names = [s.name for s in SwarmTracer.spans()]
+        assert names == [
+            "run_swarm", "validate", "validate_token", "budget", "client_init",
+            "build_prompt", "ttft", "stream", "log",
+        ]
+        assert mock_client_class.call_args.kwargs["trace"].request_id == SwarmTracer.spans()[0].trace.request_id
+    
+    @patch('app.Preflight.token_error')
+    @patch('app.SwarmConfig.validate_token')
+    @patch('app.SwarmClient')
+    @patch.dict(os.environ, {"HF_TOKEN": "test-token"})
+    def test_run_swarm_rejected_by_preflight(self, mock_client_class, mock_validate, mock_token_error):
+        """Test that a token rejected by the startup preflight fails fast."""
+        mock_validate.return_value = (True, None)
+        mock_token_error.return_value = "401 Unauthorized"
+        
+        result = list(run_swarm("test task", "model", 0.7, 4096))
+        
+        assert len(result) == 1
+        assert "rejected" in result[0]
+        mock_client_class.assert_not_called()
+    
+    @patch('app.SwarmConfig.validate_token')
+    @patch('app.SwarmClient')
+    @patch.dict(os.environ, {"HF_TOKEN": "test-token", "SWARM_UI_FLUSH_INTERVAL_MS": "0"})
+    def test_run_swarm_turn_sends_prior_turns(self, mock_client_class, mock_validate):
+        """Test that a follow-up turn sends the previous turn as messages."""
+        mock_validate.return_value = (True, None)
+        mock_client = MagicMock()
+        mock_client.stream_chat_response.side_effect = [
+            ["Plan v1"],
+            ["Plan v2"],
+        ]
+        mock_client_class.return_value = mock_client
+        
+        first = list(run_swarm_turn("Design a tool", [], None, "model", 0.7, 4096, False))
+        history, session_id = first[-1]
+        assert history == [["Design a tool", "Plan v1"]]
+        assert session_id
+        
+        second = list(run_swarm_turn("Make it cheaper", history, session_id, "model", 0.7, 4096, False))
+        
+        assert second[-1] == ([["Design a tool", "Plan v1"], ["Make it cheaper", "Plan v2"]], session_id)
+        messages = mock_client.stream_chat_response.call_args_list[1].args[0]
+        assert [m["content"] for m in messages[:2]] == ["Design a tool", "Plan v1"]
+        assert "Follow-up: Make it cheaper" in messages[-1]["content"]
+    
+    @patch('app.SwarmConfig.validate_token')
+    @patch('app.SwarmClient')
+    @patch.dict(os.environ, {"HF_TOKEN": "test-token", "SWARM_UI_FLUSH_INTERVAL_MS": "0", "SWARM_STREAM_BUFFER_SIZE": "0"})
+    def test_run_swarm_turn_splits_agents_into_messages(self, mock_client_class, mock_validate):
+        """Test that each agent gets its own message and finished agents are not rebuilt."""
+        mock_validate.return_value = (True, None)
+        planner = "**Agent: Planner**\nScope it.\n\n**Risks:**\nNone.\n\n"
+        builder = "**Agent: Builder**\nShip it."
+        mock_client = MagicMock()
+        mock_client.stream_chat_response.return_value = [planner, planner + "**Agent: Build", planner + builder, planner + builder + " Now."]
+        mock_client_class.return_value = mock_client
+        
+        updates = [history for history, _ in run_swarm_turn("Design a tool", [], None, "model", 0.7, 4096, False)]
+        
+        assert updates[-1] == [["Design a tool", planner], [None, builder + " Now."]]
+        # The finished planner message is the same object in every later update
+        assert updates[-1][0][1] is updates[-2][0][1]
+        export_path = export_results(updates[-1], "Design a tool", "model")
+        with open(export_path, encoding="utf-8") as f:
+            exported = f.read()
+        os.remove(export_path)
+        assert planner + builder in exported
+    
+    @patch('app.SwarmConfig.validate_token')
+    @patch('app.SwarmClient')
+    @patch.dict(os.environ, {"HF_TOKEN": "test-token", "SWARM_UI_FLUSH_INTERVAL_MS": "0"})
+    def test_run_comparison_streams_each_model_to_its_pane(self, mock_client_class, mock_validate):
+        """Test that compare mode streams every model into its own pane and writes a report."""
+        mock_validate.return_value = (True, None)
+        
+        def client_for(model, **kwargs):
+            client = MagicMock()
+            client.stream_swarm_response.return_value = [f"{model} plan", f"{model} plan done"]
+            client.last_usage = None
+            return client
+        
+        mock_client_class.side_effect = client_for
+        models = SwarmConfig.AVAILABLE_MODELS[:2]
+        
+        result = list(run_comparison("test task", models, 0.7, 4096, save_report=True))
+        
+        stats, first_pane, second_pane, *unused, report_path = result[-1]
+        assert first_pane.endswith(f"{models[0]} plan done")
+        assert second_pane.endswith(f"{models[1]} plan done")
+        assert unused == [""] * (SwarmConfig.MAX_COMPARE_MODELS - 2)
+        assert stats.count("✅ done") == 2
+        with open(report_path, encoding="utf-8") as f:
+            assert f"RESPONSE: {models[1]}" in f.read()
+        os.remove(report_path)
+    
+    @patch('app.SwarmConfig.validate_token')
+    @patch('app.SwarmClient')
+    @patch.dict(os.environ, {"HF_TOKEN": "test-token", "SWARM_UI_FLUSH_INTERVAL_MS": "0"})
+    def test_run_comparison_reports_unwritable_report(self, mock_client_class, mock_validate, tmp_path, monkeypatch):
+        """Test that a report that cannot be written is shown as an error instead of failing the run."""
+        mock_validate.return_value = (True, None)
+        mock_client = MagicMock()
+        mock_client.stream_swarm_response.return_value = ["plan", "plan done"]
+        mock_client.last_usage = None
+        mock_client_class.return_value = mock_client
+        blocker = tmp_path / "not_a_directory"
+        blocker.write_text("")
+        monkeypatch.setenv("SWARM_EXPORT_DIR", str(blocker / "exports"))
+        
+        result = list(run_comparison("test task", SwarmConfig.AVAILABLE_MODELS[:2], 0.7, 4096, save_report=True))
+        
+        stats, *_, report_path = result[-1]
+        assert report_path is None
+        assert "Could not save the comparison report" in stats
+    
+    @patch.dict(os.environ, {"SWARM_EXPORT_MAX_FILES": "2"})
+    def test_exports_are_pruned(self):
+        """Test that only the newest SWARM_EXPORT_MAX_FILES exports are kept."""
+        paths = []
+        for i in range(3):
+            paths.append(export_results([["task", f"response {i}"]], "task", "model"))
+            # Distinct modification times, oldest first
+            os.utime(paths[-1], (time.time() - 30 + i, time.time() - 30 + i))
+        
+        assert [os.path.exists(path) for path in paths] == [False, True, True]
+        if hasattr(os, "getuid"):
+            assert os.stat(os.path.dirname(paths[-1])).st_mode & 0o777 == 0o700
+    
+    def test_run_comparison_requires_two_models(self):
+        """Test that compare mode rejects a single model before any request."""
+        result = list(run_comparison("test task", [SwarmConfig.DEFAULT_MODEL], 0.7, 4096))
+        
+        assert len(result) == 1
+        assert "at least two" in result[0][0]
+        assert result[0][-1] is None
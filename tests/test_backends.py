@@ -0,0 +1,187 @@
+"""Tests for pluggable inference backends."""
+
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from utils.api import SwarmClient
+from utils.backends import LlamaCppBackend, OpenAICompatibleBackend, create_backend
+from utils.config import SwarmConfig
+from utils.errors import APIError, ConfigurationError
+
+
+@pytest.fixture
+def openai_server():
+    """Serve a canned OpenAI-compatible stream on localhost; yields (base_url, requests)."""
+    requests = []
+    release = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            requests.append((self.path, dict(self.headers), body))
+            if body["messages"][-1]["content"] == "throttle me":
+                self.send_response(429)
+                self.send_header("Retry-After", "7")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            if body["messages"][-1]["content"] == "stall me":
+                self.wfile.write(b'data: {"choices": [{"delta": {"content": "Draft"}}]}\n\n')
+                self.wfile.flush()
+                release.wait(timeout=5)
+                return
+            events = [
+                {"choices": [{"delta": {"role": "assistant"}}]},
+                {"choices": [{"delta": {"content": "Local"}}]},
+                {"choices": [{"delta": {"content": " swarm"}}]},
+                {"choices": [], "usage": {"prompt_tokens": 12, "completion_tokens": 2}},
+            ]
+            for event in events:
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1", requests
+    release.set()
+    server.shutdown()
+    server.server_close()
+
+
+class TestBackendConfig:
+    """Test suite for per-model backend selection."""
+
+    def test_parses_backend_table(self):
+        """Test shorthand and object entries, ignoring unknown backends."""
+        raw = json.dumps({
+            "local/tiny": "openai",
+            "local/phi": {"backend": "local", "model_path": "/m/phi.gguf"},
+            "bad/model": {"backend": "carrier-pigeon"},
+        })
+        with patch.dict(os.environ, {"SWARM_MODEL_BACKENDS": raw}):
+            assert SwarmConfig.get_backend("local/tiny") == {"backend": "openai"}
+            assert SwarmConfig.get_backend("local/phi")["model_path"] == "/m/phi.gguf"
+            assert SwarmConfig.get_backend("bad/model") == {"backend": "hf"}
+            assert SwarmConfig.get_available_models()[-2:] == ["local/tiny", "local/phi"]
+            assert "local/tiny" not in SwarmConfig.get_hf_models()
+
+    @patch.dict(os.environ, {"SWARM_MODEL_BACKENDS": '{"local/tiny": "openai"}'}, clear=True)
+    def test_local_models_need_no_hf_token(self):
+        """Test that HF_TOKEN is only required for Hugging Face models."""
+        assert SwarmConfig.validate_token("local/tiny") == (True, None)
+        assert not SwarmConfig.validate_token(SwarmConfig.DEFAULT_MODEL)[0]
+
+    def test_hf_models_use_inference_client(self):
+        """Test that unconfigured models keep the Hugging Face backend."""
+        assert create_backend(SwarmConfig.DEFAULT_MODEL) is None
+
+
+class TestOpenAICompatibleBackend:
+    """Test suite for the OpenAI-compatible HTTP backend."""
+
+    def test_streams_through_swarm_client(self, openai_server):
+        """Test that SwarmClient streams, and counts usage, from a local server."""
+        base_url, requests = openai_server
+        backends = {"local/tiny": {"backend": "openai", "base_url": base_url, "model": "tiny", "api_key_env": "LOCAL_KEY"}}
+        with patch.dict(os.environ, {"SWARM_MODEL_BACKENDS": json.dumps(backends), "LOCAL_KEY": "secret"}):
+            client = SwarmClient(model="local/tiny")
+            chunks = list(client.stream_swarm_response("Design a tool", max_tokens=64))
+
+        assert chunks == ["Local", "Local swarm"]
+        assert client.backend == "openai"
+        assert client.pool is None
+        assert (client.last_usage.prompt_tokens, client.last_usage.completion_tokens) == (12, 2)
+        path, headers, body = requests[0]
+        assert path == "/v1/chat/completions"
+        assert headers["Authorization"] == "Bearer secret"
+        assert body["model"] == "tiny" and body["max_tokens"] == 64 and body["stream"] is True
+
+    def test_cancel_closes_a_stalled_stream(self, openai_server):
+        """Test that cancel() from another thread frees a stream waiting for its next chunk."""
+        base_url, _ = openai_server
+        backends = {"local/tiny": {"backend": "openai", "base_url": base_url}}
+        with patch.dict(os.environ, {"SWARM_MODEL_BACKENDS": json.dumps(backends)}):
+            client = SwarmClient(model="local/tiny")
+            chunks = []
+            first = threading.Event()
+
+            def consume():
+                for chunk in client.stream_swarm_response("stall me"):
+                    chunks.append(chunk)
+                    first.set()
+
+            reader = threading.Thread(target=consume, daemon=True)
+            reader.start()
+            assert first.wait(timeout=5)
+
+            client.cancel()
+
+            assert client.wait_idle(timeout_s=2)
+            reader.join(timeout=2)
+        assert not reader.is_alive()
+        assert chunks == ["Draft"]
+        assert client.limiter.stats()["in_flight"] == 0
+        assert client.usage.total_tokens > 0
+
+    def test_http_errors_keep_status(self, openai_server):
+        """Test that HTTP errors surface as APIError with status and Retry-After."""
+        base_url, _ = openai_server
+        backend = OpenAICompatibleBackend("tiny", base_url)
+
+        with pytest.raises(APIError) as excinfo:
+            backend.chat_completion([{"role": "user", "content": "throttle me"}], max_tokens=8)
+
+        assert (excinfo.value.status_code, excinfo.value.retry_after) == (429, 7.0)
+
+    def test_unreachable_server_raises_api_error(self):
+        """Test that a server that is down is reported as an APIError."""
+        backend = OpenAICompatibleBackend("tiny", "http://127.0.0.1:9/v1", timeout=1)
+
+        with pytest.raises(APIError, match="Could not reach"):
+            backend.chat_completion([{"role": "user", "content": "hi"}], max_tokens=8)
+
+
+class TestLlamaCppBackend:
+    """Test suite for the in-process CPU backend."""
+
+    def test_missing_dependency_is_a_configuration_error(self, tmp_path):
+        """Test that a missing llama-cpp-python install is reported clearly."""
+        with patch.dict(sys.modules, {"llama_cpp": None}):
+            with pytest.raises(ConfigurationError, match="llama-cpp-python"):
+                LlamaCppBackend(str(tmp_path / "model.gguf"))
+
+    def test_streams_local_model(self, tmp_path):
+        """Test that llama.cpp stream chunks are converted for SwarmClient."""
+        model_path = tmp_path / "model.gguf"
+        model_path.write_bytes(b"GGUF")
+        loads = []
+
+        class FakeLlama:
+            def __init__(self, model_path, **kwargs):
+                loads.append(model_path)
+
+            def create_chat_completion(self, messages, max_tokens, temperature, stream):
+                yield {"choices": [{"delta": {"content": "CPU"}}]}
+                yield {"choices": [{"delta": {"content": " answer"}}]}
+
+        backends = {"local/phi": {"backend": "local", "model_path": str(model_path)}}
+        with patch.dict(sys.modules, {"llama_cpp": SimpleNamespace(Llama=FakeLlama)}), \
+                patch.dict(os.environ, {"SWARM_MODEL_BACKENDS": json.dumps(backends)}), \
+                patch.dict(LlamaCppBackend._models, clear=True):
+            first = list(SwarmClient(model="local/phi").stream_swarm_response("Plan"))
+            second = list(SwarmClient(model="local/phi").stream_swarm_response("Plan"))
+
+        assert first == second == ["CPU", "CPU answer"]
+        # The model is loaded once and shared
+        assert loads == [str(model_path)]
@@ -0,0 +1,93 @@
+"""Tests for the benchmark harness."""
+
+from benchmarks.harness import Benchmark, compare_results, measure_peak_memory, run_benchmark
+from benchmarks.soak import check_slopes, fit_slope, run_soak
+
+
+def make_results(median_s, peak_bytes=1000):
+    """Build a minimal results document with one benchmark."""
+    return {"benchmarks": {"bench": {"median_s": median_s, "peak_bytes": peak_bytes}}}
+
+
+class TestCompareResults:
+    """Test suite for baseline comparison."""
+
+    def test_flags_time_regression_beyond_threshold(self):
+        """Test that slowdowns over the threshold are flagged."""
+        rows = compare_results(make_results(1.0), make_results(1.3), threshold=0.2)
+
+        assert rows[0]["time_ratio"] == 1.3
+        assert rows[0]["time_regression"] is True
+        assert rows[0]["memory_regression"] is False
+
+    def test_within_threshold_is_not_a_regression(self):
+        """Test that small slowdowns and speedups pass."""
+        assert compare_results(make_results(1.0), make_results(1.1))[0]["time_regression"] is False
+        assert compare_results(make_results(1.0), make_results(0.5))[0]["time_regression"] is False
+
+    def test_flags_memory_regression(self):
+        """Test that peak memory growth over the threshold is flagged."""
+        rows = compare_results(make_results(1.0, 1000), make_results(1.0, 2000), memory_threshold=0.5)
+
+        assert rows[0]["memory_regression"] is True
+
+    def test_skips_benchmarks_missing_from_baseline(self):
+        """Test that new benchmarks are not compared."""
+        current = {"benchmarks": {"new": {"median_s": 1.0, "peak_bytes": 0}}}
+        assert compare_results(make_results(1.0), current) == []
+
+
+def test_run_benchmark_reports_per_call_times():
+    """Test that a benchmark run reports timing and memory fields."""
+    result = run_benchmark(Benchmark("sum", lambda: sum(range(100)), "micro"), repeat=2, min_time=0.01)
+
+    assert result["group"] == "micro"
+    assert 0 < result["min_s"] <= result["median_s"]
+    assert result["number"] >= 1
+    assert result["repeat"] == 2
+
+
+def test_measure_peak_memory_tracks_allocations():
+    """Test that peak memory reflects allocations made by the function."""
+    peak = measure_peak_memory(lambda: bytearray(1024 * 1024))
+
+    assert peak >= 1024 * 1024
+
+
+class TestSoak:
+    """Test suite for the soak harness."""
+
+    def test_fit_slope_is_least_squares(self):
+        """Test the fitted slope of noisy and flat series."""
+        assert fit_slope([(0, 1), (1, 3), (2, 5), (3, 7)]) == 2
+        assert fit_slope([(0, 4), (1, 4), (2, 4)]) == 0
+        assert fit_slope([(0, 1), (1, 2)]) is None
+
+    def test_check_slopes_ignores_warmup_and_flags_growth(self):
+        """Test that growth after warmup is compared to per-hour limits."""
+        samples = [
+            {"elapsed_s": t * 600, "open_fds": 10 + (50 if t == 0 else t), "threads": 4}
+            for t in range(7)
+        ]
+
+        slopes, violations = check_slopes(samples, {"open_fds": 5, "threads": 1}, warmup_s=600)
+
+        assert round(slopes["open_fds"]) == 6
+        assert slopes["threads"] == 0
+        assert violations == ["open_fds grows 6.0/h (limit 5.0/h)"]
+
+    def test_run_soak_samples_temp_file_growth(self, tmp_path):
+        """Test that a workload leaking temp files shows up in the time series."""
+        now = [0.0]
+
+        def leaky_workload(iteration):
+            (tmp_path / f"export_{iteration}.txt").write_text("x" * 100)
+            now[0] += 1
+
+        samples = run_soak(leaky_workload, duration_s=10, interval_s=2, tmp_dir=str(tmp_path),
+                           trace_frames=0, clock=lambda: now[0])
+
+        assert [sample["elapsed_s"] for sample in samples] == [0, 2, 4, 6, 8, 10]
+        assert samples[-1]["iterations"] == 10
+        assert (samples[-1]["tmp_files"], samples[-1]["tmp_bytes"]) == (10, 1000)
+        assert samples[-1]["threads"] >= 1
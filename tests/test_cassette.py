@@ -0,0 +1,116 @@
+"""Tests for stream record/replay cassettes."""
+
+from unittest.mock import MagicMock, Mock
+
+import pytest
+from utils.api import SwarmClient
+from utils.cassette import (
+    RecordingInferenceClient,
+    ReplayInferenceClient,
+    StreamCassette,
+    synthetic_cassette,
+)
+
+
+def make_message(content):
+    """Build a mocked chat_completion stream chunk."""
+    message = MagicMock()
+    message.choices = [MagicMock()]
+    message.choices[0].delta.content = content
+    return message
+
+
+class TickClock:
+    """Clock that advances by a fixed step on every call."""
+
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        value = self.now
+        self.now += self.step
+        return value
+
+
+class TestRecording:
+    """Test suite for RecordingInferenceClient."""
+
+    def test_records_chunks_with_offsets(self):
+        """Test that streamed chunks are captured with their arrival offsets."""
+        inner = Mock()
+        inner.chat_completion.return_value = iter([
+            make_message("Hello"),
+            make_message(""),
+            make_message(" World"),
+        ])
+        recorder = RecordingInferenceClient(inner, model="test-model", clock=TickClock(0.25))
+        client = SwarmClient(model="test-model", token="test-token", client=recorder)
+
+        chunks = list(client.stream_swarm_response("prompt", max_tokens=128, temperature=0.5))
+
+        assert chunks == ["Hello", "Hello World"]
+        cassette = recorder.last_cassette
+        assert cassette.chunks == [(0.25, "Hello"), (0.5, " World")]
+        assert cassette.metadata["max_tokens"] == 128
+        assert cassette.model == "test-model"
+
+
+class TestCassetteFile:
+    """Test suite for cassette serialisation."""
+
+    @pytest.mark.parametrize("filename", ["stream.json", "stream.json.gz"])
+    def test_round_trip(self, tmp_path, filename):
+        """Test that cassettes survive save and load."""
+        cassette = StreamCassette("m", [(0.5, "a"), (0.5123, "b")], {"note": "x"})
+        path = str(tmp_path / filename)
+
+        cassette.save(path)
+        loaded = StreamCassette.load(path)
+
+        assert loaded.model == "m"
+        assert loaded.chunks == [(0.5, "a"), (0.5123, "b")]
+        assert loaded.metadata == {"note": "x"}
+
+    def test_rejects_unknown_version(self):
+        """Test that unsupported cassette versions are rejected."""
+        with pytest.raises(ValueError, match="version"):
+            StreamCassette.from_dict({"version": 99, "chunks": []})
+
+
+class TestReplay:
+    """Test suite for ReplayInferenceClient."""
+
+    def test_replays_through_swarm_client_instantly(self):
+        """Test that speed 0 replays the recorded text without sleeping."""
+        cassette = synthetic_cassette(200, seed=3)
+        sleep = Mock()
+        client = SwarmClient(model="m", token="t", client=ReplayInferenceClient(cassette, speed=0, sleep=sleep))
+
+        chunks = list(client.stream_swarm_response("prompt"))
+
+        assert len(chunks) == 200
+        assert chunks[-1] == cassette.text
+        sleep.assert_not_called()
+
+    def test_replays_scaled_timing(self):
+        """Test that recorded gaps are divided by the speed multiplier."""
+        cassette = StreamCassette("m", [(1.0, "a"), (1.5, "b"), (3.5, "c")])
+        sleep = Mock()
+        replay = ReplayInferenceClient(cassette, speed=2.0, sleep=sleep)
+
+        list(SwarmClient(model="m", token="t", client=replay).stream_swarm_response("prompt"))
+
+        assert [call.args[0] for call in sleep.call_args_list] == [0.5, 0.25, 1.0]
+        assert replay.calls[0]["stream"] is True
+
+
+def test_synthetic_cassette_is_deterministic():
+    """Test that the same seed produces the same cassette."""
+    first = synthetic_cassette(500, seed=7)
+    second = synthetic_cassette(500, seed=7)
+
+    assert first.chunks == second.chunks
+    assert len(first.chunks) == 500
+    assert first.ttft_s == 0.5
+    assert "**Agent: Role 1**" in first.text
@@ -0,0 +1,104 @@
+"""Tests for side-by-side model comparison."""
+
+import threading
+from types import SimpleNamespace
+
+from utils.compare import ModelRun, format_comparison_report, format_comparison_table, stream_comparison
+from utils.errors import APIError
+
+
+class FakeClient:
+    """Stand-in for SwarmClient streaming fixed chunks, optionally after a gate."""
+
+    def __init__(self, chunks, gate=None, error=None, completion_tokens=None):
+        self.chunks = chunks
+        self.gate = gate
+        self.error = error
+        self.last_usage = SimpleNamespace(completion_tokens=completion_tokens) if completion_tokens else None
+        self.cancelled = False
+        self.waited = False
+
+    def cancel(self):
+        self.cancelled = True
+        if self.gate is not None:
+            self.gate.set()
+
+    def wait_idle(self, timeout_s):
+        self.waited = True
+        return True
+
+    def stream_swarm_response(self, prompt, max_tokens=4096, temperature=0.7):
+        if self.gate is not None:
+            self.gate.wait(2)
+        yield from self.chunks
+        if self.error is not None:
+            raise self.error
+
+
+class TestStreamComparison:
+    """Test suite for stream_comparison."""
+
+    def test_models_stream_concurrently(self):
+        """Test that a fast model finishes while a slow one has not started."""
+        gate = threading.Event()
+        clients = {
+            "slow": FakeClient(["Slow", "Slow done"], gate=gate),
+            "fast": FakeClient(["Fast", "Fast done"], completion_tokens=40),
+        }
+        stream = stream_comparison(clients, "prompt")
+
+        for runs in stream:
+            if runs[1].done:
+                break
+        assert runs[0].first_token_s is None
+        assert runs[1].text == "Fast done"
+        assert runs[1].tokens() == 40
+
+        gate.set()
+        final = list(stream)[-1]
+        assert [run.text for run in final] == ["Slow done", "Fast done"]
+        assert all(run.done and run.error is None for run in final)
+
+    def test_early_exit_cancels_and_drains_unfinished_models(self):
+        """Test that closing the comparison cancels the models still streaming and waits for them."""
+        clients = {
+            "slow": FakeClient(["Slow"], gate=threading.Event()),
+            "fast": FakeClient(["Fast"]),
+        }
+        stream = stream_comparison(clients, "prompt")
+        for runs in stream:
+            if runs[1].done:
+                break
+
+        stream.close()
+
+        assert clients["slow"].cancelled and clients["slow"].waited
+        assert not clients["fast"].cancelled
+
+    def test_failing_model_does_not_stop_others(self):
+        """Test that one model's error is recorded on its run only."""
+        clients = {
+            "broken": FakeClient(["Partial"], error=APIError("boom")),
+            "ok": FakeClient(["Fine"]),
+        }
+
+        final = list(stream_comparison(clients, "prompt"))[-1]
+
+        assert "boom" in final[0].error and final[0].text == "Partial"
+        assert final[1].text == "Fine" and final[1].error is None
+
+
+def test_table_and_report():
+    """Test the live stats table and the saved report."""
+    done = ModelRun("org/a")
+    done.text, done.first_token_s, done.total_s, done.completion_tokens = "Answer", 0.5, 2.5, 100
+    waiting = ModelRun("org/b")
+
+    table = format_comparison_table([done, waiting], now_s=1.0)
+    assert "| org/a | 0.50s | 50.0 | 2.50s | 100 | ✅ done |" in table
+    assert "⏳ waiting" in table
+
+    waiting.total_s, waiting.error = 3.0, "timeout"
+    report = format_comparison_report("Design a tool", [done, waiting], {"Temperature": 0.7})
+    assert "Wall-clock time: 3.00s" in report
+    assert "RESPONSE: org/b" in report and "❌ timeout" in report
@@ -0,0 +1,108 @@
+"""Tests for input compression utilities."""
+
+from unittest.mock import MagicMock
+
+from utils.compression import compress_task, compress_text, summarize_text
+from utils.errors import APIError
+
+
+class TestCompressText:
+    """Test suite for local compression."""
+
+    def test_collapses_consecutive_repeats_ignoring_timestamps(self):
+        """Test that repeated log lines are folded into a repeat marker."""
+        text = "\n".join([
+            "2025-01-01 10:00:00,001 WARN retrying connection",
+            "2025-01-01 10:00:01,002 WARN retrying connection",
+            "2025-01-01 10:00:02,003 WARN retrying connection",
+            "done",
+        ])
+        compressed, removed = compress_text(text)
+
+        assert compressed.count("retrying connection") == 1
+        assert "[previous line repeated 2 more times]" in compressed
+        assert compressed.endswith("done")
+        assert removed == 2
+
+    def test_collapses_whitespace_and_separators(self):
+        """Test that blank runs, inner whitespace and separators are squashed."""
+        text = "Title\n==========\n\n\n\nsome    spaced     words   \n-----\n-----\nend"
+        compressed, _ = compress_text(text)
+
+        assert compressed == "Title\n---\n\nsome spaced words\n---\nend"
+
+    def test_preserves_indentation_and_short_duplicates(self):
+        """Test that indentation and short repeated lines are kept."""
+        text = "def a():\n    return None\n\ndef b():\n    return None"
+        compressed, removed = compress_text(text)
+
+        assert compressed == text
+        assert removed == 0
+
+    def test_drops_long_non_adjacent_duplicates(self):
+        """Test that long lines seen earlier are removed."""
+        boilerplate = "This message is confidential and intended only for the recipient."
+        text = f"{boilerplate}\nfirst\n{boilerplate}\nsecond"
+        compressed, removed = compress_text(text)
+
+        assert compressed == f"{boilerplate}\nfirst\nsecond"
+        assert removed == 1
+
+
+class TestCompressTask:
+    """Test suite for compress_task."""
+
+    def test_records_statistics(self):
+        """Test that ratio and token counts are recorded."""
+        task = "Fix this error:\n" + "ERROR something broke in the worker pool\n" * 50
+        result = compress_task(task)
+
+        assert result.ratio < 0.2
+        assert result.compressed_tokens < result.original_tokens
+        assert result.elapsed_s >= 0
+        assert result.estimated_seconds_saved(1000.0) > 0
+        assert result.summarized is False
+
+    def test_summarizes_over_threshold(self):
+        """Test that inputs over the threshold are summarized with the client."""
+        client = MagicMock()
+        client.stream_swarm_response.side_effect = lambda *args, **kwargs: iter(["sum", "summary"])
+        task = "\n".join(f"unique line number {i} with enough text" for i in range(200))
+
+        result = compress_task(task, client=client, summarize_threshold=500)
+
+        assert result.summarized is True
+        assert result.text.startswith("summary")
+        assert len(result.text) < len(task)
+        assert client.stream_swarm_response.call_count >= 2
+
+    def test_skips_summary_under_threshold(self):
+        """Test that short inputs never call the model."""
+        client = MagicMock()
+        result = compress_task("Design a viral AI tool", client=client, summarize_threshold=500)
+
+        client.stream_swarm_response.assert_not_called()
+        assert result.text == "Design a viral AI tool"
+
+    def test_summary_failure_keeps_local_result(self):
+        """Test that summarization errors fall back to local compression."""
+        client = MagicMock()
+        client.stream_swarm_response.side_effect = APIError("down")
+        task = "\n".join(f"unique line number {i} with enough text" for i in range(200))
+
+        result = compress_task(task, client=client, summarize_threshold=500)
+
+        assert result.summarized is False
+        assert result.text == task
+
+
+def test_summarize_text_reduces_map_outputs():
+    """Test that joined map summaries over the threshold are reduced again."""
+    client = MagicMock()
+    client.stream_swarm_response.side_effect = lambda *args, **kwargs: iter(["x" * 400])
+
+    summary = summarize_text("a" * 3000 + "\n" + "b" * 3000, client, threshold_tokens=150)
+
+    # The joined map summaries exceed the threshold, so a reduce call follows
+    assert client.stream_swarm_response.call_count > 2
+    assert summary == "x" * 400
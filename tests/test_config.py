@@ -0,0 +1,158 @@
+"""Tests for config snapshots and hot reload."""
+
+import json
+import os
+import signal
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from utils.config import ConfigWatcher, SwarmConfig
+
+
+def write_config(path, **settings):
+    path.write_text(json.dumps(settings))
+
+
+class TestConfigSnapshot:
+    """Test suite for loading and validating snapshots."""
+
+    def test_environment_overrides_config_file(self, tmp_path, monkeypatch):
+        """Test that file settings apply unless the environment sets them too."""
+        config_file = tmp_path / "swarm.json"
+        write_config(
+            config_file,
+            SWARM_MAX_TOKENS=2048,
+            SWARM_PREVIEW=True,
+            SWARM_MODELS=["org/a", "org/b"],
+            SWARM_TEMPERATURE=0.1,
+        )
+        monkeypatch.setenv("SWARM_CONFIG_FILE", str(config_file))
+        monkeypatch.setenv("SWARM_TEMPERATURE", "0.9")
+
+        assert SwarmConfig.get_max_tokens() == 2048
+        assert SwarmConfig.get_preview_enabled()
+        assert SwarmConfig.get_available_models() == ["org/a", "org/b"]
+        assert SwarmConfig.get_temperature() == 0.9
+
+    def test_invalid_values_fall_back_and_are_reported(self, monkeypatch):
+        """Test that invalid values are dropped and listed instead of silently ignored."""
+        monkeypatch.setenv("SWARM_MAX_TOKENS", "lots")
+        monkeypatch.setenv("SWARM_BUDGET_ACTION", "panic")
+        monkeypatch.setenv("SWARM_MODEL_COSTS", "[1, 2]")
+
+        snapshot = SwarmConfig.current()
+
+        assert SwarmConfig.get_max_tokens() == SwarmConfig.DEFAULT_MAX_TOKENS
+        assert len(snapshot.errors) == 3
+        assert any("SWARM_MAX_TOKENS" in error for error in snapshot.errors)
+        assert snapshot.summary()["invalid_settings"] == list(snapshot.errors)
+
+    def test_snapshot_is_read_only(self):
+        """Test that a snapshot's values cannot be changed in place."""
+        snapshot = SwarmConfig.load_snapshot({"SWARM_MODEL": "org/a"})
+
+        try:
+            snapshot.values["SWARM_MODEL"] = "org/b"
+        except TypeError:
+            pass
+        assert snapshot.get("SWARM_MODEL") == "org/a"
+
+
+class TestReload:
+    """Test suite for swapping snapshots at runtime."""
+
+    def test_reload_swaps_snapshot_and_logs_changes(self, tmp_path, monkeypatch):
+        """Test that a reload applies file changes while held snapshots stay unchanged."""
+        config_file = tmp_path / "swarm.json"
+        write_config(config_file, SWARM_MODEL="org/a")
+        monkeypatch.setenv("SWARM_CONFIG_FILE", str(config_file))
+        in_flight = SwarmConfig.current()
+
+        write_config(config_file, SWARM_MODEL="org/b")
+        with patch("utils.config.SwarmLogger.log_config_change") as log_change:
+            reloaded = SwarmConfig.reload(reason="sighup")
+
+        assert SwarmConfig.get_model() == "org/b"
+        assert in_flight.get("SWARM_MODEL") == "org/a"
+        assert reloaded.version > in_flight.version
+        log_change.assert_called_once_with("SWARM_MODEL", "org/a", "org/b")
+
+    def test_broken_config_file_keeps_current_snapshot(self, tmp_path, monkeypatch):
+        """Test that an unreadable config file does not replace a working config."""
+        config_file = tmp_path / "swarm.json"
+        write_config(config_file, SWARM_MODEL="org/a")
+        monkeypatch.setenv("SWARM_CONFIG_FILE", str(config_file))
+        before = SwarmConfig.current()
+
+        config_file.write_text("{not json")
+
+        assert SwarmConfig.reload() is before
+        assert SwarmConfig.get_model() == "org/a"
+
+    def test_watcher_reloads_on_file_change(self, tmp_path, monkeypatch):
+        """Test that the file watcher picks up edits without a restart."""
+        config_file = tmp_path / "swarm.json"
+        write_config(config_file, SWARM_MAX_TOKENS=1000)
+        monkeypatch.setenv("SWARM_CONFIG_FILE", str(config_file))
+        monkeypatch.setenv("SWARM_CONFIG_POLL_SECONDS", "0.02")
+        assert SwarmConfig.get_max_tokens() == 1000
+
+        assert ConfigWatcher.start()
+        try:
+            write_config(config_file, SWARM_MAX_TOKENS=3000, SWARM_PREVIEW=False)
+            deadline = time.monotonic() + 2
+            while SwarmConfig.get_max_tokens() != 3000 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            ConfigWatcher.stop()
+
+        assert SwarmConfig.get_max_tokens() == 3000
+
+    @pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="SIGHUP is POSIX-only")
+    def test_sighup_reloads_on_the_watcher_thread(self, monkeypatch):
+        """Test that the SIGHUP handler only wakes the watcher, which does the reload."""
+        monkeypatch.setenv("SWARM_MAX_TOKENS", "1000")
+        assert SwarmConfig.get_max_tokens() == 1000
+        reload_threads = []
+        real_reload = SwarmConfig.reload
+
+        def recording_reload(reason="manual"):
+            reload_threads.append((reason, threading.current_thread().name))
+            return real_reload(reason)
+
+        previous = signal.getsignal(signal.SIGHUP)
+        with patch.object(SwarmConfig, "reload", staticmethod(recording_reload)):
+            assert ConfigWatcher.start()
+            try:
+                monkeypatch.setenv("SWARM_MAX_TOKENS", "3000")
+                # Holding the snapshot lock in the main thread would deadlock a reloading handler
+                with SwarmConfig._snapshot_lock:
+                    os.kill(os.getpid(), signal.SIGHUP)
+                deadline = time.monotonic() + 2
+                while SwarmConfig.get_max_tokens() != 3000 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            finally:
+                ConfigWatcher.stop()
+
+        assert SwarmConfig.get_max_tokens() == 3000
+        assert reload_threads == [("sighup", "swarm-config-watcher")]
+        assert signal.getsignal(signal.SIGHUP) == previous
+
+    def test_concurrent_first_reads_load_once(self):
+        """Test that threads racing on the first read share one snapshot."""
+        barrier = threading.Barrier(8)
+        snapshots = []
+
+        def read():
+            barrier.wait()
+            snapshots.append(SwarmConfig.current())
+
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len({id(snapshot) for snapshot in snapshots}) == 1
@@ -0,0 +1,161 @@
+"""Tests for the multi-token credential pool."""
+
+import os
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+from utils.api import SwarmClient
+from utils.config import SwarmConfig
+from utils.credentials import CredentialPool
+from utils.errors import APIError
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class HTTPError(Exception):
+    """Upstream error carrying an HTTP response, like HfHubHTTPError."""
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"{status_code} error")
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+class TestCredentialPool:
+    """Test suite for CredentialPool selection and cooldowns."""
+
+    def test_least_loaded_prefers_idle_credentials(self):
+        """Test that least_loaded spreads concurrent leases across credentials."""
+        pool = CredentialPool(["a", "b", "c"])
+
+        leased = [pool.acquire() for _ in range(3)]
+
+        assert sorted(c.credential_id for c in leased) == ["cred-1", "cred-2", "cred-3"]
+
+    def test_round_robin_cycles(self):
+        """Test that round_robin hands out credentials in order."""
+        pool = CredentialPool(["a", "b"], strategy="round_robin")
+
+        ids = []
+        for _ in range(4):
+            credential = pool.acquire()
+            ids.append(credential.credential_id)
+            pool.release(credential)
+
+        assert ids == ["cred-1", "cred-2", "cred-1", "cred-2"]
+
+    def test_throttled_credential_cools_down(self):
+        """Test that a throttled credential is skipped until its cooldown expires."""
+        clock = FakeClock()
+        pool = CredentialPool(["a", "b"], strategy="round_robin", cooldown_s=30, clock=clock)
+
+        first = pool.acquire()
+        pool.release(first, throttled=True, status_code=429)
+        assert [pool.acquire().credential_id for _ in range(2)] == ["cred-2", "cred-2"]
+
+        clock.now += 31
+        assert {pool.acquire().credential_id for _ in range(2)} == {"cred-1", "cred-2"}
+
+    def test_retry_after_overrides_cooldown(self):
+        """Test that the upstream Retry-After sets the cooldown length."""
+        clock = FakeClock()
+        pool = CredentialPool(["a"], cooldown_s=60, clock=clock)
+
+        pool.release(pool.acquire(), throttled=True, retry_after=5)
+
+        with pytest.raises(APIError) as excinfo:
+            pool.acquire()
+        assert excinfo.value.status_code == 429
+        assert excinfo.value.retry_after == pytest.approx(5)
+        clock.now += 5
+        assert pool.acquire().credential_id == "cred-1"
+
+    def test_stats_never_include_tokens(self):
+        """Test that stats identify credentials without exposing tokens."""
+        pool = CredentialPool(["hf_secret_one", "hf_secret_two"])
+        credential = pool.acquire()
+        pool.release(credential, failed=True)
+
+        stats = pool.stats()
+
+        assert "hf_secret" not in repr(stats) + repr(credential)
+        assert stats[0]["requests"] == 1 and stats[0]["errors"] == 1
+        assert len(stats[0]["fingerprint"]) == 8
+
+
+class TestSharedPool:
+    """Test suite for the config-driven shared pool."""
+
+    def setup_method(self):
+        CredentialPool.reset_shared()
+
+    def teardown_method(self):
+        CredentialPool.reset_shared()
+
+    @patch.dict(os.environ, {"HF_TOKEN": "t1", "HF_TOKENS": "t2, t1\nt3"}, clear=True)
+    def test_tokens_from_config(self):
+        """Test that HF_TOKEN and HF_TOKENS are merged without duplicates."""
+        assert SwarmConfig.get_tokens() == ["t1", "t2", "t3"]
+        assert CredentialPool.shared().size == 3
+        assert CredentialPool.shared() is CredentialPool.shared()
+
+    @patch.dict(os.environ, {"HF_TOKENS": "t2,t3"}, clear=True)
+    def test_pool_only_configuration(self):
+        """Test that a pool without HF_TOKEN still provides a primary token."""
+        assert SwarmConfig.get_token() == "t2"
+        assert SwarmConfig.validate_token() == (True, None)
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_no_tokens(self):
+        """Test that no pool is built without tokens."""
+        assert CredentialPool.shared() is None
+
+
+class TestSwarmClientWithPool:
+    """Test suite for SwarmClient failover across pooled credentials."""
+
+    def test_throttled_request_fails_over(self):
+        """Test that a 429 before any output retries on another credential."""
+        pool = CredentialPool(["a", "b"], strategy="round_robin")
+        clients = {
+            "a": Mock(**{"chat_completion.side_effect": HTTPError(429, retry_after=12)}),
+            "b": Mock(**{"chat_completion.return_value": [chunk("Hi"), chunk("!")]}),
+        }
+
+        with patch("utils.api.InferenceClient", side_effect=lambda model, token: clients[token]):
+            client = SwarmClient(model="m", pool=pool)
+            results = list(client.stream_swarm_response("prompt"))
+
+        assert results == ["Hi", "Hi!"]
+        stats = {s["credential"]: s for s in pool.stats()}
+        assert stats["cred-1"]["throttled"] == 1
+        assert stats["cred-1"]["cooldown_remaining_s"] > 11
+        assert stats["cred-2"]["successes"] == 1
+        assert all(s["in_flight"] == 0 for s in stats.values())
+
+    def test_non_throttle_errors_are_not_retried(self):
+        """Test that other upstream errors surface immediately."""
+        pool = CredentialPool(["a", "b"])
+        failing = Mock(**{"chat_completion.side_effect": HTTPError(500)})
+
+        with patch("utils.api.InferenceClient", return_value=failing):
+            client = SwarmClient(model="m", pool=pool)
+            with pytest.raises(APIError) as excinfo:
+                list(client.stream_swarm_response("prompt"))
+
+        assert excinfo.value.status_code == 500
+        assert failing.chat_completion.call_count == 1
+        assert sum(s["errors"] for s in pool.stats()) == 1
@@ -0,0 +1,176 @@
+"""Tests for the adaptive (AIMD) concurrency limiter."""
+
+import os
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from utils.api import SwarmClient
+from utils.credentials import CredentialPool
+from utils.errors import APIError
+from utils.limiter import AdaptiveLimiters, AIMDLimiter
+from utils.metrics import SwarmMetrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(limiter, clock, ttft_s=0.1, status_code=None):
+    """Acquire a slot, advance the clock by ttft_s and release it with the outcome."""
+    permit = limiter.acquire(timeout_s=0)
+    clock.now += ttft_s
+    limiter.release(permit, ttft_s=None if status_code else ttft_s, status_code=status_code)
+
+
+class TestAIMDLimiter:
+    """Test suite for additive increase and multiplicative decrease."""
+
+    def test_grows_additively_while_saturated_and_healthy(self):
+        """Test that the limit grows by about one per limit's worth of healthy requests."""
+        clock = FakeClock()
+        limiter = AIMDLimiter("org/model", initial=2, max_limit=4, clock=clock)
+
+        for _ in range(2):
+            permits = [limiter.acquire(timeout_s=0) for _ in range(limiter.current_limit)]
+            for permit in permits:
+                limiter.release(permit, ttft_s=0.1)
+
+        assert limiter.current_limit == 3
+        for _ in range(20):
+            permits = [limiter.acquire(timeout_s=0) for _ in range(limiter.current_limit)]
+            for permit in permits:
+                limiter.release(permit, ttft_s=0.1)
+        assert limiter.current_limit == 4
+
+    def test_unused_capacity_does_not_grow_the_limit(self):
+        """Test that requests below the limit do not raise it."""
+        clock = FakeClock()
+        limiter = AIMDLimiter("org/model", initial=4, clock=clock)
+
+        for _ in range(10):
+            run(limiter, clock)
+
+        assert limiter.current_limit == 4
+        assert limiter.stats()["increases"] == 0
+
+    @pytest.mark.parametrize("status_code, reason", [(429, "throttled"), (503, "server_error")])
+    def test_overload_halves_the_limit(self, status_code, reason):
+        """Test that 429 and 5xx responses cut the limit multiplicatively."""
+        clock = FakeClock()
+        limiter = AIMDLimiter("org/model", initial=8, clock=clock)
+
+        run(limiter, clock, status_code=status_code)
+
+        assert limiter.current_limit == 4
+        assert SwarmMetrics.snapshot()["counters"][
+            f'limiter.decreases{{model="org/model",reason="{reason}"}}'
+        ] >= 1
+
+    def test_client_errors_do_not_cut_the_limit(self):
+        """Test that failures unrelated to load leave the limit alone."""
+        clock = FakeClock()
+        limiter = AIMDLimiter("org/model", initial=8, clock=clock)
+
+        run(limiter, clock, status_code=400)
+
+        assert limiter.current_limit == 8
+
+    def test_one_burst_of_failures_cuts_once(self):
+        """Test that requests started before a cut cannot cut the limit again."""
+        clock = FakeClock()
+        limiter = AIMDLimiter("org/model", initial=8, clock=clock)
+        permits = [limiter.acquire(timeout_s=0) for _ in range(4)]
+        clock.now += 1
+
+        for permit in permits:
+            limiter.release(permit, status_code=429)
+
+        assert limiter.current_limit == 4
+        clock.now += 1
+        run(limiter, clock, status_code=429)
+        assert limiter.current_limit == 2
+
+    def test_latency_spikes_cut_the_limit(self):
+        """Test that a TTFT far above the baseline, or above the SLO, counts as overload."""
+        clock = FakeClock()
+        limiter = AIMDLimiter("org/model", initial=8, ttft_slo_s=5.0, clock=clock)
+        for _ in range(AIMDLimiter.MIN_BASELINE_SAMPLES):
+            run(limiter, clock, ttft_s=0.2)
+
+        run(limiter, clock, ttft_s=1.0)
+        assert limiter.current_limit == 4
+
+        limiter = AIMDLimiter("org/model", initial=8, ttft_slo_s=5.0, clock=clock)
+        run(limiter, clock, ttft_s=6.0)
+        assert limiter.current_limit == 4
+
+    def test_never_drops_below_minimum(self):
+        """Test that repeated cuts stop at the minimum limit."""
+        clock = FakeClock()
+        limiter = AIMDLimiter("org/model", initial=4, min_limit=2, clock=clock)
+
+        for _ in range(5):
+            run(limiter, clock, status_code=429)
+
+        assert limiter.current_limit == 2
+
+    def test_waits_for_a_slot_and_times_out(self):
+        """Test that requests over the limit wait, and fail with 503 if none frees up."""
+        limiter = AIMDLimiter("org/model", initial=1)
+        held = limiter.acquire(timeout_s=0)
+
+        with pytest.raises(APIError) as excinfo:
+            limiter.acquire(timeout_s=0.01)
+        assert excinfo.value.status_code == 503
+
+        timer = threading.Timer(0.05, limiter.release, args=(held,), kwargs={"ttft_s": 0.1})
+        timer.start()
+        permit = limiter.acquire(timeout_s=2)
+        limiter.release(permit)
+        timer.join()
+        assert limiter.stats()["in_flight"] == 0
+
+
+class TestSwarmClientLimiting:
+    """Test suite for limiting SwarmClient requests."""
+
+    def test_throttled_stream_cuts_the_model_limit(self):
+        """Test that a 429 from upstream reaches the model's limiter and the gauges."""
+        backend = SimpleNamespace(chat_completion=lambda **kwargs: (_ for _ in ()).throw(
+            APIError("slow down", status_code=429)
+        ))
+        with patch.dict(os.environ, {"SWARM_LIMITER_INITIAL": "6"}), \
+                patch("utils.api.create_backend", return_value=backend):
+            client = SwarmClient(model="local/tiny")
+            with pytest.raises(APIError):
+                list(client.stream_swarm_response("Plan"))
+
+        stats = AdaptiveLimiters.stats()
+        assert stats == [client.limiter.stats()]
+        assert (stats[0]["limit"], stats[0]["in_flight"]) == (3, 0)
+        assert SwarmMetrics.snapshot()["gauges"]['limiter.limit{model="local/tiny"}'] == 3
+
+    def test_local_pool_exhaustion_does_not_cut_the_limit(self):
+        """Test that the 429 raised when every pooled token is cooling down is not counted as overload."""
+        pool = CredentialPool(["a"], cooldown_s=60)
+        pool.release(pool.acquire(), throttled=True, status_code=429)
+        with patch.dict(os.environ, {"SWARM_LIMITER_INITIAL": "6", "HF_TOKEN": "hf_test"}):
+            client = SwarmClient(model="org/model", pool=pool)
+            with pytest.raises(APIError) as excinfo:
+                list(client.stream_swarm_response("Plan"))
+
+        assert (excinfo.value.status_code, excinfo.value.upstream) == (429, False)
+        stats = client.limiter.stats()
+        assert (stats["limit"], stats["decreases"], stats["in_flight"]) == (6, 0, 0)
+
+    def test_injected_clients_and_disabled_limiting_skip_the_limiter(self):
+        """Test that replayed clients, or SWARM_ADAPTIVE_CONCURRENCY=false, are not limited."""
+        assert SwarmClient(model="org/model", client=object()).limiter is None
+        with patch.dict(os.environ, {"SWARM_ADAPTIVE_CONCURRENCY": "false", "HF_TOKEN": "hf_test"}):
+            assert SwarmClient(model="org/model").limiter is None
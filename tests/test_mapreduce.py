@@ -0,0 +1,175 @@
+"""Tests for map-reduce document execution."""
+
+import os
+import stat
+import threading
+import time
+
+import pytest
+from utils.errors import APIError
+from utils.mapreduce import MapReduceCheckpoint, _run_steps, chunk_text, prune_checkpoints, run_map_reduce
+
+
+class FakeMapReduceClient:
+    """Stand-in for SwarmClient that answers map, reduce and swarm prompts."""
+
+    def __init__(self, fail_sections=(), delay=0.0):
+        self.model = "fake-model"
+        self.fail_sections = set(fail_sections)
+        self.delay = delay
+        self.prompts = []
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def stream_swarm_response(self, prompt, max_tokens=4096, temperature=0.7):
+        with self.lock:
+            self.prompts.append(prompt)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            for section in self.fail_sections:
+                if f"Section {section}/" in prompt:
+                    raise APIError(f"section {section} failed")
+            if "You are SwarmMaster" in prompt:
+                yield "**Swarm Complete:**"
+                yield "**Swarm Complete:** done"
+            elif "merging section analyses" in prompt:
+                yield "merged"
+            else:
+                yield "analysis"
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class TestChunkText:
+    """Test suite for chunk_text."""
+
+    def test_chunks_cover_text_with_overlap(self):
+        """Test that chunks overlap and cover the whole document."""
+        text = "\n".join(f"line {i:04d}" for i in range(1000))
+        chunks = chunk_text(text, chunk_chars=500, overlap_chars=50)
+
+        assert all(len(chunk) <= 500 for chunk in chunks)
+        assert chunks[0].startswith("line 0000")
+        assert chunks[-1].endswith("line 0999")
+        # Every chunk after the first starts with text from the end of the previous one
+        for previous, current in zip(chunks, chunks[1:]):
+            assert current[:20] in previous
+
+    def test_chunks_break_on_line_boundaries(self):
+        """Test that chunk ends prefer line breaks."""
+        text = "\n".join("x" * 30 for _ in range(100))
+        chunks = chunk_text(text, chunk_chars=200)
+
+        assert all(chunk.endswith("\n") for chunk in chunks[:-1])
+        assert "".join(chunks) == text
+
+    def test_short_text_is_single_chunk(self):
+        """Test that text under the limit is returned unchanged."""
+        assert chunk_text("short", chunk_chars=100, overlap_chars=10) == ["short"]
+
+
+class TestRunMapReduce:
+    """Test suite for run_map_reduce."""
+
+    def test_runs_map_reduce_and_final_swarm(self, tmp_path):
+        """Test the full map, hierarchical reduce and synthesis pipeline."""
+        client = FakeMapReduceClient()
+        document = "\n".join(f"paragraph {i} " + "x" * 80 for i in range(200))
+
+        results = list(run_map_reduce(
+            "Summarize risks", document, client,
+            chunk_chars=1000, overlap_chars=100, fan_in=3, checkpoint_dir=str(tmp_path),
+        ))
+
+        map_prompts = [p for p in client.prompts if "reviewing a large document" in p]
+        reduce_prompts = [p for p in client.prompts if "merging section analyses" in p]
+        swarm_prompts = [p for p in client.prompts if "You are SwarmMaster" in p]
+        assert len(map_prompts) == len(chunk_text(document, 1000, 100))
+        assert len(reduce_prompts) >= 2
+        assert len(swarm_prompts) == 1
+        assert "Swarm Complete:** done" in results[-1]
+        assert "Map:" in results[-1]
+        # Checkpoint is removed after a successful run
+        assert list(tmp_path.iterdir()) == []
+
+    def test_map_parallelism_is_bounded(self):
+        """Test that no more than max_workers requests run at once."""
+        client = FakeMapReduceClient(delay=0.02)
+        document = "y" * 10000
+
+        list(run_map_reduce("Task", document, client, chunk_chars=500, overlap_chars=0, max_workers=3))
+
+        assert 1 < client.max_active <= 3
+
+    def test_resumes_after_partial_failure(self, tmp_path):
+        """Test that a failed run resumes without repeating completed sections."""
+        document = "\n".join(f"row {i} " + "z" * 60 for i in range(100))
+        kwargs = dict(chunk_chars=800, overlap_chars=0, checkpoint_dir=str(tmp_path))
+
+        failing = FakeMapReduceClient(fail_sections={2})
+        with pytest.raises(APIError, match="resume"):
+            list(run_map_reduce("Task", document, failing, **kwargs))
+        total = len(chunk_text(document, 800, 0))
+        assert len(list(tmp_path.iterdir())) == 1
+
+        retry = FakeMapReduceClient()
+        results = list(run_map_reduce("Task", document, retry, **kwargs))
+
+        retry_maps = [p for p in retry.prompts if "reviewing a large document" in p]
+        assert len(retry_maps) == 1
+        assert f"Section 2/{total}" in retry_maps[0]
+        assert "Resuming" in results[0]
+        assert "done" in results[-1]
+
+
+class TestCheckpoints:
+    """Test suite for checkpoint storage and expiry."""
+
+    @pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+    def test_checkpoint_directory_is_private(self, tmp_path):
+        """Test that checkpoints are written to a directory only this user can read."""
+        directory = tmp_path / "checkpoints"
+        directory.mkdir(mode=0o755)
+
+        MapReduceCheckpoint(str(directory), "k").put("map:0", "analysis")
+
+        assert stat.S_IMODE(directory.stat().st_mode) == 0o700
+        assert stat.S_IMODE((directory / "mapreduce_k.json").stat().st_mode) == 0o600
+
+    def test_expired_checkpoints_are_pruned(self, tmp_path):
+        """Test that unfinished checkpoints older than the TTL are deleted when a run starts."""
+        MapReduceCheckpoint(str(tmp_path), "old").put("map:0", "stale")
+        MapReduceCheckpoint(str(tmp_path), "new").put("map:0", "fresh")
+        day_ago = time.time() - 86400
+        os.utime(tmp_path / "mapreduce_old.json", (day_ago, day_ago))
+
+        assert prune_checkpoints(str(tmp_path), ttl_s=3600) == 1
+        assert [p.name for p in tmp_path.iterdir()] == ["mapreduce_new.json"]
+        assert MapReduceCheckpoint(str(tmp_path), "new", ttl_s=3600).get("map:0") == "fresh"
+
+
+def test_closing_steps_does_not_wait_for_running_work():
+    """Test that abandoning a run returns promptly and drops queued steps."""
+    release = threading.Event()
+    started = []
+
+    def slow(name):
+        started.append(name)
+        release.wait(timeout=5)
+        return name
+
+    steps = [("fast", lambda: "fast")] + [(f"slow:{i}", lambda i=i: slow(i)) for i in range(4)]
+    runner = _run_steps(steps, MapReduceCheckpoint(None, "k"), max_workers=2)
+
+    assert next(runner)[0] == "fast"
+    began = time.perf_counter()
+    runner.close()
+    elapsed = time.perf_counter() - began
+    release.set()
+
+    assert elapsed < 1
+    assert len(started) <= 2
@@ -0,0 +1,216 @@
+"""Tests for the background startup preflight."""
+
+import os
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from huggingface_hub.utils import HfHubHTTPError
+from utils.config import SwarmConfig
+from utils.preflight import ModelStatus, Preflight, run_preflight
+
+
+@pytest.fixture(autouse=True)
+def reset_preflight():
+    """Ensure no preflight state leaks between tests."""
+    Preflight.reset()
+    yield
+    Preflight.reset()
+
+
+class FakeHTTPError(HfHubHTTPError):
+    """HfHubHTTPError with just a status code (the real constructor needs a full response)."""
+
+    def __init__(self, status_code):
+        Exception.__init__(self, f"{status_code} Client Error")
+        self.response = SimpleNamespace(status_code=status_code)
+
+
+def fake_probe(latencies):
+    """Build a probe that returns canned latencies or raises for missing models."""
+    def probe(model, token):
+        if model not in latencies:
+            raise RuntimeError(f"{model} is currently loading")
+        return latencies[model]
+    return probe
+
+
+class TestRunPreflight:
+    """Test suite for run_preflight."""
+
+    def test_probes_all_models(self):
+        """Test that every model is probed and classified."""
+        results = run_preflight(
+            ["fast", "slow", "down"],
+            "token",
+            verify=lambda token: None,
+            probe=fake_probe({"fast": 0.2, "slow": 9.0}),
+        )
+
+        assert results.token_valid is True
+        assert results.done.is_set()
+        assert results.models["fast"].available is True
+        assert results.models["slow"].latency_s == 9.0
+        assert results.models["down"].available is False
+        assert "loading" in results.models["down"].error
+
+    @pytest.mark.parametrize("status_code", [401, 403])
+    def test_rejected_token_skips_probes(self, status_code):
+        """Test that model probes are skipped when the token is rejected."""
+        def reject(token):
+            raise FakeHTTPError(status_code)
+
+        probed = []
+        results = run_preflight(["m"], "bad", verify=reject, probe=lambda m, t: probed.append(m) or 0.1)
+
+        assert results.token_valid is False
+        assert str(status_code) in results.token_error
+        assert probed == []
+
+    @pytest.mark.parametrize("error", [ConnectionError("Name resolution failed"), FakeHTTPError(503)])
+    def test_unverifiable_token_is_unknown(self, error):
+        """Test that network and server errors leave the token unknown and still probe models."""
+        def fail(token):
+            raise error
+
+        results = run_preflight(["m"], "token", verify=fail, probe=lambda m, t: 0.1)
+
+        assert results.token_valid is None
+        assert results.token_error
+        assert results.models["m"].available is True
+
+
+    def test_pooled_tokens_are_verified(self):
+        """Test that every pooled token is verified, not just the primary one."""
+        def verify(token):
+            if token == "revoked":
+                raise FakeHTTPError(401)
+
+        results = run_preflight(
+            ["m"],
+            "primary",
+            verify=verify,
+            probe=lambda model, token: 0.1,
+            pool_tokens=["primary", "spare", "revoked"],
+        )
+
+        assert results.token_valid is True
+        assert results.pooled_tokens == {"cred-2": True, "cred-3": False}
+        assert results.models["m"].available is True
+
+
+class TestPreflight:
+    """Test suite for the process-wide Preflight."""
+
+    def test_start_does_not_block(self):
+        """Test that start returns before slow probes finish."""
+        release = threading.Event()
+
+        def slow_probe(model, token):
+            release.wait(timeout=5)
+            return 0.1
+
+        with patch("utils.preflight.verify_token", lambda token: None), \
+                patch("utils.preflight.probe_model", slow_probe):
+            started = time.perf_counter()
+            results = Preflight.start(["m"], "token")
+            elapsed = time.perf_counter() - started
+
+            assert elapsed < 0.5
+            assert not results.done.is_set()
+            release.set()
+            assert results.done.wait(timeout=5)
+        assert Preflight.results() is results
+
+    def test_model_choices_mark_slow_and_unavailable(self):
+        """Test that dropdown labels reflect probe results."""
+        with patch("utils.preflight.verify_token", lambda token: None), \
+                patch("utils.preflight.probe_model", fake_probe({"fast": 0.5, "slow": 7.5})):
+            Preflight.start(["fast", "slow", "down"], "token").done.wait(timeout=5)
+
+        choices = Preflight.model_choices(["fast", "slow", "down", "unprobed"], slow_threshold_s=5.0)
+
+        assert choices == [
+            ("fast", "fast"),
+            ("slow (slow, 7.5s)", "slow"),
+            ("down (unavailable)", "down"),
+            ("unprobed", "unprobed"),
+        ]
+
+    def test_token_error_only_after_rejection(self):
+        """Test that token_error reports a rejection from the preflight."""
+        assert Preflight.token_error() is None
+
+        def fail(token):
+            raise TimeoutError("whoami timed out")
+
+        with patch("utils.preflight.verify_token", fail):
+            Preflight.start([], "token").done.wait(timeout=5)
+        assert Preflight.token_error() is None
+
+        Preflight.reset()
+
+        def reject(token):
+            raise FakeHTTPError(401)
+
+        with patch("utils.preflight.verify_token", reject):
+            Preflight.start([], "bad").done.wait(timeout=5)
+
+        assert "401" in Preflight.token_error()
+
+    def test_config_reload_runs_the_preflight_again(self):
+        """Test that a reload drops the old verdict and verifies the reloaded token."""
+        seen = []
+
+        def verify(token):
+            seen.append(token)
+            if token == "old":
+                raise FakeHTTPError(401)
+
+        with patch("utils.preflight.verify_token", verify), \
+                patch("utils.preflight.probe_model", lambda model, token: 0.1), \
+                patch.dict(os.environ, {"HF_TOKEN": "old", "SWARM_MODELS": "org/m"}):
+            SwarmConfig.reload()
+            Preflight.start([], "old").done.wait(timeout=5)
+            assert Preflight.token_error() is not None
+
+            os.environ["HF_TOKEN"] = "new"
+            SwarmConfig.reload(reason="sighup")
+            assert Preflight.results().done.wait(timeout=5)
+
+        assert seen == ["old", "new"]
+        assert Preflight.token_error() is None
+        assert list(Preflight.results().models) == ["org/m"]
+
+
+    def test_unrelated_reload_keeps_the_results(self):
+        """Test that only token, model and backend changes run the paid preflight again."""
+        seen = []
+
+        with patch("utils.preflight.verify_token", seen.append), \
+                patch("utils.preflight.probe_model", lambda model, token: 0.1), \
+                patch.dict(os.environ, {"HF_TOKEN": "token", "SWARM_MODELS": "org/m"}):
+            SwarmConfig.reload()
+            results = Preflight.start([], "token")
+            results.done.wait(timeout=5)
+
+            os.environ["SWARM_MAX_TOKENS"] = "1024"
+            SwarmConfig.reload(reason="sighup")
+            assert Preflight.results() is results
+
+            os.environ["HF_TOKENS"] = "spare"
+            SwarmConfig.reload(reason="sighup")
+            assert Preflight.results() is not results
+            assert Preflight.results().done.wait(timeout=5)
+
+        assert seen == ["token", "token", "spare"]
+        assert Preflight.results().pooled_tokens == {"cred-2": True}
+
+
+def test_model_status_label():
+    """Test labels for available, slow and unavailable models."""
+    assert ModelStatus("m", True, 1.0).label(5.0) == "m"
+    assert ModelStatus("m", True, 6.0).label(5.0) == "m (slow, 6.0s)"
+    assert ModelStatus("m", False, error="x").label(5.0) == "m (unavailable)"
@@ -0,0 +1,112 @@
+"""Tests for speculative preview streaming."""
+
+import threading
+import time
+
+import pytest
+from utils.errors import APIError
+from utils.preview import PreviewStats, stream_with_preview
+
+
+class FakeStreamingClient:
+    """Stand-in for SwarmClient that streams canned chunks with delays."""
+
+    def __init__(self, model, chunks, first_token_delay=0.0, chunk_delay=0.0, error=None):
+        self.model = model
+        self.chunks = chunks
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.error = error
+        self.closed = threading.Event()
+        self.cancelled = threading.Event()
+        self.yielded = 0
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def stream_swarm_response(self, prompt, max_tokens=4096, temperature=0.7):
+        try:
+            time.sleep(self.first_token_delay)
+            if self.error:
+                raise APIError(self.error)
+            accumulated = ""
+            for chunk in self.chunks:
+                accumulated += chunk
+                self.yielded += 1
+                yield accumulated
+                time.sleep(self.chunk_delay)
+        finally:
+            self.closed.set()
+
+
+class TestStreamWithPreview:
+    """Test suite for stream_with_preview."""
+
+    def test_draft_shown_before_primary(self):
+        """Test that draft content arrives first and is replaced by the primary."""
+        draft = FakeStreamingClient("small", ["d1", "d2"], chunk_delay=0.01)
+        primary = FakeStreamingClient("large", ["P1", "P2"], first_token_delay=0.2)
+
+        results = list(stream_with_preview(primary, draft, "prompt"))
+
+        assert results[0] == ("d1", True)
+        assert results[-1] == ("P1P2", False)
+        # No draft output once the primary has started
+        first_primary = next(i for i, (_, is_draft) in enumerate(results) if not is_draft)
+        assert all(not is_draft for _, is_draft in results[first_primary:])
+
+    def test_draft_cancelled_when_primary_starts(self):
+        """Test that the draft stream is closed once the primary produces output."""
+        draft = FakeStreamingClient("small", ["d"] * 1000, chunk_delay=0.01)
+        primary = FakeStreamingClient("large", ["P"], first_token_delay=0.05)
+
+        stats = PreviewStats()
+        list(stream_with_preview(primary, draft, "prompt", stats=stats))
+
+        assert draft.closed.wait(timeout=1.0)
+        assert draft.yielded < 1000
+        assert stats.draft_cancelled is True
+
+    def test_stalled_draft_is_cancelled_on_handover(self):
+        """Test that the draft client is cancelled directly, not on a next chunk that never comes."""
+        draft = FakeStreamingClient("small", ["d", "d"], chunk_delay=5.0)
+        primary = FakeStreamingClient("large", ["P", "P"], first_token_delay=0.05, chunk_delay=0.05)
+
+        stream = stream_with_preview(primary, draft, "prompt")
+        assert next(stream) == ("d", True)
+        assert next(stream) == ("P", False)
+
+        assert draft.cancelled.is_set()
+        stream.close()
+
+    def test_stats_measure_time_to_first_content(self):
+        """Test that the preview lowers time to first content versus the primary."""
+        draft = FakeStreamingClient("small", ["d"], first_token_delay=0.01)
+        primary = FakeStreamingClient("large", ["P"], first_token_delay=0.2)
+
+        stats = PreviewStats()
+        list(stream_with_preview(primary, draft, "prompt", stats=stats))
+
+        assert stats.draft_first_token_s is not None
+        assert stats.primary_first_token_s >= 0.2
+        assert stats.first_content_s == stats.draft_first_token_s
+        assert stats.first_content_s < stats.primary_first_token_s
+
+    def test_draft_error_is_ignored(self):
+        """Test that a failing draft does not affect the primary output."""
+        draft = FakeStreamingClient("small", [], error="draft down")
+        primary = FakeStreamingClient("large", ["P1", "P2"], first_token_delay=0.05)
+
+        stats = PreviewStats()
+        results = list(stream_with_preview(primary, draft, "prompt", stats=stats))
+
+        assert results == [("P1", False), ("P1P2", False)]
+        assert "draft down" in stats.draft_error
+
+    def test_primary_error_is_raised(self):
+        """Test that primary failures propagate to the caller."""
+        draft = FakeStreamingClient("small", ["d"])
+        primary = FakeStreamingClient("large", [], first_token_delay=0.05, error="primary down")
+
+        with pytest.raises(APIError, match="primary down"):
+            list(stream_with_preview(primary, draft, "prompt"))
@@ -21,7 +21,7 @@ def test_build_swarm_prompt_contains_template():
     assert "SwarmMaster" in prompt
     assert "Builder Swarm" in prompt
     assert "Swarm Complete" in prompt
-    assert "Agent Role Name" in prompt
+    assert "**Agent: Role Name**" in prompt
 
 
 def test_build_swarm_prompt_formatting():
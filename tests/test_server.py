@@ -0,0 +1,185 @@
+"""Tests for the SSE/HTTP API in server.py."""
+
+import json
+import os
+from unittest.mock import patch, MagicMock
+
+import pytest
+from starlette.testclient import TestClient
+
+from server import _build_prompt, create_app, format_sse, parse_swarm_request
+from utils import APIError, SwarmConfig
+from utils.metrics import SwarmMetrics
+from utils.usage import TokenUsage
+
+
+def parse_events(body: str) -> list[tuple[str, dict]]:
+    """Split an SSE body into (event, data) pairs."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def fake_client(*chunks, error=None):
+    """Build a SwarmClient stand-in streaming accumulated chunks."""
+    def stream(prompt, max_tokens=4096, temperature=0.7):
+        for chunk in chunks:
+            yield chunk
+        if error is not None:
+            raise error
+
+    client = MagicMock()
+    client.stream_swarm_response.side_effect = stream
+    client.usage = TokenUsage(100, 20)
+    return client
+
+
+@pytest.fixture
+def client():
+    with patch.dict(os.environ, {"HF_TOKEN": "test-token", "SWARM_COMPRESS_INPUT": "0"}):
+        yield TestClient(create_app())
+
+
+class TestParseSwarmRequest:
+    """Test suite for parse_swarm_request."""
+
+    def test_fills_defaults(self):
+        """Test that omitted fields use configured defaults."""
+        params, error = parse_swarm_request({"task": "Design a tool"})
+
+        assert error is None
+        assert params["model"] == SwarmConfig.get_model()
+        assert params["max_tokens"] == SwarmConfig.get_max_tokens()
+
+    @pytest.mark.parametrize("payload, fragment", [
+        ([], "JSON object"),
+        ({"task": 42}, "string"),
+        ({"task": ""}, "task"),
+        ({"task": "Design", "model": "unknown/model"}, "not in the available"),
+        ({"task": "Design", "temperature": 3.0}, "Temperature"),
+        ({"task": "Design", "max_tokens": "many"}, "integer"),
+    ])
+    def test_rejects_invalid_payloads(self, payload, fragment):
+        """Test that invalid payloads are rejected with the shared validation messages."""
+        params, error = parse_swarm_request(payload)
+
+        assert params is None
+        assert fragment.lower() in error.lower()
+
+
+class TestSwarmEndpoint:
+    """Test suite for POST /v1/swarm."""
+
+    @patch("server.SwarmClient")
+    def test_streams_deltas(self, mock_client_class, client):
+        """Test that only new text is sent in each delta event."""
+        mock_client_class.return_value = fake_client("Hello", "Hello World", "Hello World!")
+
+        response = client.post("/v1/swarm", json={"task": "Design a tool"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_events(response.text)
+        assert events[0][0] == "start"
+        assert [data["text"] for event, data in events if event == "delta"] == ["Hello", " World", "!"]
+        assert events[-1] == ("done", {"chars": 12, "seconds": events[-1][1]["seconds"]})
+
+    @patch("server.SwarmClient")
+    def test_upstream_error_becomes_error_event(self, mock_client_class, client):
+        """Test that an upstream failure ends the stream with an error event."""
+        mock_client_class.return_value = fake_client("Partial", error=APIError("boom"))
+
+        events = parse_events(client.post("/v1/swarm", json={"task": "Design a tool"}).text)
+
+        assert events[1] == ("delta", {"text": "Partial"})
+        assert events[-1][0] == "error"
+        assert "boom" in events[-1][1]["error"]
+
+    def test_invalid_request_returns_400(self, client):
+        """Test that validation errors are returned before any streaming."""
+        response = client.post("/v1/swarm", json={"task": "  "})
+
+        assert response.status_code == 400
+        assert "error" in response.json()
+
+    def test_malformed_json_returns_400(self, client):
+        """Test that a non-JSON body is rejected."""
+        response = client.post("/v1/swarm", content=b"{not json", headers={"content-type": "application/json"})
+
+        assert response.status_code == 400
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_missing_token_returns_503(self):
+        """Test that a missing HF_TOKEN is reported without streaming."""
+        response = TestClient(create_app()).post("/v1/swarm", json={"task": "Design a tool"})
+
+        assert response.status_code == 503
+        assert "HF_TOKEN" in response.json()["error"]
+
+
+class TestBatchEndpoint:
+    """Test suite for POST /v1/swarm/batch."""
+
+    @patch("server.SwarmClient")
+    def test_runs_batch_in_order(self, mock_client_class, client):
+        """Test that results come back in submission order with per-item errors."""
+        mock_client_class.side_effect = lambda **kwargs: fake_client("Plan", "Plan done")
+
+        response = client.post("/v1/swarm/batch", json={"tasks": [
+            {"task": "First task"},
+            {"task": ""},
+            {"task": "Third task", "temperature": 0.2},
+        ]})
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["index"] for r in results] == [0, 1, 2]
+        assert results[0]["ok"] and results[0]["text"] == "Plan done"
+        assert not results[1]["ok"]
+        assert results[2]["ok"]
+
+    def test_rejects_oversized_batch(self, client):
+        """Test that batches above SWARM_API_MAX_BATCH are rejected."""
+        with patch.dict(os.environ, {"SWARM_API_MAX_BATCH": "2"}):
+            response = client.post("/v1/swarm/batch", json={"tasks": [{"task": "abc"}] * 3})
+
+        assert response.status_code == 400
+        assert "maximum 2" in response.json()["error"]
+
+
+def test_metrics_and_health(client):
+    """Test the metrics and health endpoints."""
+    assert client.get("/health").json() == {"status": "ok"}
+    assert "counters" in client.get("/v1/metrics").json()
+
+
+def test_build_prompt_records_compression(monkeypatch):
+    """Test that compressed API tasks publish the same statistics as the UI."""
+    monkeypatch.setenv("SWARM_COMPRESS_INPUT", "1")
+    monkeypatch.setenv("SWARM_SUMMARIZE_INPUT", "0")
+    before = SwarmMetrics.snapshot()["observations"].get("compression.ratio", {}).get("count", 0)
+
+    prompt = _build_prompt("retry\n" * 50 + "Design a tool", MagicMock())
+
+    assert "Design a tool" in prompt
+    assert SwarmMetrics.snapshot()["observations"]["compression.ratio"]["count"] == before + 1
+
+
+def test_format_sse():
+    """Test SSE message encoding."""
+    assert format_sse("delta", {"text": "hi"}) == 'event: delta\ndata: {"text": "hi"}\n\n'
+
+
+@patch("server.SwarmClient")
+def test_session_budget_rejects_with_402(mock_client_class, client):
+    """Test that a session over budget is rejected before streaming."""
+    mock_client_class.side_effect = lambda **kwargs: fake_client("Plan")
+    with patch.dict(os.environ, {"SWARM_SESSION_BUDGET_USD": "0.00001"}):
+        first = client.post("/v1/swarm", json={"task": "Design a tool"}, headers={"X-Session-ID": "s1"})
+        second = client.post("/v1/swarm", json={"task": "Design a tool"}, headers={"X-Session-ID": "s1"})
+
+    assert first.status_code == 200
+    assert second.status_code == 402
+    assert "Session budget" in second.json()["error"]
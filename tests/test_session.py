@@ -0,0 +1,241 @@
+"""Tests for multi-turn swarm sessions."""
+
+import os
+import threading
+import time
+from unittest.mock import patch
+
+from utils.errors import APIError
+from utils.prompts import build_swarm_prompt
+from utils.session import SwarmSession, SwarmSessions
+
+
+class FakeSummaryClient:
+    """Stand-in for SwarmClient that records summary prompts."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.prompts = []
+
+    def stream_swarm_response(self, prompt, max_tokens=4096, temperature=0.7):
+        self.prompts.append(prompt)
+        if self.fail:
+            raise APIError("summary failed")
+        yield "Summary"
+        yield f"Summary v{len(self.prompts)}"
+
+
+class TestSwarmSession:
+    """Test suite for SwarmSession."""
+
+    def test_first_turn_uses_swarm_prompt(self):
+        """Test that a new session sends the usual single swarm prompt."""
+        session = SwarmSession("s")
+
+        assert session.build_messages("Design a tool") == [
+            {"role": "user", "content": build_swarm_prompt("Design a tool")}
+        ]
+
+    def test_follow_up_sends_prior_turns(self):
+        """Test that follow-ups send windowed turns as user/assistant messages."""
+        session = SwarmSession("s", window_turns=2)
+        session.add_turn("Design a tool", "**Swarm Complete:** tool v1")
+
+        messages = session.build_messages("Make it cheaper")
+
+        assert [m["role"] for m in messages] == ["user", "assistant", "user"]
+        assert messages[1]["content"] == "**Swarm Complete:** tool v1"
+        assert "Follow-up: Make it cheaper" in messages[2]["content"]
+
+    def test_summary_is_incremental(self):
+        """Test that only turns leaving the window are summarized, with the previous summary."""
+        session = SwarmSession("s", window_turns=2)
+        client = FakeSummaryClient()
+        for i in range(3):
+            session.add_turn(f"task {i}", f"response {i}")
+
+        assert session.needs_compaction
+        assert session.compact(client)
+        assert session.summary == "Summary v1"
+        assert "task 0" in client.prompts[0] and "task 1" not in client.prompts[0]
+
+        session.add_turn("task 3", "response 3")
+        session.compact(client)
+        assert "Summary v1" in client.prompts[1]
+        assert "task 1" in client.prompts[1] and "task 0" not in client.prompts[1]
+        assert session.turn_count == 4
+        assert "Summary v2" in session.build_messages("next")[-1]["content"]
+
+    def test_prompt_size_stays_bounded(self):
+        """Test that prompt size does not grow with conversation length."""
+        session = SwarmSession("s", window_turns=2, max_turn_chars=500, summary_tokens=100)
+        sizes = []
+        for i in range(30):
+            session.add_turn(f"refine step {i} " * 20, f"swarm output {i} " * 500)
+            session.compact()
+            sizes.append(sum(len(m["content"]) for m in session.build_messages("next step")))
+
+        assert max(sizes[5:]) - min(sizes[5:]) < 200
+        assert max(sizes) < 3500
+
+    def test_long_responses_are_stored_compressed(self):
+        """Test that responses are clipped to what prompts use and compressed in memory."""
+        session = SwarmSession("s", max_turn_chars=4000, compress_min_chars=1024)
+        response = "**Agent Role Name:** Analyst\n" + "The plan is solid. " * 2000
+
+        session.add_turn("Design a tool", response)
+
+        assert isinstance(session._turns[0][1], bytes)
+        assert session.turns[0][1] == "[...]" + response[-3995:]
+        assert session.nbytes < 1000
+
+    def test_shrink_to_folds_oldest_turns(self):
+        """Test that a session over its byte budget folds old turns into the summary."""
+        session = SwarmSession("s", window_turns=3, max_turn_chars=2000, compress_min_chars=0)
+        for i in range(3):
+            session.add_turn(f"task {i}", f"response {i} " * 150)
+
+        folded = session.shrink_to(3000)
+
+        assert folded == 2
+        assert [task for task, _ in session.turns] == ["task 2"]
+        assert "task 0" in session.summary and session.turn_count == 3
+        assert session.nbytes <= 3000
+
+    def test_failed_summary_falls_back_to_extractive(self):
+        """Test that a failed summary request keeps an extractive summary."""
+        session = SwarmSession("s", window_turns=1)
+        session.add_turn("first task", "first answer")
+        session.add_turn("second task", "second answer")
+
+        assert not session.compact(FakeSummaryClient(fail=True))
+        assert "first task" in session.summary
+        assert [task for task, _ in session.turns] == ["second task"]
+
+
+class TestSwarmSessions:
+    """Test suite for the session store."""
+
+    def setup_method(self):
+        SwarmSessions.clear()
+
+    def test_get_returns_same_session(self):
+        """Test that a session is reused across turns."""
+        assert SwarmSessions.get("a") is SwarmSessions.get("a")
+
+    def test_least_recently_used_sessions_are_evicted(self):
+        """Test that the store stays bounded."""
+        with patch.object(SwarmSessions, "MAX_SESSIONS", 2):
+            first = SwarmSessions.get("a")
+            SwarmSessions.get("b")
+            SwarmSessions.get("c")
+
+            assert SwarmSessions.get("a") is not first
+
+    def test_over_budget_sessions_spill_and_restore(self):
+        """Test that least recently used sessions are spilled to disk and restored intact."""
+        with patch.dict(os.environ, {"SWARM_SESSIONS_MAX_BYTES": "3000", "SWARM_SESSION_COMPRESS_MIN_CHARS": "0"}):
+            with SwarmSessions.use("old") as session:
+                session.add_turn("first task", "x" * 2000)
+            with SwarmSessions.use("new") as session:
+                session.add_turn("second task", "y" * 2000)
+
+            assert SwarmSessions.stats()["resident_sessions"] == 1
+            assert os.path.exists(SwarmSessions._spill_path("old"))
+
+            restored = SwarmSessions.get("old")
+
+        assert restored.turns == [("first task", "x" * 2000)]
+        assert not os.path.exists(SwarmSessions._spill_path("old"))
+        assert SwarmSessions.stats()["restored"] == 1
+
+    def test_spill_files_are_private(self):
+        """Test that spilled sessions are readable only by the user running the app."""
+        if not hasattr(os, "getuid"):
+            return
+        with patch.dict(os.environ, {"SWARM_SESSIONS_MAX_BYTES": "1024", "SWARM_SESSION_COMPRESS_MIN_CHARS": "0"}):
+            with SwarmSessions.use("private") as session:
+                session.add_turn("task", "x" * 2000)
+            SwarmSessions.get("other")
+
+        path = SwarmSessions._spill_path("private")
+        assert os.stat(os.path.dirname(path)).st_mode & 0o777 == 0o700
+        assert os.stat(path).st_mode & 0o777 == 0o600
+
+    def test_restore_reads_without_the_lock_and_rechecks_the_file(self):
+        """Test that a spilled session is read outside the global lock, and re-read if it was spilled again meanwhile."""
+        with patch.dict(os.environ, {"SWARM_SESSIONS_MAX_BYTES": "1024", "SWARM_SESSION_COMPRESS_MIN_CHARS": "0"}):
+            with SwarmSessions.use("s") as session:
+                session.add_turn("first task", "x" * 2000)
+            SwarmSessions.get("other")
+            newer = SwarmSession("s")
+            newer.add_turn("first task", "x" * 2000)
+            newer.add_turn("second task", "y" * 2000)
+            read_spill = SwarmSessions._read_spill
+            locked = []
+
+            def read_and_replace(path):
+                locked.append(SwarmSessions._lock.locked())
+                session = read_spill(path)
+                if len(locked) == 1:
+                    # Another worker thread spills a newer state of the session
+                    SwarmSessions._spilling["s"] = newer
+                    newer.pending_spills += 1
+                    SwarmSessions._spill([(newer, "budget")])
+                return session
+
+            with patch.object(SwarmSessions, "_read_spill", side_effect=read_and_replace):
+                restored = SwarmSessions.get("s")
+
+        assert locked == [False, False]
+        assert [task for task, _ in restored.turns] == ["first task", "second task"]
+        assert not os.path.exists(SwarmSessions._spill_path("s"))
+
+    def test_idle_sessions_spill_but_leased_ones_stay(self):
+        """Test that idle sessions are spilled unless a request is using them."""
+        with patch.dict(os.environ, {"SWARM_SESSION_IDLE_SECONDS": "60"}):
+            SwarmSessions.get("idle").last_used = time.monotonic() - 120
+            with SwarmSessions.use("busy") as busy:
+                busy.last_used = time.monotonic() - 120
+                SwarmSessions.get("other")
+
+                assert os.path.exists(SwarmSessions._spill_path("idle"))
+                assert not os.path.exists(SwarmSessions._spill_path("busy"))
+
+    def test_slow_summary_does_not_block_other_sessions(self):
+        """Test that a session compacting through the model does not hold up checkouts or new turns."""
+        started, release = threading.Event(), threading.Event()
+
+        class SlowSummaryClient:
+            def stream_swarm_response(self, prompt, max_tokens=4096, temperature=0.7):
+                started.set()
+                release.wait(5)
+                yield "Slow summary"
+
+        with SwarmSessions.use("busy") as busy:
+            busy.window_turns = 1
+            busy.add_turn("first task", "first response")
+            busy.add_turn("second task", "second response")
+            compaction = threading.Thread(target=busy.compact, args=(SlowSummaryClient(),))
+            compaction.start()
+            assert started.wait(5)
+
+            checkout_started = time.monotonic()
+            SwarmSessions.get("other")
+            stats = SwarmSessions.stats()
+            busy.add_turn("third task", "third response")
+            blocked_s = time.monotonic() - checkout_started
+            release.set()
+            compaction.join(5)
+
+        assert blocked_s < 1
+        assert stats["resident_sessions"] == 2
+        assert busy.summary == "Slow summary"
+        assert [task for task, _ in busy.turns] == ["second task", "third task"]
+
+    def test_stats_report_worker_memory(self):
+        """Test that session stats include this worker's resident memory."""
+        stats = SwarmSessions.stats()
+
+        assert stats["process"]["pid"] == os.getpid()
+        assert "rss_bytes" in stats["process"]
@@ -0,0 +1,270 @@
+"""Tests for stream shaping utilities."""
+
+import queue
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from utils.streaming import (
+    AgentSections,
+    BufferStats,
+    CoalesceStats,
+    buffered_stream,
+    coalesce_stream,
+    collapse_section,
+    expand_section,
+    pump_stream,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def timed_stream(clock, items, step_s):
+    """Yield items while advancing the fake clock between them."""
+    for item in items:
+        yield item
+        clock.now += step_s
+
+
+class TestCoalesceStream:
+    """Test suite for coalesce_stream."""
+
+    def test_disabled_passes_everything_through(self):
+        """Test that zero thresholds disable coalescing."""
+        items = ["a", "ab", "abc"]
+        assert list(coalesce_stream(items, 0, 0)) == items
+
+    def test_interval_limits_emit_rate(self):
+        """Test that emits happen at most every interval, plus a final flush."""
+        clock = FakeClock()
+        items = ["x" * i for i in range(1, 101)]  # one item every 10 ms
+        stats = CoalesceStats()
+
+        result = list(coalesce_stream(timed_stream(clock, items, 0.01), 100, 0, stats=stats, clock=clock))
+
+        assert result[0] == items[0]
+        assert result[-1] == items[-1]
+        assert len(result) == 11
+        assert stats.received == 100
+        assert stats.emitted == 11
+        assert stats.reduction == pytest.approx(0.89)
+
+    def test_char_threshold_forces_emit(self):
+        """Test that enough new content triggers an emit before the interval."""
+        clock = FakeClock()
+        items = ["x" * (i * 10) for i in range(1, 11)]
+
+        result = list(coalesce_stream(timed_stream(clock, items, 0.001), 10000, 30, clock=clock))
+
+        assert result == [items[0], items[3], items[6], items[9]]
+
+    def test_flushes_pending_before_error(self):
+        """Test that buffered content is emitted before an upstream error propagates."""
+        def failing():
+            yield "a"
+            yield "ab"
+            raise RuntimeError("boom")
+
+        result = []
+        with pytest.raises(RuntimeError, match="boom"):
+            for item in coalesce_stream(failing(), 10000, 0):
+                result.append(item)
+
+        assert result == ["a", "ab"]
+
+    def test_custom_size_function(self):
+        """Test coalescing of (text, flag) tuples with a custom size."""
+        items = [("a", True), ("ab", True), ("abc", False)]
+        result = list(coalesce_stream(iter(items), 0, 2, size=lambda item: len(item[0])))
+
+        assert result == [("a", True), ("abc", False)]
+
+
+class TestBufferedStream:
+    """Test suite for buffered_stream."""
+
+    def test_disabled_passes_everything_through(self):
+        """Test that max_items=0 yields every item without a producer thread."""
+        stats = BufferStats()
+
+        assert list(buffered_stream(iter(["a", "ab", "abc"]), 0, stats=stats)) == ["a", "ab", "abc"]
+        assert (stats.received, stats.emitted, stats.dropped) == (3, 3, 0)
+
+    def test_slow_consumer_skips_stale_snapshots(self):
+        """Test that a consumer that falls behind drops the oldest snapshots and keeps the last."""
+        consumed_first = threading.Event()
+        released = threading.Event()
+        stats = BufferStats()
+
+        def upstream():
+            yield "x"
+            consumed_first.wait(2)
+            for i in range(2, 51):
+                yield "x" * i
+            released.set()
+
+        stream = buffered_stream(upstream(), 4, stats=stats)
+        first = next(stream)
+        consumed_first.set()
+        assert released.wait(2)
+        rest = list(stream)
+
+        assert first == "x"
+        assert rest == ["x" * i for i in range(47, 51)]
+        assert stats.dropped == 45
+        assert stats.high_water == 4
+
+    def test_error_raised_after_buffered_items(self):
+        """Test that an upstream error is re-raised once buffered items are consumed."""
+        def upstream():
+            yield "Partial"
+            raise RuntimeError("boom")
+
+        received = []
+        with pytest.raises(RuntimeError, match="boom"):
+            for item in buffered_stream(upstream(), 8):
+                received.append(item)
+
+        assert received == ["Partial"]
+
+    def test_closing_consumer_stops_producer(self):
+        """Test that closing the consumer closes the upstream generator."""
+        closed = threading.Event()
+
+        def upstream():
+            try:
+                i = 0
+                while True:
+                    i += 1
+                    yield i
+            finally:
+                closed.set()
+
+        stream = buffered_stream(upstream(), 2)
+        next(stream)
+        stream.close()
+
+        assert closed.wait(2)
+
+
+class TestAgentSections:
+    """Test suite for splitting a swarm response into per-agent messages."""
+
+    def test_splits_at_agent_headings(self):
+        """Test that status lines stay with the first agent and headings open new messages."""
+        sections = AgentSections()
+        text = "🚀 Deploying...\n\n**Agent: Planner**\nUse **bold:** inline.\n\n**Agent: Synthesizer:**\nDone."
+
+        messages = sections.update(text)
+
+        assert messages == [
+            "🚀 Deploying...\n\n**Agent: Planner**\nUse **bold:** inline.\n\n",
+            "**Agent: Synthesizer:**\nDone.",
+        ]
+        assert "".join(messages) == text
+
+    def test_bold_sub_headings_stay_in_the_agent_section(self):
+        """Test that bold labels other than agent headings do not open new messages."""
+        sections = AgentSections()
+        planner = "**Agent: Planner**\n**Key Deliverables:**\n- Scope\n\n**Risks:**\n- Time\n\n"
+        writer = "**Agent: Writer**\nDraft.\n\n**Swarm Complete:**\nNext steps."
+
+        assert sections.update(planner + writer) == [planner, writer]
+
+    def test_splits_at_legacy_role_headings(self):
+        """Test that responses in the earlier "**Role Name:**" format still split per agent."""
+        sections = AgentSections()
+        planner = "🚀 Deploying...\n\n**Product Strategist:**\nUse **bold:** inline.\n\n"
+        writer = "**Writer:**\nDraft.\n\n"
+        complete = "**Swarm Complete:**\nNext steps."
+
+        messages = sections.update(planner + writer + complete)
+
+        assert messages == [planner, writer, complete]
+        assert collapse_section(messages[1]).startswith("<details><summary>Writer</summary>")
+
+    def test_legacy_heading_needs_its_line_to_end(self):
+        """Test that a streamed bold label is not taken for a legacy heading before its line ends."""
+        sections = AgentSections()
+        sections.update("**Planner:**\nScope.\n**Risks:**")
+
+        assert sections.update("**Planner:**\nScope.\n**Risks:** Time.\n") == ["**Planner:**\nScope.\n**Risks:** Time.\n"]
+
+    def test_agent_headings_win_over_legacy_labels(self):
+        """Test that bold labels on their own line stay inside agent sections in the current format."""
+        sections = AgentSections()
+        planner = "**Agent: Planner**\n**Key Deliverables:**\n- Scope\n\n"
+        writer = "**Agent: Writer**\nDraft."
+
+        assert sections.update(planner + writer) == [planner, writer]
+
+    def test_finished_sections_are_frozen(self):
+        """Test that finished messages are reused and a partial heading stays in the active one."""
+        sections = AgentSections()
+        sections.update("**Agent: Planner**\nScope.\n")
+        first = sections.update("**Agent: Planner**\nScope.\n**Agent: Builder**\nBu")
+
+        assert sections.update("**Agent: Planner**\nScope.\n**Agent: Builder**\nBuild.\n**Agent: Rev")[0] is first[0]
+        assert sections.finished == ["**Agent: Planner**\nScope.\n"]
+
+    def test_replaced_snapshot_resplits(self):
+        """Test that a snapshot that does not extend the previous one starts over."""
+        sections = AgentSections()
+        sections.update("Draft\n**Agent: Planner**\nDraft plan")
+
+        assert sections.update("**Agent: Planner**\nReal plan") == ["**Agent: Planner**\nReal plan"]
+
+    def test_collapsed_sections_expand_back(self):
+        """Test that collapsed finished sections carry their heading and expand losslessly."""
+        sections = AgentSections(collapse=True)
+
+        messages = sections.update("**Agent: R&D Lead**\nIdeas.\n\n**Agent: Builder**\nShip.")
+
+        assert messages[0].startswith("<details><summary>R&amp;D Lead</summary>")
+        assert messages[1] == "**Agent: Builder**\nShip."
+        assert expand_section(messages[0]) == "**Agent: R&D Lead**\nIdeas.\n\n"
+        assert expand_section("plain") == "plain"
+
+
+class TestPumpStream:
+    """Test suite for draining model streams into a shared queue."""
+
+    def test_forwards_chunks_then_done(self):
+        """Test that chunks are tagged with their source and followed by done."""
+        client = MagicMock()
+        client.stream_swarm_response.return_value = iter(["a", "ab"])
+        events = queue.Queue()
+
+        pump_stream(client, "m", "Plan", 64, 0.7, events, threading.Event())
+
+        assert [events.get_nowait() for _ in range(3)] == [("chunk", "m", "a"), ("chunk", "m", "ab"), ("done", "m", None)]
+
+    def test_cancel_stops_and_closes_the_stream(self):
+        """Test that a cancelled pump stops forwarding and closes the upstream stream."""
+        closed = threading.Event()
+
+        def stream():
+            try:
+                yield "a"
+                yield "ab"
+            finally:
+                closed.set()
+
+        client = MagicMock()
+        client.stream_chat_response.return_value = stream()
+        events = queue.Queue()
+        cancel = threading.Event()
+        cancel.set()
+
+        pump_stream(client, 0, "", 64, 0.7, events, cancel, messages=[{"role": "user", "content": "Plan"}])
+
+        assert closed.is_set()
+        assert events.get_nowait() == ("done", 0, None)
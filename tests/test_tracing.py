@@ -0,0 +1,203 @@
+"""Tests for request tracing and profiling hooks."""
+
+import json
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+from utils.api import SwarmClient
+from utils.cassette import ReplayInferenceClient, synthetic_cassette
+from utils.streaming import buffered_stream
+from utils.tracing import RequestProfiler, RequestTrace, SwarmTracer, span
+
+
+@pytest.fixture(autouse=True)
+def clear_tracer():
+    """Start every test with an empty span buffer."""
+    SwarmTracer.clear()
+    yield
+    SwarmTracer.clear()
+
+
+class TestRequestTrace:
+    """Test suite for RequestTrace."""
+
+    def test_spans_share_request_id_and_root_parent(self):
+        """Test that spans are recorded under the request's root span."""
+        trace = RequestTrace("run_swarm", model="m")
+        with trace.span("validate"):
+            pass
+        open_span = trace.start_span("stream")
+        trace.finish()
+
+        names = [s.name for s in trace.spans]
+        assert names == ["run_swarm", "validate", "stream"]
+        assert all(s.parent_id == trace.root.span_id for s in trace.spans[1:])
+        assert open_span.end_ns is not None
+        assert len(SwarmTracer.spans()) == 3
+
+    def test_span_helper_without_trace(self):
+        """Test that the span helper is a no-op when tracing is off."""
+        with span(None, "anything"):
+            pass
+
+    def test_swarm_client_records_upstream_spans(self):
+        """Test that SwarmClient records connect, TTFT and stream spans."""
+        trace = RequestTrace("run_swarm")
+        client = SwarmClient(
+            model="m",
+            token="t",
+            client=ReplayInferenceClient(synthetic_cassette(20), speed=0),
+            trace=trace,
+        )
+        list(client.stream_swarm_response("prompt"))
+
+        names = [s.name for s in trace.spans]
+        assert names == ["run_swarm", "upstream.connect", "upstream.ttft", "upstream.stream"]
+        assert trace.spans[-1].attrs["chunks"] == 20
+
+
+class TestExport:
+    """Test suite for trace export formats."""
+
+    def test_chrome_trace_export(self, tmp_path):
+        """Test that Chrome trace events are written for every span."""
+        trace = RequestTrace("run_swarm")
+        with trace.span("build_prompt", chars=10):
+            pass
+        trace.finish()
+        path = str(tmp_path / "trace.json")
+
+        SwarmTracer.export(path, "chrome")
+
+        with open(path) as f:
+            data = json.load(f)
+        events = data["traceEvents"]
+        assert [e["name"] for e in events] == ["run_swarm", "build_prompt"]
+        assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+        assert events[1]["args"] == {"request_id": trace.request_id, "chars": 10}
+
+    def test_otlp_json_export(self, tmp_path):
+        """Test that OTLP-JSON spans carry trace, parent and attribute data."""
+        trace = RequestTrace("run_swarm", model="m")
+        with trace.span("validate"):
+            pass
+        trace.finish()
+        path = str(tmp_path / "trace.otlp.json")
+
+        SwarmTracer.export(path, "otlp")
+
+        with open(path) as f:
+            data = json.load(f)
+        spans = data["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert {s["traceId"] for s in spans} == {trace.request_id}
+        assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+        assert spans[0]["attributes"] == [{"key": "model", "value": {"stringValue": "m"}}]
+        assert int(spans[0]["endTimeUnixNano"]) >= int(spans[0]["startTimeUnixNano"])
+
+    def test_finish_appends_each_trace_when_configured(self, tmp_path):
+        """Test that finished traces are appended to SWARM_TRACE_FILE one request at a time."""
+        path = str(tmp_path / "auto.json")
+        with patch.dict(os.environ, {"SWARM_TRACE_FILE": path}):
+            RequestTrace("first").finish()
+            RequestTrace("second").finish()
+
+        with open(path) as f:
+            text = f.read()
+        # Chrome's JSON array format may omit the closing bracket
+        events = json.loads(text.rstrip().rstrip(",") + "]")
+        assert [e["name"] for e in events] == ["first", "second"]
+
+    def test_otlp_trace_file_is_json_lines(self, tmp_path):
+        """Test that OTLP traces are appended as one export request per line."""
+        path = str(tmp_path / "auto.otlp.jsonl")
+        with patch.dict(os.environ, {"SWARM_TRACE_FILE": path, "SWARM_TRACE_FORMAT": "otlp"}):
+            RequestTrace("first").finish()
+            RequestTrace("second").finish()
+
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        assert [line["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["name"] for line in lines] == ["first", "second"]
+
+    def test_unwritable_trace_file_does_not_fail_the_request(self, tmp_path):
+        """Test that a trace file that cannot be written is logged and skipped."""
+        blocker = tmp_path / "not_a_directory"
+        blocker.write_text("")
+        with patch.dict(os.environ, {"SWARM_TRACE_FILE": str(blocker / "trace.json")}):
+            with patch("utils.tracing.SwarmLogger.log_error") as log_error:
+                trace = RequestTrace("run_swarm")
+                trace.finish()
+
+        assert log_error.call_args.args[0] == "TracingError"
+
+
+class TestRequestProfiler:
+    """Test suite for sampled profiling."""
+
+    @pytest.mark.parametrize("mode,suffix", [("cprofile", ".cprofile.txt"), ("tracemalloc", ".tracemalloc.txt")])
+    def test_writes_report_for_sampled_request(self, tmp_path, mode, suffix):
+        """Test that a sampled request writes a profiling report."""
+        env = {
+            "SWARM_PROFILE_SAMPLE_RATE": "1.0",
+            "SWARM_PROFILE_MODE": mode,
+            "SWARM_PROFILE_DIR": str(tmp_path),
+        }
+        with patch.dict(os.environ, env):
+            profiler = RequestProfiler.maybe_start("req123")
+            assert list(profiler.profile_steps(iter([sum(i * i for i in range(10000))]))) == [333283335000]
+            path = profiler.stop()
+
+        assert path.endswith(f"req123{suffix}")
+        assert os.path.getsize(path) > 0
+
+    def test_steps_are_profiled_on_the_thread_running_them(self, tmp_path):
+        """Test that no profile hook stays installed between steps, whichever thread runs them."""
+        profiler = RequestProfiler("req", "cprofile", str(tmp_path))
+        assert profiler.start()
+
+        def stream():
+            for _ in range(2):
+                yield sum(i * i for i in range(1000))
+
+        steps = profiler.profile_steps(stream())
+        worker = threading.Thread(target=next, args=(steps,))
+        worker.start()
+        worker.join()
+        next(steps)
+
+        assert sys.getprofile() is None
+        with open(profiler.stop()) as f:
+            assert "(stream)" in f.read()
+
+    def test_report_includes_upstream_work_on_the_producer_thread(self, tmp_path):
+        """Test that the report covers the buffered stream's producer thread, not just the consumer."""
+        profiler = RequestProfiler("req", "cprofile", str(tmp_path))
+        assert profiler.start()
+        client = SwarmClient(model="m", token="t", client=ReplayInferenceClient(synthetic_cassette(50), speed=0))
+
+        stream = buffered_stream(client.stream_swarm_response("prompt"), 4, step_hook=profiler.profile_steps)
+        list(profiler.profile_steps(stream))
+
+        with open(profiler.stop()) as f:
+            report = f.read()
+        assert "cassette.py" in report
+        assert "stream_swarm_response" in report
+
+    def test_unwritable_profile_dir_returns_none(self, tmp_path):
+        """Test that a report that cannot be written is logged rather than raised."""
+        blocker = tmp_path / "not_a_directory"
+        blocker.write_text("")
+        profiler = RequestProfiler("req", "cprofile", str(blocker / "profiles"))
+        assert profiler.start()
+        list(profiler.profile_steps(iter([1, 2])))
+
+        with patch("utils.tracing.SwarmLogger.log_error") as log_error:
+            assert profiler.stop() is None
+        assert log_error.call_args.args[0] == "TracingError"
+
+    def test_not_sampled_when_rate_is_zero(self):
+        """Test that profiling is off by default."""
+        with patch.dict(os.environ, {"SWARM_PROFILE_SAMPLE_RATE": "0"}):
+            assert RequestProfiler.maybe_start("req") is None
@@ -0,0 +1,155 @@
+"""Tests for token usage accounting and budgets."""
+
+import json
+import os
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+from utils.api import SwarmClient
+from utils.usage import TokenUsage, UsageLedger
+
+MODEL_70B = "meta-llama/Meta-Llama-3.1-70B-Instruct"
+MODEL_8B = "meta-llama/Meta-Llama-3.1-8B-Instruct"
+
+
+def chunk(content, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class TestTokenUsage:
+    """Test suite for TokenUsage."""
+
+    def test_cost_uses_cost_table(self):
+        """Test pricing with the configured cost table and env overrides."""
+        usage = TokenUsage(1_000_000, 500_000)
+        with patch.dict(os.environ, {"SWARM_MODEL_COSTS": json.dumps({"custom/model": [1.0, 3.0]})}):
+            assert usage.cost_usd("custom/model") == pytest.approx(2.5)
+            assert usage.cost_usd("unlisted/model") == 0.0
+
+    def test_from_stream_requires_counts(self):
+        """Test that only usage objects with integer counts are accepted."""
+        assert TokenUsage.from_stream(None) is None
+        assert TokenUsage.from_stream(SimpleNamespace(prompt_tokens=3, completion_tokens=4)).total_tokens == 7
+
+
+class TestSwarmClientUsage:
+    """Test suite for usage captured by SwarmClient."""
+
+    def test_reported_usage_is_captured(self):
+        """Test that the stream's usage chunk is used and requested."""
+        injected = Mock()
+        injected.chat_completion.return_value = [
+            chunk("Hello"),
+            chunk(" World"),
+            chunk(None, SimpleNamespace(prompt_tokens=42, completion_tokens=2)),
+        ]
+        client = SwarmClient(model="m", token="t", client=injected)
+
+        assert list(client.stream_swarm_response("prompt")) == ["Hello", "Hello World"]
+        assert injected.chat_completion.call_args.kwargs["stream_options"] == {"include_usage": True}
+        assert (client.last_usage.prompt_tokens, client.last_usage.completion_tokens) == (42, 2)
+        assert not client.last_usage.estimated
+
+    def test_stream_options_skipped_for_clients_without_it(self):
+        """Test that stream_options is not sent to a chat_completion that does not take it."""
+        calls = []
+
+        class OldInferenceClient:
+            def chat_completion(self, messages, max_tokens=None, stream=False, temperature=None):
+                calls.append(max_tokens)
+                return [chunk("Hello")]
+
+        client = SwarmClient(model="m", token="t", client=OldInferenceClient())
+
+        assert list(client.stream_swarm_response("prompt")) == ["Hello"]
+        assert calls == [4096]
+
+    @patch.dict(os.environ, {"SWARM_STREAM_USAGE": "0"})
+    def test_missing_usage_is_estimated(self):
+        """Test that usage is estimated when the stream reports none."""
+        injected = Mock()
+        injected.chat_completion.return_value = [chunk("x" * 40)]
+        client = SwarmClient(model="m", token="t", client=injected)
+
+        list(client.stream_swarm_response("p" * 400))
+        list(client.stream_swarm_response("p" * 400))
+
+        assert "stream_options" not in injected.chat_completion.call_args.kwargs
+        assert client.last_usage.estimated
+        assert (client.usage.prompt_tokens, client.usage.completion_tokens) == (200, 20)
+
+
+class TestUsageLedger:
+    """Test suite for UsageLedger aggregation, persistence and budgets."""
+
+    def test_totals_are_persisted(self, tmp_path):
+        """Test that model and daily totals survive a reload."""
+        UsageLedger.record(MODEL_70B, TokenUsage(1000, 500), session_id="s1", elapsed_s=2.0)
+        UsageLedger.record(MODEL_70B, TokenUsage(1000, 500, estimated=True), session_id="s2")
+
+        # The second request is written by the next flush (at the latest, at exit)
+        assert json.loads((tmp_path / "usage.json").read_text())["models"][MODEL_70B]["requests"] == 1
+        UsageLedger.flush()
+        UsageLedger.reset()
+        summary = UsageLedger.summary()
+
+        totals = summary["models"][MODEL_70B]
+        assert totals["requests"] == 2
+        assert totals["completion_tokens"] == 1000
+        assert totals["estimated_requests"] == 1
+        assert summary["today"]["cost_usd"] == pytest.approx(2 * 1500 * 0.88 / 1_000_000)
+        # Sessions are in-memory only
+        assert summary["sessions"] == 0
+        assert json.loads((tmp_path / "usage.json").read_text())["version"] == 1
+
+    def test_flush_adds_to_other_workers_totals(self, tmp_path):
+        """Test that workers sharing the usage file add to its totals instead of overwriting them."""
+        UsageLedger.record(MODEL_70B, TokenUsage(1000, 500))
+        path = tmp_path / "usage.json"
+        data = json.loads(path.read_text())
+        # Another worker flushes a request of its own
+        data["models"][MODEL_8B] = {"requests": 1, "prompt_tokens": 10, "completion_tokens": 5, "estimated_requests": 0, "cost_usd": 0.5}
+        path.write_text(json.dumps(data))
+
+        UsageLedger.record(MODEL_70B, TokenUsage(1000, 500))
+        UsageLedger.flush()
+
+        models = json.loads(path.read_text())["models"]
+        assert models[MODEL_70B]["requests"] == 2
+        assert models[MODEL_8B]["requests"] == 1
+        assert UsageLedger.summary()["models"][MODEL_8B]["cost_usd"] == 0.5
+
+    @pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+    def test_usage_file_is_private(self, tmp_path, monkeypatch):
+        """Test that the usage file and its directory are readable only by the user."""
+        path = tmp_path / "ledger" / "usage.json"
+        monkeypatch.setenv("SWARM_USAGE_FILE", str(path))
+
+        UsageLedger.record(MODEL_70B, TokenUsage(1000, 500))
+
+        assert os.stat(path.parent).st_mode & 0o777 == 0o700
+        assert os.stat(path).st_mode & 0o777 == 0o600
+        assert not [name for name in os.listdir(path.parent) if name.endswith(".tmp")]
+
+    @patch.dict(os.environ, {"SWARM_SESSION_BUDGET_USD": "0.001"})
+    def test_session_budget_rejects(self):
+        """Test that a used-up session budget rejects only that session."""
+        UsageLedger.record(MODEL_70B, TokenUsage(1000, 1000), session_id="spender")
+
+        allowed, _, message = UsageLedger.check_budget(MODEL_70B, "spender")
+        assert not allowed
+        assert "Session budget" in message
+        assert UsageLedger.check_budget(MODEL_70B, "other") == (True, MODEL_70B, None)
+
+    @patch.dict(os.environ, {"SWARM_DAILY_BUDGET_USD": "0.001", "SWARM_BUDGET_ACTION": "downgrade"})
+    def test_daily_budget_downgrades(self):
+        """Test that a used-up daily budget downgrades to the cheaper model."""
+        UsageLedger.record(MODEL_70B, TokenUsage(1000, 1000))
+
+        allowed, model, message = UsageLedger.check_budget(MODEL_70B)
+
+        assert allowed
+        assert model == MODEL_8B
+        assert "Daily budget" in message
@@ -6,6 +6,8 @@ from utils.validation import (
     validate_temperature,
     validate_max_tokens,
     validate_model,
+    validate_document,
+    validate_compare_models,
 )
 
 
@@ -143,3 +145,47 @@ class TestValidateModel:
         assert is_valid is False
         assert "cannot be empty" in error.lower()
 
+
+
+class TestValidateCompareModels:
+    """Test suite for comparison model selection."""
+    
+    def test_validate_compare_models_valid(self):
+        """Test validation of a valid selection."""
+        is_valid, error = validate_compare_models(["model1", "model2"], ["model1", "model2", "model3"], 4)
+        assert is_valid is True
+        assert error is None
+    
+    @pytest.mark.parametrize("models, max_models, fragment", [
+        (["model1"], 4, "at least two"),
+        (["model1", "model2", "model3"], 2, "maximum 2"),
+        (["model1", "model1"], 4, "once"),
+        (["model1", "unknown"], 4, "not in the available"),
+    ])
+    def test_validate_compare_models_invalid(self, models, max_models, fragment):
+        """Test validation of invalid selections."""
+        is_valid, error = validate_compare_models(models, ["model1", "model2", "model3"], max_models)
+        assert is_valid is False
+        assert fragment in error
+
+
+class TestValidateDocument:
+    """Test suite for document validation."""
+    
+    def test_validate_document_valid(self):
+        """Test validation of a document longer than the task limit."""
+        is_valid, error = validate_document("a" * 50000, 100000)
+        assert is_valid is True
+        assert error is None
+    
+    def test_validate_document_empty(self):
+        """Test validation of an empty document."""
+        is_valid, error = validate_document("   ", 100000)
+        assert is_valid is False
+        assert "document" in error.lower()
+    
+    def test_validate_document_too_long(self):
+        """Test validation of a document over the limit."""
+        is_valid, error = validate_document("a" * 101, 100)
+        assert is_valid is False
+        assert "too long" in error.lower()
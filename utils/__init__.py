@@ -4,6 +4,7 @@ from .prompts import build_swarm_prompt
 from .api import SwarmClient
 from .config import SwarmConfig
 from .logger import SwarmLogger
+from .metrics import SwarmMetrics
 from .errors import SwarmError, ConfigurationError, APIError, ValidationError
 
 __all__ = [
@@ -11,6 +12,7 @@ __all__ = [
     "SwarmClient",
     "SwarmConfig",
     "SwarmLogger",
+    "SwarmMetrics",
     "SwarmError",
     "ConfigurationError",
     "APIError",
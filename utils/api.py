@@ -1,26 +1,76 @@
 """API utilities for Hugging Face Inference Client."""
 
+import inspect
 import os
-from typing import Generator, Optional
+import threading
+from typing import Any, Generator, Optional
 from huggingface_hub import InferenceClient
 
+from .backends import create_backend
+from .config import SwarmConfig
+from .credentials import THROTTLE_STATUS_CODES, CredentialPool
 from .errors import APIError
+from .limiter import AdaptiveLimiters
+from .tracing import RequestTrace, span
+from .usage import TokenUsage
 
 
 class SwarmClient:
     """Wrapper for Hugging Face InferenceClient with SwarmMaster-specific logic."""
     
-    def __init__(self, model: str, token: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        model: str,
+        token: Optional[str] = None,
+        client: Optional[Any] = None,
+        trace: Optional[RequestTrace] = None,
+        pool: Optional[CredentialPool] = None,
+    ) -> None:
         """
         Initialize the SwarmClient.
         
         Args:
             model: The model identifier to use.
             token: Optional Hugging Face token. If None, uses HF_TOKEN env var.
+            client: Optional pre-built client exposing chat_completion (e.g. a
+                cassette replayer). If None, the model's configured backend is
+                used (see SWARM_MODEL_BACKENDS), and an InferenceClient is
+                created for models served by Hugging Face.
+            trace: Optional request trace that upstream spans are recorded on.
+            pool: Optional credential pool. When given (and the model is
+                served by Hugging Face), each request leases a token from the
+                pool and throttled requests fail over to another token.
+        
+        Requests to real backends wait for a slot under the model's adaptive
+        concurrency limit (see SWARM_ADAPTIVE_CONCURRENCY); injected clients
+        are not limited.
+        
+        Raises:
+            ConfigurationError: If the model's backend is misconfigured.
         """
         self.model = model
+        self.trace = trace
         self.token = token or os.getenv("HF_TOKEN")
-        self.client = InferenceClient(model=model, token=self.token)
+        self.backend = "injected" if client is not None else SwarmConfig.get_backend(model)["backend"]
+        if client is None:
+            client = create_backend(model)
+        self.pool = pool if client is None else None
+        self.limiter = AdaptiveLimiters.for_model(model) if self.backend != "injected" else None
+        self._pool_clients: dict[str, Any] = {}
+        # Token usage across all requests made by this client, and of the latest one
+        self.usage = TokenUsage()
+        self.last_usage: Optional[TokenUsage] = None
+        self._usage_lock = threading.Lock()
+        # Upstream streams currently open, so cancel() can close them from another thread
+        self._open_streams: list[Any] = []
+        self._streams_changed = threading.Condition()
+        self._cancelled = threading.Event()
+        if client is not None:
+            self.client = client
+        elif self.pool is not None:
+            self.client = None
+        else:
+            self.client = InferenceClient(model=model, token=self.token)
     
     def stream_swarm_response(
         self,
@@ -40,20 +90,240 @@ class SwarmClient:
             Accumulated response chunks as strings.
             
         Raises:
-            Exception: If the API call fails.
+            APIError: If the API call fails.
+        """
+        yield from self.stream_chat_response(
+            [{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+    
+    def stream_chat_response(
+        self,
+        messages: list[dict],
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> Generator[str, None, None]:
+        """
+        Stream responses from the model for a multi-turn conversation.
+        
+        Args:
+            messages: Chat messages ({"role": ..., "content": ...}) ending with
+                the user message to answer.
+            max_tokens: Maximum tokens to generate.
+            temperature: Sampling temperature.
+            
+        Yields:
+            Accumulated response chunks as strings.
+            
+        Raises:
+            APIError: If the API call fails, or no slot under the model's
+                concurrency limit frees up in time (status 503).
+        """
+        if self.limiter is None:
+            yield from self._stream_with_failover(messages, max_tokens, temperature)
+            return
+        
+        permit = self.limiter.acquire(timeout_s=SwarmConfig.get_limiter_queue_timeout_seconds())
+        ttft_s = None
+        status_code = None
+        try:
+            for accumulated in self._stream_with_failover(messages, max_tokens, temperature):
+                if ttft_s is None:
+                    ttft_s = self.limiter.clock() - permit.started
+                yield accumulated
+        except APIError as e:
+            # Only upstream responses say anything about the endpoint's load
+            status_code = e.status_code if e.upstream else None
+            raise
+        finally:
+            self.limiter.release(permit, ttft_s=ttft_s, status_code=status_code)
+    
+    def _stream_with_failover(
+        self,
+        messages: list[dict],
+        max_tokens: int,
+        temperature: float,
+    ) -> Generator[str, None, None]:
+        """Stream from the client, or from the credential pool with failover on throttling."""
+        if self.pool is None:
+            yield from self._stream(self.client, messages, max_tokens, temperature)
+            return
+        
+        # Retry throttled requests on another credential until output has started
+        for attempt in range(self.pool.size):
+            credential = self.pool.acquire()
+            outcome: dict[str, Any] = {}
+            produced = False
+            try:
+                for accumulated in self._stream(self._client_for(credential.token), messages, max_tokens, temperature):
+                    produced = True
+                    yield accumulated
+                return
+            except APIError as e:
+                throttled = e.status_code in THROTTLE_STATUS_CODES
+                outcome = {
+                    "throttled": throttled,
+                    "failed": not throttled,
+                    "status_code": e.status_code,
+                    "retry_after": e.retry_after,
+                }
+                if not throttled or produced or attempt == self.pool.size - 1:
+                    raise
+            finally:
+                self.pool.release(credential, **outcome)
+    
+    def cancel(self) -> None:
+        """
+        Abort this client's requests; safe to call from any thread.
+        
+        Open upstream streams are closed directly, so a stalled request gives
+        up its connection and concurrency slot without waiting for its next
+        chunk. Streams that cannot be closed while another thread reads them
+        (plain generators) stop at their next chunk. The client makes no
+        further requests afterwards.
+        """
+        self._cancelled.set()
+        with self._streams_changed:
+            streams = list(self._open_streams)
+        for stream in streams:
+            close = getattr(stream, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except ValueError:
+                    # A generator running on another thread; it stops at its next chunk
+                    pass
+    
+    def wait_idle(self, timeout_s: float) -> bool:
+        """
+        Wait until no upstream stream is open (and its usage is recorded).
+        
+        Returns:
+            False if streams were still open after timeout_s.
         """
+        with self._streams_changed:
+            return self._streams_changed.wait_for(lambda: not self._open_streams, timeout=timeout_s)
+    
+    def _add_usage(self, usage: TokenUsage) -> None:
+        """Record one request's usage (requests may run on several threads)."""
+        with self._usage_lock:
+            self.usage.add(usage)
+            self.last_usage = usage
+    
+    def _client_for(self, token: str) -> Any:
+        """Get (or create) the InferenceClient bound to a pooled token."""
+        client = self._pool_clients.get(token)
+        if client is None:
+            client = InferenceClient(model=self.model, token=token)
+            self._pool_clients[token] = client
+        return client
+    
+    def _stream(
+        self,
+        client: Any,
+        messages: list[dict],
+        max_tokens: int,
+        temperature: float,
+    ) -> Generator[str, None, None]:
+        """Stream accumulated text from one chat_completion call on client."""
         accumulated = ""
+        stream = None
+        upstream_span = None
+        reported_usage = None
+        options = {}
+        if SwarmConfig.get_stream_usage() and _accepts_stream_options(client):
+            options["stream_options"] = {"include_usage": True}
+        if self._cancelled.is_set():
+            return
         try:
-            for message in self.client.chat_completion(
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
-                stream=True,
-                temperature=temperature,
-            ):
+            with span(self.trace, "upstream.connect", model=self.model, backend=self.backend):
+                stream = client.chat_completion(
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    stream=True,
+                    temperature=temperature,
+                    **options,
+                )
+            with self._streams_changed:
+                self._open_streams.append(stream)
+            if self.trace is not None:
+                upstream_span = self.trace.start_span("upstream.ttft", model=self.model)
+            chunks = 0
+            for message in stream:
+                if self._cancelled.is_set():
+                    break
+                # The usage chunk (if any) arrives last, usually without choices
+                reported_usage = TokenUsage.from_stream(getattr(message, "usage", None)) or reported_usage
+                if not message.choices:
+                    continue
                 chunk = message.choices[0].delta.content or ""
                 if chunk:
+                    if chunks == 0 and upstream_span is not None:
+                        upstream_span.end()
+                        upstream_span = self.trace.start_span("upstream.stream", model=self.model)
+                    chunks += 1
                     accumulated += chunk
                     yield accumulated
+            if upstream_span is not None:
+                upstream_span.set(chunks=chunks, chars=len(accumulated))
         except Exception as e:
-            raise APIError(f"Failed to stream response: {str(e)}") from e
+            status_code, retry_after = _response_status(e)
+            raise APIError(
+                f"Failed to stream response: {str(e)}",
+                status_code=status_code,
+                retry_after=retry_after,
+                upstream=e.upstream if isinstance(e, APIError) else True,
+            ) from e
+        finally:
+            if reported_usage is not None or accumulated:
+                prompt_text = "".join(str(message.get("content") or "") for message in messages)
+                self._add_usage(reported_usage or TokenUsage.estimate(prompt_text, accumulated))
+            if upstream_span is not None:
+                upstream_span.end()
+            # Release the upstream connection when the consumer stops early
+            close = getattr(stream, "close", None)
+            if callable(close):
+                close()
+            with self._streams_changed:
+                if stream is not None and stream in self._open_streams:
+                    self._open_streams.remove(stream)
+                    self._streams_changed.notify_all()
+
+
+# Whether each client type's chat_completion takes stream_options (huggingface-hub < 0.24 does not)
+_STREAM_OPTIONS_SUPPORT: dict[type, bool] = {}
+
+
+def _accepts_stream_options(client: Any) -> bool:
+    """Check whether client.chat_completion accepts the stream_options keyword."""
+    client_type = type(client)
+    supported = _STREAM_OPTIONS_SUPPORT.get(client_type)
+    if supported is None:
+        try:
+            parameters = inspect.signature(client.chat_completion).parameters.values()
+        except (TypeError, ValueError):
+            # No introspectable signature; let the call itself decide
+            supported = True
+        else:
+            supported = any(
+                parameter.name == "stream_options" or parameter.kind is inspect.Parameter.VAR_KEYWORD
+                for parameter in parameters
+            )
+        _STREAM_OPTIONS_SUPPORT[client_type] = supported
+    return supported
+
 
+def _response_status(error: Exception) -> tuple[Optional[int], Optional[float]]:
+    """Extract the HTTP status and Retry-After seconds from an upstream error, if any."""
+    if isinstance(error, APIError):
+        return error.status_code, error.retry_after
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    retry_after = None
+    headers = getattr(response, "headers", None) or {}
+    try:
+        retry_after = float(headers.get("Retry-After"))
+    except (TypeError, ValueError, AttributeError):
+        pass
+    return (status_code if isinstance(status_code, int) else None), retry_after
@@ -0,0 +1,265 @@
+"""Inference backends for SwarmClient.
+
+SwarmClient streams from any object exposing the huggingface_hub
+``chat_completion(messages=..., max_tokens=..., stream=True, temperature=...)``
+call and yielding chunks with ``choices[0].delta.content`` (and an optional
+final ``usage``). Besides Hugging Face Inference (the default), this module
+provides:
+
+- ``OpenAICompatibleBackend``: any local or remote server speaking the OpenAI
+  ``/chat/completions`` streaming protocol (vLLM, llama.cpp server, Ollama,
+  LM Studio, TGI), using only the standard library.
+- ``LlamaCppBackend``: an in-process CPU backend running a quantized GGUF model
+  through the optional ``llama-cpp-python`` package.
+
+The backend for each model is configured with SWARM_MODEL_BACKENDS.
+"""
+
+import json
+import os
+import socket
+import threading
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+from typing import Any, Iterator, Optional
+
+from .config import SwarmConfig
+from .errors import APIError, ConfigurationError
+
+
+def _to_chunk(data: dict) -> SimpleNamespace:
+    """Convert an OpenAI-style stream chunk (a dict) to the shape SwarmClient reads."""
+    choices = [
+        SimpleNamespace(delta=SimpleNamespace(content=(choice.get("delta") or {}).get("content")))
+        for choice in data.get("choices") or []
+    ]
+    usage = data.get("usage")
+    if isinstance(usage, dict):
+        usage = SimpleNamespace(
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+        )
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class EventStream:
+    """
+    Iterator over the chunks of a streaming HTTP response.
+
+    Unlike a plain generator, close() may be called from any thread: if
+    another thread is blocked reading the response, the connection is shut
+    down so that read returns at once and the reader cleans up.
+    """
+
+    def __init__(self, response: Any) -> None:
+        self._response = response
+        self._events = self._read(response)
+
+    def __iter__(self) -> "EventStream":
+        return self
+
+    def __next__(self) -> SimpleNamespace:
+        return next(self._events)
+
+    def close(self) -> None:
+        """Close the stream and its HTTP response."""
+        try:
+            self._events.close()
+        except ValueError:
+            # Being read on another thread: wake it up by shutting the connection down
+            try:
+                with socket.fromfd(self._response.fileno(), socket.AF_INET, socket.SOCK_STREAM) as sock:
+                    sock.shutdown(socket.SHUT_RDWR)
+            except (AttributeError, OSError, ValueError):
+                pass
+
+    @staticmethod
+    def _read(response: Any) -> Iterator[SimpleNamespace]:
+        """Parse server-sent events into chunks until [DONE]."""
+        try:
+            for raw in response:
+                line = raw.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+                try:
+                    yield _to_chunk(json.loads(data))
+                except ValueError:
+                    continue
+        finally:
+            response.close()
+
+
+class OpenAICompatibleBackend:
+    """
+    Streaming client for an OpenAI-compatible chat completions endpoint.
+
+    Args:
+        model: Model name sent in requests (the server's name for it).
+        base_url: API root, e.g. "http://127.0.0.1:8000/v1".
+        api_key: Optional bearer token.
+        timeout: Connect/read timeout in seconds.
+    """
+
+    def __init__(self, model: str, base_url: str, api_key: Optional[str] = None, timeout: float = 120.0) -> None:
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def chat_completion(
+        self,
+        messages: list[dict],
+        max_tokens: int,
+        stream: bool = True,
+        temperature: float = 0.7,
+        stream_options: Optional[dict] = None,
+    ) -> EventStream:
+        """
+        Start a streaming chat completion.
+
+        Returns:
+            Iterator of stream chunks; closing it (from any thread) closes the HTTP response.
+
+        Raises:
+            APIError: If the server cannot be reached or rejects the request.
+        """
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True,
+        }
+        if stream_options:
+            payload["stream_options"] = stream_options
+        headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(
+            f"{self.base_url}/chat/completions",
+            data=json.dumps(payload).encode("utf-8"),
+            headers=headers,
+            method="POST",
+        )
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            retry_after = None
+            try:
+                retry_after = float(e.headers.get("Retry-After"))
+            except (TypeError, ValueError):
+                pass
+            raise APIError(f"{self.base_url} returned HTTP {e.code}", status_code=e.code, retry_after=retry_after) from e
+        except (urllib.error.URLError, OSError) as e:
+            raise APIError(f"Could not reach {self.base_url}: {e}") from e
+        return EventStream(response)
+
+
+class LlamaCppBackend:
+    """
+    In-process CPU backend running a GGUF model with llama-cpp-python.
+
+    Loaded models are shared process-wide, and generation on each model is
+    serialized because a llama.cpp context is not thread-safe.
+
+    Args:
+        model_path: Path to the GGUF model file.
+        n_ctx: Context window in tokens.
+        n_threads: CPU threads used for generation (None lets llama.cpp decide).
+    """
+
+    _lock = threading.Lock()
+    _models: dict[tuple, tuple[Any, threading.Lock]] = {}
+
+    def __init__(self, model_path: str, n_ctx: int = 4096, n_threads: Optional[int] = None) -> None:
+        try:
+            import llama_cpp  # noqa: F401
+        except ImportError as e:
+            raise ConfigurationError(
+                "The local backend requires llama-cpp-python. Install it with: pip install llama-cpp-python"
+            ) from e
+        if not os.path.exists(model_path):
+            raise ConfigurationError(f"Local model file not found: {model_path}")
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads
+
+    def _load(self) -> tuple[Any, threading.Lock]:
+        """Get the shared model instance and its generation lock, loading it once."""
+        key = (self.model_path, self.n_ctx, self.n_threads)
+        with LlamaCppBackend._lock:
+            if key not in LlamaCppBackend._models:
+                from llama_cpp import Llama
+
+                llm = Llama(model_path=self.model_path, n_ctx=self.n_ctx, n_threads=self.n_threads, verbose=False)
+                LlamaCppBackend._models[key] = (llm, threading.Lock())
+            return LlamaCppBackend._models[key]
+
+    def chat_completion(
+        self,
+        messages: list[dict],
+        max_tokens: int,
+        stream: bool = True,
+        temperature: float = 0.7,
+        stream_options: Optional[dict] = None,
+    ) -> Iterator[SimpleNamespace]:
+        """Start a streaming chat completion on the local model."""
+        llm, generation_lock = self._load()
+        return self._generate(llm, generation_lock, messages, max_tokens, temperature)
+
+    @staticmethod
+    def _generate(
+        llm: Any,
+        generation_lock: threading.Lock,
+        messages: list[dict],
+        max_tokens: int,
+        temperature: float,
+    ) -> Iterator[SimpleNamespace]:
+        with generation_lock:
+            for data in llm.create_chat_completion(
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+            ):
+                yield _to_chunk(data)
+
+
+def create_backend(model: str) -> Optional[Any]:
+    """
+    Build the configured backend for a model.
+
+    Args:
+        model: The model identifier selected by the user.
+
+    Returns:
+        A client exposing chat_completion, or None for Hugging Face Inference
+        (which SwarmClient builds itself, with the credential pool).
+
+    Raises:
+        ConfigurationError: If the backend is misconfigured or its optional
+            dependency is missing.
+    """
+    spec = SwarmConfig.get_backend(model)
+    kind = spec["backend"]
+    if kind == "openai":
+        api_key_env = spec.get("api_key_env")
+        return OpenAICompatibleBackend(
+            model=spec.get("model", model),
+            base_url=spec.get("base_url", SwarmConfig.DEFAULT_OPENAI_BASE_URL),
+            api_key=os.getenv(api_key_env) if api_key_env else None,
+            timeout=float(spec.get("timeout", SwarmConfig.get_backend_timeout_seconds())),
+        )
+    if kind == "local":
+        if not spec.get("model_path"):
+            raise ConfigurationError(f"Local backend for '{model}' needs a model_path.")
+        return LlamaCppBackend(
+            spec["model_path"],
+            n_ctx=int(spec.get("n_ctx", SwarmConfig.DEFAULT_LOCAL_CONTEXT_TOKENS)),
+            n_threads=spec.get("n_threads"),
+        )
+    return None
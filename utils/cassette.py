@@ -0,0 +1,264 @@
+"""Record and replay chat_completion streams for deterministic tests and benchmarks.
+
+A cassette captures the content and arrival time of every chunk of a real
+streaming response. Replaying it through SwarmClient reproduces production
+token timing and chunk-size distributions offline, at recorded or scaled speed.
+
+Usage:
+    python -m utils.cassette record "Design a viral AI tool" -o cassettes/viral.json.gz
+    python -m utils.cassette info cassettes/viral.json.gz
+"""
+
+import argparse
+import gzip
+import json
+import random
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Generator, Optional
+
+CASSETTE_VERSION = 1
+
+
+class StreamCassette:
+    """Recorded stream: chunk contents with offsets (seconds) from request start."""
+
+    def __init__(self, model: str, chunks: Optional[list[tuple[float, str]]] = None, metadata: Optional[dict] = None) -> None:
+        self.model = model
+        self.chunks: list[tuple[float, str]] = list(chunks or [])
+        self.metadata = dict(metadata or {})
+
+    @property
+    def ttft_s(self) -> Optional[float]:
+        """Time to first chunk in seconds."""
+        return self.chunks[0][0] if self.chunks else None
+
+    @property
+    def duration_s(self) -> float:
+        """Time from request start to the last chunk in seconds."""
+        return self.chunks[-1][0] if self.chunks else 0.0
+
+    @property
+    def text(self) -> str:
+        """Full response text."""
+        return "".join(content for _, content in self.chunks)
+
+    def to_dict(self) -> dict:
+        """Serialise to the compact cassette format (millisecond offsets)."""
+        return {
+            "version": CASSETTE_VERSION,
+            "model": self.model,
+            "metadata": self.metadata,
+            "chunks": [[round(offset * 1000, 1), content] for offset, content in self.chunks],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StreamCassette":
+        """Load from the compact cassette format."""
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version: {data.get('version')}")
+        chunks = [(offset_ms / 1000, content) for offset_ms, content in data.get("chunks", [])]
+        return cls(data.get("model", ""), chunks, data.get("metadata"))
+
+    def save(self, path: str) -> None:
+        """Write the cassette to path (gzip-compressed if it ends in .gz)."""
+        payload = json.dumps(self.to_dict(), separators=(",", ":"), ensure_ascii=False)
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as f:
+            f.write(payload)
+
+    @classmethod
+    def load(cls, path: str) -> "StreamCassette":
+        """Read a cassette from path (gzip-compressed if it ends in .gz)."""
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def _chunk(content: Optional[str]) -> SimpleNamespace:
+    """Build an object shaped like a huggingface_hub stream output chunk."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=None)],
+        usage=None,
+    )
+
+
+class RecordingInferenceClient:
+    """InferenceClient wrapper that records every streamed chat_completion."""
+
+    def __init__(self, client: Any, model: str = "", clock: Callable[[], float] = time.perf_counter) -> None:
+        self.client = client
+        self.model = model
+        self.clock = clock
+        self.cassettes: list[StreamCassette] = []
+
+    @property
+    def last_cassette(self) -> Optional[StreamCassette]:
+        """The most recently recorded cassette, if any."""
+        return self.cassettes[-1] if self.cassettes else None
+
+    def chat_completion(self, *args: Any, **kwargs: Any) -> Any:
+        """Proxy chat_completion, recording chunk timings when streaming."""
+        if not kwargs.get("stream"):
+            return self.client.chat_completion(*args, **kwargs)
+        return self._record(*args, **kwargs)
+
+    def _record(self, *args: Any, **kwargs: Any) -> Generator[Any, None, None]:
+        started = self.clock()
+        cassette = StreamCassette(
+            self.model,
+            metadata={
+                "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "max_tokens": kwargs.get("max_tokens"),
+                "temperature": kwargs.get("temperature"),
+            },
+        )
+        self.cassettes.append(cassette)
+        stream = self.client.chat_completion(*args, **kwargs)
+        try:
+            for message in stream:
+                content = message.choices[0].delta.content if message.choices else None
+                if content:
+                    cassette.chunks.append((self.clock() - started, content))
+                yield message
+        finally:
+            close = getattr(stream, "close", None)
+            if callable(close):
+                close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+
+class ReplayInferenceClient:
+    """Stand-in for InferenceClient that replays a cassette.
+
+    Args:
+        cassette: The recorded stream to replay.
+        speed: Playback speed multiplier; 1.0 replays recorded timing, 2.0 is
+            twice as fast, and 0 replays instantly without sleeping.
+        sleep: Sleep function, injectable for tests.
+    """
+
+    def __init__(self, cassette: StreamCassette, speed: float = 1.0, sleep: Callable[[float], None] = time.sleep) -> None:
+        self.cassette = cassette
+        self.speed = speed
+        self.sleep = sleep
+        self.calls: list[dict] = []
+
+    def chat_completion(self, messages: Any = None, stream: bool = False, **kwargs: Any) -> Any:
+        """Replay the cassette as a chat_completion response."""
+        self.calls.append({"messages": messages, "stream": stream, **kwargs})
+        if stream:
+            return self._replay()
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.cassette.text), finish_reason="stop")],
+            usage=None,
+        )
+
+    def _replay(self) -> Generator[SimpleNamespace, None, None]:
+        elapsed = 0.0
+        for offset, content in self.cassette.chunks:
+            if self.speed > 0:
+                delay = (offset - elapsed) / self.speed
+                if delay > 0:
+                    self.sleep(delay)
+            elapsed = offset
+            yield _chunk(content)
+
+
+def synthetic_cassette(
+    tokens: int,
+    ttft_s: float = 0.5,
+    tokens_per_second: float = 40.0,
+    model: str = "synthetic",
+    seed: int = 0,
+) -> StreamCassette:
+    """
+    Build a production-shaped cassette without network access.
+
+    Chunks are one token each (a word or punctuation mark, occasionally a
+    newline or Markdown agent header) with jittered inter-token gaps.
+
+    Args:
+        tokens: Number of chunks to generate.
+        ttft_s: Time to first token in seconds.
+        tokens_per_second: Mean generation rate.
+        model: Model name to record in the cassette.
+        seed: Random seed; the same seed always produces the same cassette.
+
+    Returns:
+        A deterministic synthetic cassette.
+    """
+    rng = random.Random(seed)
+    words = [
+        "the", "swarm", "agent", "design", "deliver", "user", "value", "system", "plan",
+        "architecture", "research", "market", "build", "test", "launch", "metrics", "risk",
+    ]
+    chunks: list[tuple[float, str]] = []
+    offset = ttft_s
+    gap = 1.0 / tokens_per_second
+    for i in range(tokens):
+        roll = rng.random()
+        if i % 400 == 0:
+            content = f"\n\n**Agent: Role {i // 400 + 1}**\n"
+        elif roll < 0.05:
+            content = ".\n"
+        elif roll < 0.12:
+            content = ","
+        else:
+            content = " " + rng.choice(words)
+        chunks.append((round(offset, 4), content))
+        offset += gap * rng.uniform(0.5, 1.5)
+    return StreamCassette(model, chunks, {"synthetic": True, "seed": seed})
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Command-line entry point for recording and inspecting cassettes."""
+    parser = argparse.ArgumentParser(prog="python -m utils.cassette", description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record = subparsers.add_parser("record", help="Record a real swarm stream")
+    record.add_argument("task", help="Task to run through the swarm prompt")
+    record.add_argument("-o", "--output", required=True, help="Cassette path (.json or .json.gz)")
+    record.add_argument("--model", default=None, help="Model identifier (default: SWARM_MODEL)")
+    record.add_argument("--max-tokens", type=int, default=None)
+    record.add_argument("--temperature", type=float, default=None)
+
+    info = subparsers.add_parser("info", help="Show cassette statistics")
+    info.add_argument("path")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        from .api import SwarmClient
+        from .config import SwarmConfig
+        from .prompts import build_swarm_prompt
+
+        from huggingface_hub import InferenceClient
+
+        model = args.model or SwarmConfig.get_model()
+        token = SwarmConfig.get_token()
+        recorder = RecordingInferenceClient(InferenceClient(model=model, token=token), model=model)
+        swarm_client = SwarmClient(model=model, token=token, client=recorder)
+        for _ in swarm_client.stream_swarm_response(
+            build_swarm_prompt(args.task),
+            max_tokens=args.max_tokens or SwarmConfig.get_max_tokens(),
+            temperature=args.temperature if args.temperature is not None else SwarmConfig.get_temperature(),
+        ):
+            pass
+        recorder.last_cassette.save(args.output)
+        cassette = recorder.last_cassette
+    else:
+        cassette = StreamCassette.load(args.path)
+
+    print(
+        f"model={cassette.model} chunks={len(cassette.chunks)} chars={len(cassette.text)} "
+        f"ttft={cassette.ttft_s or 0:.3f}s duration={cassette.duration_s:.3f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,211 @@
+"""Side-by-side comparison of several models on one task.
+
+The same prompt is streamed to every selected model concurrently, so latency
+and quality differences show up within a single wall-clock run instead of
+one run per model. Each model's progress is tracked in a ModelRun with live
+time to first token, decode rate and total time.
+"""
+
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Generator, Optional
+
+from .api import SwarmClient
+from .metrics import SwarmMetrics
+from .streaming import pump_stream
+from .tokens import estimate_tokens
+
+# How long an abandoned comparison waits for the unfinished models' streams to close
+CLOSE_TIMEOUT_S = 2.0
+
+
+class ModelRun:
+    """Progress and timings (seconds since the comparison started) of one model."""
+
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self.text = ""
+        self.chunks = 0
+        self.first_token_s: Optional[float] = None
+        self.total_s: Optional[float] = None
+        self.completion_tokens: Optional[int] = None
+        self.error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the model finished or failed."""
+        return self.total_s is not None
+
+    def tokens(self) -> int:
+        """Completion tokens: as reported by the model when done, estimated while streaming."""
+        return self.completion_tokens if self.completion_tokens is not None else estimate_tokens(self.text)
+
+    def tokens_per_second(self, now_s: float) -> Optional[float]:
+        """Decode rate after the first token, up to now_s (or the end of the run)."""
+        if self.first_token_s is None:
+            return None
+        decode_s = (self.total_s if self.done else now_s) - self.first_token_s
+        return self.tokens() / decode_s if decode_s > 0 else None
+
+    def to_dict(self, now_s: float) -> dict:
+        """Timings and size of the run, for reports and metrics."""
+        return {
+            "model": self.model,
+            "ttft_s": self.first_token_s,
+            "tokens_per_second": self.tokens_per_second(now_s),
+            "total_s": self.total_s,
+            "tokens": self.tokens(),
+            "chars": len(self.text),
+            "error": self.error,
+        }
+
+
+def stream_comparison(
+    clients: dict[str, SwarmClient],
+    prompt: str,
+    max_tokens: int = 4096,
+    temperature: float = 0.7,
+    clock: Callable[[], float] = time.perf_counter,
+) -> Generator[list[ModelRun], None, None]:
+    """
+    Stream one prompt to several models at once.
+
+    Args:
+        clients: Client per model, in display order.
+        prompt: The full prompt sent to every model.
+        max_tokens: Maximum tokens to generate per model.
+        temperature: Sampling temperature.
+        clock: Clock in seconds, injectable for tests.
+
+    Yields:
+        The list of runs (the same objects, updated in place) after every
+        chunk, completion or failure. A failing model does not stop the others.
+        If the consumer stops early, the unfinished models' clients are
+        cancelled and their streams closed (for up to CLOSE_TIMEOUT_S) before
+        the generator returns, so their usage is final.
+    """
+    started = clock()
+    models = list(clients)
+    runs = [ModelRun(model) for model in models]
+    events: queue.Queue = queue.Queue()
+    cancel = threading.Event()
+
+    for index, model in enumerate(models):
+        threading.Thread(
+            target=pump_stream,
+            args=(clients[model], index, prompt, max_tokens, temperature, events, cancel),
+            name=f"swarm-compare-{index}",
+            daemon=True,
+        ).start()
+
+    remaining = len(runs)
+    try:
+        while remaining:
+            kind, index, payload = events.get()
+            run = runs[index]
+            now = clock() - started
+            if kind == "chunk":
+                if run.first_token_s is None:
+                    run.first_token_s = now
+                run.chunks += 1
+                run.text = payload
+            else:
+                run.total_s = now
+                remaining -= 1
+                if kind == "error":
+                    run.error = str(payload)
+                else:
+                    usage = getattr(clients[run.model], "last_usage", None)
+                    completion_tokens = getattr(usage, "completion_tokens", None)
+                    if isinstance(completion_tokens, int) and completion_tokens > 0:
+                        run.completion_tokens = completion_tokens
+            yield runs
+    finally:
+        # Stop the remaining models if the consumer went away early, closing their
+        # streams now rather than on their next chunk, which may never come
+        cancel.set()
+        unfinished = [clients[run.model] for run in runs if not run.done]
+        for client in unfinished:
+            client.cancel()
+        deadline = time.monotonic() + CLOSE_TIMEOUT_S
+        for client in unfinished:
+            client.wait_idle(max(0.0, deadline - time.monotonic()))
+
+    for run in runs:
+        labels = {"model": run.model}
+        SwarmMetrics.increment("compare.runs", labels={**labels, "result": "error" if run.error else "ok"})
+        if run.first_token_s is not None:
+            SwarmMetrics.observe("compare.ttft_seconds", run.first_token_s, labels=labels)
+        if run.tokens_per_second(run.total_s) is not None:
+            SwarmMetrics.observe("compare.tokens_per_second", run.tokens_per_second(run.total_s), labels=labels)
+        SwarmMetrics.observe("compare.total_seconds", run.total_s, labels=labels)
+
+
+def _seconds(value: Optional[float]) -> str:
+    return f"{value:.2f}s" if value is not None else "—"
+
+
+def format_comparison_table(runs: list[ModelRun], now_s: float) -> str:
+    """
+    Format live per-model stats as a Markdown table.
+
+    Args:
+        runs: The runs to show.
+        now_s: Seconds since the comparison started, used for models still streaming.
+
+    Returns:
+        Markdown table with TTFT, tokens/sec, total time and status per model.
+    """
+    lines = [
+        "| Model | TTFT | Tokens/sec | Total | Tokens | Status |",
+        "| --- | --- | --- | --- | --- | --- |",
+    ]
+    for run in runs:
+        rate = run.tokens_per_second(now_s)
+        if run.error:
+            status = "❌ failed"
+        elif run.done:
+            status = "✅ done"
+        else:
+            status = "⏳ streaming" if run.first_token_s is not None else "⏳ waiting"
+        lines.append(
+            f"| {run.model} | {_seconds(run.first_token_s)} | {f'{rate:.1f}' if rate is not None else '—'} "
+            f"| {_seconds(run.total_s if run.done else now_s)} | {run.tokens()} | {status} |"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison_report(task: str, runs: list[ModelRun], metadata: Optional[dict] = None) -> str:
+    """
+    Format a finished comparison for export.
+
+    Args:
+        task: The task every model was given.
+        runs: The finished runs.
+        metadata: Optional settings to include (e.g. temperature).
+
+    Returns:
+        Report with the stats table followed by each model's response.
+    """
+    end_s = max((run.total_s or 0.0 for run in runs), default=0.0)
+    lines = [
+        "=" * 80,
+        "SwarmMaster Model Comparison",
+        "=" * 80,
+        f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Models: {', '.join(run.model for run in runs)}",
+        f"Wall-clock time: {end_s:.2f}s",
+    ]
+    for key, value in (metadata or {}).items():
+        lines.append(f"{key}: {value}")
+    lines.extend(["", "=" * 80, "TASK", "=" * 80, task, "", "=" * 80, "STATS", "=" * 80])
+    lines.append(format_comparison_table(runs, end_s))
+    for run in runs:
+        lines.extend(["", "=" * 80, f"RESPONSE: {run.model}", "=" * 80])
+        lines.append(run.text or "No response generated.")
+        if run.error:
+            lines.append(f"\n❌ {run.error}")
+    lines.extend(["", "=" * 80])
+    return "\n".join(lines)
@@ -0,0 +1,242 @@
+"""Input compression applied to long tasks before prompt construction."""
+
+import re
+import time
+from typing import Optional
+
+from .api import SwarmClient
+from .config import SwarmConfig
+from .errors import APIError
+from .logger import SwarmLogger
+from .mapreduce import chunk_text
+from .metrics import SwarmMetrics
+from .prompts import build_summary_prompt
+from .tokens import CHARS_PER_TOKEN, estimate_tokens
+
+# Leading timestamps such as "2025-01-01 12:00:00,123" or "[2025-01-01T12:00:00Z]"
+_TIMESTAMP_RE = re.compile(r"^\[?\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?\]?\s*")
+# Decorative separator lines made of punctuation only
+_SEPARATOR_RE = re.compile(r"^[\s\-=_*#~+.]{5,}$")
+# Runs of spaces/tabs inside a line (leading indentation is preserved)
+_INNER_WHITESPACE_RE = re.compile(r"(?<=\S)[ \t]{2,}")
+
+# Non-adjacent duplicates are only removed for lines at least this long, so short
+# structural lines (e.g. "}" or "return None") are never dropped
+MIN_DEDUP_LINE_LENGTH = 40
+
+# Output budget for each map-step summary
+SUMMARY_MAX_TOKENS = 1024
+
+
+class CompressionResult:
+    """Outcome of compressing a task, with size and timing statistics."""
+
+    def __init__(self, original: str, text: str) -> None:
+        self.original = original
+        self.text = text
+        self.elapsed_s = 0.0
+        self.summarized = False
+        self.duplicate_lines_removed = 0
+
+    @property
+    def original_tokens(self) -> int:
+        """Estimated tokens in the original task."""
+        return estimate_tokens(self.original)
+
+    @property
+    def compressed_tokens(self) -> int:
+        """Estimated tokens in the compressed task."""
+        return estimate_tokens(self.text)
+
+    @property
+    def ratio(self) -> float:
+        """Compressed size as a fraction of the original (1.0 = unchanged)."""
+        if not self.original:
+            return 1.0
+        return len(self.text) / len(self.original)
+
+    def estimated_seconds_saved(self, prefill_tokens_per_second: float) -> float:
+        """
+        Estimate the prompt-processing time saved by compression.
+
+        Args:
+            prefill_tokens_per_second: Assumed upstream prompt-processing rate.
+
+        Returns:
+            Seconds of prefill avoided minus the time spent compressing.
+        """
+        tokens_saved = self.original_tokens - self.compressed_tokens
+        return tokens_saved / prefill_tokens_per_second - self.elapsed_s
+
+
+def _dedup_key(line: str) -> str:
+    """Normalise a line for duplicate detection by ignoring leading timestamps."""
+    return _TIMESTAMP_RE.sub("", line.strip())
+
+
+def compress_text(text: str) -> tuple[str, int]:
+    """
+    Apply cheap local compression to a block of text.
+
+    Trailing whitespace and inner whitespace runs are collapsed, blank-line runs
+    and decorative separators are squashed, consecutive repeated lines (ignoring
+    timestamps) are folded into a single line with a repeat count, and long lines
+    that already appeared earlier are dropped.
+
+    Args:
+        text: The text to compress.
+
+    Returns:
+        Tuple of (compressed_text, duplicate_lines_removed)
+    """
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+
+    output: list[str] = []
+    seen: set[str] = set()
+    removed = 0
+    previous_key: Optional[str] = None
+    repeats = 0
+
+    def flush_repeats() -> None:
+        if repeats:
+            output.append(f"[previous line repeated {repeats} more times]")
+
+    for raw_line in lines:
+        line = _INNER_WHITESPACE_RE.sub(" ", raw_line.rstrip())
+
+        if _SEPARATOR_RE.match(line):
+            line = "---"
+
+        key = _dedup_key(line)
+        if previous_key is not None and key == previous_key:
+            # Consecutive repeats; blank lines and separators collapse silently
+            if key and key != "---":
+                repeats += 1
+                removed += 1
+            continue
+
+        flush_repeats()
+        repeats = 0
+        previous_key = key
+
+        if len(key) >= MIN_DEDUP_LINE_LENGTH:
+            if key in seen:
+                removed += 1
+                continue
+            seen.add(key)
+
+        output.append(line)
+
+    flush_repeats()
+    return "\n".join(output).strip("\n"), removed
+
+
+def _summarize(client: SwarmClient, text: str) -> str:
+    """Run a single summarization request and return the final text."""
+    summary = ""
+    for chunk in client.stream_swarm_response(
+        build_summary_prompt(text),
+        max_tokens=SUMMARY_MAX_TOKENS,
+        temperature=0.2,
+    ):
+        summary = chunk
+    return summary.strip()
+
+
+def summarize_text(text: str, client: SwarmClient, threshold_tokens: int) -> str:
+    """
+    Condense text with a map-reduce summarization pass.
+
+    The text is split into pieces of roughly threshold_tokens, each piece is
+    summarized (map), and the summaries are joined (reduce). If the joined
+    summaries are still over the threshold they are summarized once more.
+
+    Args:
+        text: The text to condense.
+        client: Client used for the summarization requests.
+        threshold_tokens: Target maximum size in estimated tokens.
+
+    Returns:
+        The condensed text.
+
+    Raises:
+        APIError: If a summarization request fails.
+    """
+    pieces = chunk_text(text, threshold_tokens * CHARS_PER_TOKEN)
+    summaries = [_summarize(client, piece) for piece in pieces]
+    combined = "\n\n".join(summary for summary in summaries if summary)
+    if len(pieces) > 1 and estimate_tokens(combined) > threshold_tokens:
+        combined = _summarize(client, combined)
+    return combined
+
+
+def compress_task(
+    task: str,
+    client: Optional[SwarmClient] = None,
+    summarize_threshold: Optional[int] = None,
+) -> CompressionResult:
+    """
+    Compress a task before it is inlined into the swarm prompt.
+
+    Args:
+        task: The user's task description.
+        client: Optional client; when given, inputs still over the threshold
+            after local compression are summarized by the model.
+        summarize_threshold: Estimated token count above which to summarize.
+
+    Returns:
+        CompressionResult with the text to use and compression statistics.
+        If summarization fails the locally compressed text is kept.
+    """
+    started = time.perf_counter()
+    text, removed = compress_text(task)
+    result = CompressionResult(task, text)
+    result.duplicate_lines_removed = removed
+
+    if client is not None and summarize_threshold and estimate_tokens(text) > summarize_threshold:
+        try:
+            summary = summarize_text(text, client, summarize_threshold)
+        except APIError as e:
+            SwarmLogger.log_error("APIError", f"Input summarization failed: {str(e)}", task)
+            summary = ""
+        if summary and len(summary) < len(text):
+            result.text = summary
+            result.summarized = True
+
+    result.elapsed_s = time.perf_counter() - started
+    return result
+
+
+def record_compression(result: CompressionResult) -> None:
+    """Publish input compression statistics to metrics and logs."""
+    seconds_saved = result.estimated_seconds_saved(SwarmConfig.get_prefill_tokens_per_second())
+    SwarmMetrics.observe("compression.ratio", result.ratio)
+    SwarmMetrics.observe("compression.seconds", result.elapsed_s)
+    SwarmMetrics.observe("compression.estimated_seconds_saved", seconds_saved)
+    SwarmMetrics.increment("compression.tokens_saved", result.original_tokens - result.compressed_tokens)
+    SwarmLogger.log_compression(
+        result.original_tokens,
+        result.compressed_tokens,
+        result.ratio,
+        result.elapsed_s,
+        seconds_saved,
+        result.summarized,
+    )
+
+
+def compress_and_record(task: str, client: Optional[SwarmClient] = None) -> CompressionResult:
+    """
+    Compress a task with the configured summarize threshold and record the outcome.
+
+    Shared by the UI and the API server so both publish the same statistics.
+
+    Args:
+        task: The user's task description.
+        client: Optional client used to summarize inputs still over the threshold.
+
+    Returns:
+        CompressionResult with the text to use and compression statistics.
+    """
+    result = compress_task(task, client=client, summarize_threshold=SwarmConfig.get_summarize_threshold())
+    record_compression(result)
+    return result
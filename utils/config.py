@@ -1,7 +1,112 @@
-"""Configuration management for SwarmMaster."""
+"""Configuration management for SwarmMaster.
 
+Settings come from the environment and, optionally, a JSON config file named by
+SWARM_CONFIG_FILE (environment variables win). They are validated once into an
+immutable ConfigSnapshot that every SwarmConfig getter reads from. A reload
+builds a new snapshot and swaps it in atomically, so running swarms keep the
+values they already read while new requests see the new ones.
+"""
+
+import json
 import os
-from typing import Optional
+import signal
+import tempfile
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Optional
+
+from .errors import ConfigurationError
+from .logger import SwarmLogger
+from .metrics import SwarmMetrics
+
+# Environment variables read into the snapshot (besides those starting with SWARM_)
+SNAPSHOT_ENV_NAMES = ("HF_TOKEN", "HF_TOKENS")
+
+
+class ConfigSnapshot:
+    """
+    Immutable, validated view of the settings in effect.
+
+    Args:
+        values: Raw setting values by name (e.g. "SWARM_MAX_TOKENS": "2048").
+        version: Number of the load that produced the snapshot.
+        source: Where the values came from, for logs.
+        errors: Validation messages for values that were dropped.
+    """
+
+    def __init__(
+        self,
+        values: Mapping[str, str],
+        version: int = 0,
+        source: str = "environment",
+        errors: tuple[str, ...] = (),
+    ) -> None:
+        self.values = MappingProxyType(dict(values))
+        self.version = version
+        self.source = source
+        self.errors = tuple(errors)
+        self.loaded_at = time.time()
+        # Values derived from the settings (e.g. parsed JSON), computed on first use
+        self._derived: dict[str, Any] = {}
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Get a raw setting value, or default if it is not set."""
+        return self.values.get(name, default)
+
+    def derived(self, key: str, factory: Callable[[], Any]) -> Any:
+        """Get a value computed from this snapshot, computing it once."""
+        if key not in self._derived:
+            self._derived[key] = factory()
+        return self._derived[key]
+
+    def summary(self) -> dict:
+        """Version, source, load time and validation errors, for the metrics panel."""
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "invalid_settings": list(self.errors),
+        }
+
+    def changes(self, other: "ConfigSnapshot") -> dict[str, tuple[Optional[str], Optional[str]]]:
+        """Settings that differ in other, as name -> (value here, value in other)."""
+        names = sorted(set(self.values) | set(other.values))
+        return {
+            name: (self.values.get(name), other.values.get(name))
+            for name in names
+            if self.values.get(name) != other.values.get(name)
+        }
+
+
+def _read_config_file(path: str) -> dict[str, str]:
+    """
+    Read a JSON config file mapping setting names to values.
+
+    Scalars are stored as strings; lists and objects (e.g. SWARM_MODEL_BACKENDS)
+    as JSON.
+
+    Raises:
+        ConfigurationError: If the file cannot be read or is not a JSON object.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigurationError(f"Cannot load config file {path}: {e}") from e
+    if not isinstance(data, dict):
+        raise ConfigurationError(f"Config file {path} must contain a JSON object.")
+    values = {}
+    for name, value in data.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            values[name] = "1" if value else "0"
+        elif isinstance(value, (list, dict)):
+            values[name] = json.dumps(value)
+        else:
+            values[name] = str(value)
+    return values
 
 
 class SwarmConfig:
@@ -20,48 +125,848 @@ class SwarmConfig:
         "google/gemma-7b-it",
     ]
     
+    # Inference backends, selected per model with SWARM_MODEL_BACKENDS
+    BACKEND_KINDS = ("hf", "openai", "local")
+    DEFAULT_OPENAI_BASE_URL = "http://127.0.0.1:8000/v1"
+    DEFAULT_BACKEND_TIMEOUT_SECONDS = 120.0
+    DEFAULT_LOCAL_CONTEXT_TOKENS = 4096
+    
+    # Token pool for spreading load across several accounts
+    TOKEN_STRATEGIES = ("least_loaded", "round_robin")
+    DEFAULT_TOKEN_COOLDOWN_SECONDS = 60.0
+    
+    # Adaptive (AIMD) limit on streams in flight per model
+    DEFAULT_LIMITER_INITIAL = 4
+    DEFAULT_LIMITER_MIN = 1
+    DEFAULT_LIMITER_MAX = 32
+    DEFAULT_LIMITER_QUEUE_TIMEOUT_SECONDS = 30.0
+    
+    # Fast draft model streamed while the selected model warms up
+    DEFAULT_PREVIEW_MODEL = "meta-llama/Meta-Llama-3.1-8B-Instruct"
+    
+    # Input compression ahead of prompt construction
+    DEFAULT_SUMMARIZE_THRESHOLD_TOKENS = 1500
+    DEFAULT_PREFILL_TOKENS_PER_SECOND = 1000.0
+    
+    # Map-reduce mode for documents larger than a single prompt
+    DEFAULT_MAX_DOCUMENT_CHARS = 2_000_000
+    DEFAULT_MAPREDUCE_CHUNK_CHARS = 6000
+    DEFAULT_MAPREDUCE_OVERLAP_CHARS = 500
+    DEFAULT_MAPREDUCE_MAX_WORKERS = 4
+    DEFAULT_MAPREDUCE_FAN_IN = 4
+    DEFAULT_CHECKPOINT_TTL_SECONDS = 24 * 3600.0
+    
+    # Side-by-side comparison mode
+    MAX_COMPARE_MODELS = 4
+    
+    # Downloadable exports and comparison reports, pruned as new ones are written
+    DEFAULT_EXPORT_TTL_SECONDS = 3600.0
+    DEFAULT_EXPORT_MAX_FILES = 50
+    
+    # UI stream coalescing (0 disables the corresponding trigger)
+    DEFAULT_UI_FLUSH_INTERVAL_MS = 50
+    DEFAULT_UI_FLUSH_CHARS = 0
+    
+    # Snapshots buffered between the upstream reader thread and a slow consumer
+    DEFAULT_STREAM_BUFFER_SIZE = 16
+    
+    # Startup preflight
+    DEFAULT_PREFLIGHT_SLOW_SECONDS = 5.0
+    
+    # Multi-turn sessions: recent turns are sent verbatim, older ones as a rolling summary
+    DEFAULT_SESSION_WINDOW_TURNS = 2
+    DEFAULT_SESSION_MAX_TURN_CHARS = 4000
+    DEFAULT_SESSION_SUMMARY_TOKENS = 400
+    # Session memory: responses this long are stored compressed, sessions over
+    # their byte budget fold old turns into the summary, and idle or least
+    # recently used sessions are spilled to disk once the global budget is hit
+    DEFAULT_SESSION_COMPRESS_MIN_CHARS = 1024
+    DEFAULT_SESSION_MAX_BYTES = 256 * 1024
+    DEFAULT_SESSIONS_MAX_BYTES = 64 * 1024 * 1024
+    DEFAULT_SESSION_IDLE_SECONDS = 1800.0
+    
+    # Token usage accounting: USD per million (input, output) tokens.
+    # Illustrative list prices; override with SWARM_MODEL_COSTS for your provider.
+    DEFAULT_MODEL_COSTS = {
+        "meta-llama/Meta-Llama-3.1-70B-Instruct": (0.88, 0.88),
+        "meta-llama/Meta-Llama-3.1-8B-Instruct": (0.18, 0.18),
+        "mistralai/Mixtral-8x7B-Instruct-v0.1": (0.60, 0.60),
+        "google/gemma-7b-it": (0.20, 0.20),
+    }
+    BUDGET_ACTIONS = ("reject", "downgrade")
+    DEFAULT_USAGE_FLUSH_SECONDS = 5.0
+    DEFAULT_BUDGET_DOWNGRADE_MODEL = "meta-llama/Meta-Llama-3.1-8B-Instruct"
+    
+    # Programmatic SSE/HTTP API
+    DEFAULT_API_MAX_BATCH = 16
+    DEFAULT_API_BATCH_MAX_WORKERS = 4
+    
+    # Tracing and profiling
+    TRACE_FORMATS = ("chrome", "otlp")
+    PROFILE_MODES = ("cprofile", "tracemalloc")
+    
+    # Config hot reload: how often SWARM_CONFIG_FILE is checked for changes
+    DEFAULT_CONFIG_POLL_SECONDS = 2.0
+    
+    # Expected type of each setting, checked when a snapshot is loaded;
+    # invalid values are dropped (so the default applies) and reported
+    SETTING_TYPES = {
+        "SWARM_MAX_TOKENS": "int",
+        "SWARM_TEMPERATURE": "float",
+        "SWARM_MODELS": "list",
+        "SWARM_MODEL_BACKENDS": "json",
+        "SWARM_MODEL_COSTS": "json",
+        "SWARM_BACKEND_TIMEOUT_SECONDS": "float",
+        "SWARM_TOKEN_STRATEGY": TOKEN_STRATEGIES,
+        "SWARM_TOKEN_COOLDOWN_SECONDS": "float",
+        "SWARM_ADAPTIVE_CONCURRENCY": "bool",
+        "SWARM_SPLIT_AGENTS": "bool",
+        "SWARM_COLLAPSE_AGENTS": "bool",
+        "SWARM_LIMITER_INITIAL": "int",
+        "SWARM_LIMITER_MIN": "int",
+        "SWARM_LIMITER_MAX": "int",
+        "SWARM_LIMITER_TTFT_SLO_SECONDS": "float",
+        "SWARM_LIMITER_QUEUE_TIMEOUT_SECONDS": "float",
+        "SWARM_PREVIEW": "bool",
+        "SWARM_COMPRESS_INPUT": "bool",
+        "SWARM_SUMMARIZE_INPUT": "bool",
+        "SWARM_SUMMARIZE_THRESHOLD_TOKENS": "int",
+        "SWARM_PREFILL_TOKENS_PER_SECOND": "float",
+        "SWARM_MAX_DOCUMENT_CHARS": "int",
+        "SWARM_MAPREDUCE_CHUNK_CHARS": "int",
+        "SWARM_MAPREDUCE_OVERLAP_CHARS": "int",
+        "SWARM_MAPREDUCE_MAX_WORKERS": "int",
+        "SWARM_MAPREDUCE_FAN_IN": "int",
+        "SWARM_CHECKPOINT_TTL_SECONDS": "float",
+        "SWARM_EXPORT_TTL_SECONDS": "float",
+        "SWARM_EXPORT_MAX_FILES": "int",
+        "SWARM_UI_FLUSH_INTERVAL_MS": "int",
+        "SWARM_UI_FLUSH_CHARS": "int",
+        "SWARM_STREAM_BUFFER_SIZE": "int",
+        "SWARM_TRACE_FORMAT": TRACE_FORMATS,
+        "SWARM_PROFILE_SAMPLE_RATE": "float",
+        "SWARM_PROFILE_MODE": PROFILE_MODES,
+        "SWARM_PREFLIGHT": "bool",
+        "SWARM_PREFLIGHT_SLOW_SECONDS": "float",
+        "SWARM_SESSION_WINDOW_TURNS": "int",
+        "SWARM_SESSION_MAX_TURN_CHARS": "int",
+        "SWARM_SESSION_SUMMARY_TOKENS": "int",
+        "SWARM_SESSION_COMPRESS_MIN_CHARS": "int",
+        "SWARM_SESSION_MAX_BYTES": "int",
+        "SWARM_SESSIONS_MAX_BYTES": "int",
+        "SWARM_SESSION_IDLE_SECONDS": "float",
+        "SWARM_STREAM_USAGE": "bool",
+        "SWARM_USAGE_FLUSH_SECONDS": "float",
+        "SWARM_SESSION_BUDGET_USD": "float",
+        "SWARM_DAILY_BUDGET_USD": "float",
+        "SWARM_BUDGET_ACTION": BUDGET_ACTIONS,
+        "SWARM_API_MAX_BATCH": "int",
+        "SWARM_API_BATCH_MAX_WORKERS": "int",
+        "SWARM_CONFIG_POLL_SECONDS": "float",
+    }
+    
+    _snapshot_lock = threading.Lock()
+    _snapshot: Optional[ConfigSnapshot] = None
+    _version = 0
+    _reload_listeners: list[Callable[[ConfigSnapshot], None]] = []
+    
     @staticmethod
-    def get_model() -> str:
-        """Get the model identifier from environment or default."""
-        return os.getenv("SWARM_MODEL", SwarmConfig.DEFAULT_MODEL)
+    def _check_value(name: str, value: str) -> Optional[str]:
+        """Check a raw value against SETTING_TYPES; returns an error message, or None if valid."""
+        kind = SwarmConfig.SETTING_TYPES.get(name)
+        if kind is None or not value.strip():
+            return None
+        text = value.strip()
+        try:
+            if kind == "int":
+                int(text)
+            elif kind == "float":
+                float(text)
+            elif kind == "json" and not isinstance(json.loads(text), dict):
+                return f"{name} must be a JSON object"
+            elif kind == "list" and text.startswith("[") and not isinstance(json.loads(text), list):
+                return f"{name} must be a JSON list or comma-separated names"
+        except ValueError:
+            return f"{name}={text[:40]!r} is not a valid {kind}"
+        if kind == "bool" and text.lower() not in ("1", "true", "yes", "on", "0", "false", "no", "off"):
+            return f"{name}={text[:40]!r} is not a boolean"
+        if isinstance(kind, tuple) and text.lower() not in kind:
+            return f"{name}={text[:40]!r} is not one of {', '.join(kind)}"
+        return None
     
     @staticmethod
-    def get_token() -> Optional[str]:
-        """Get the Hugging Face token from environment."""
-        return os.getenv("HF_TOKEN")
+    def load_snapshot(environ: Optional[Mapping[str, str]] = None, path: Optional[str] = None) -> ConfigSnapshot:
+        """
+        Build a validated snapshot from a config file and the environment.
+        
+        Args:
+            environ: Environment to read (defaults to os.environ).
+            path: Config file; defaults to SWARM_CONFIG_FILE from environ.
+        
+        Returns:
+            The new snapshot. Invalid values are left out and listed in its errors.
+        
+        Raises:
+            ConfigurationError: If the config file cannot be read.
+        """
+        environ = os.environ if environ is None else environ
+        path = path if path is not None else environ.get("SWARM_CONFIG_FILE")
+        values = _read_config_file(path) if path else {}
+        for name, value in environ.items():
+            if name.startswith("SWARM_") or name in SNAPSHOT_ENV_NAMES:
+                values[name] = value
+        errors = []
+        for name in list(values):
+            error = SwarmConfig._check_value(name, values[name])
+            if error:
+                errors.append(error)
+                del values[name]
+        source = f"{path} + environment" if path else "environment"
+        return ConfigSnapshot(values, source=source, errors=tuple(errors))
     
     @staticmethod
-    def get_max_tokens() -> int:
-        """Get max tokens from environment or default."""
-        max_tokens = os.getenv("SWARM_MAX_TOKENS")
-        if max_tokens:
+    def current() -> ConfigSnapshot:
+        """Get the snapshot in effect, loading it on first use."""
+        snapshot = SwarmConfig._snapshot
+        if snapshot is None:
+            snapshot = SwarmConfig._swap(reason="startup", only_if_missing=True)
+        return snapshot
+    
+    @staticmethod
+    def reload(reason: str = "manual") -> ConfigSnapshot:
+        """
+        Load a new snapshot and swap it in atomically.
+        
+        In-flight requests keep the values they already read. If the config
+        file cannot be read, the current snapshot stays in effect.
+        
+        Args:
+            reason: What triggered the reload (e.g. "sighup", "file"), for logs.
+        
+        Returns:
+            The snapshot in effect after the reload.
+        """
+        return SwarmConfig._swap(reason)
+    
+    @staticmethod
+    def _swap(reason: str, only_if_missing: bool = False) -> ConfigSnapshot:
+        """
+        Load and swap in a snapshot under the snapshot lock.
+        
+        With only_if_missing, a snapshot another thread loaded first is
+        returned as is, so concurrent first reads load it once.
+        """
+        with SwarmConfig._snapshot_lock:
+            previous = SwarmConfig._snapshot
+            if only_if_missing and previous is not None:
+                return previous
             try:
-                return int(max_tokens)
+                snapshot = SwarmConfig.load_snapshot()
+            except ConfigurationError as e:
+                SwarmLogger.log_error("ConfigurationError", str(e))
+                SwarmMetrics.increment("config.reloads", labels={"result": "error"})
+                if previous is not None:
+                    return previous
+                snapshot = SwarmConfig.load_snapshot(path="")
+            SwarmConfig._version += 1
+            snapshot.version = SwarmConfig._version
+            for error in snapshot.errors:
+                SwarmLogger.log_error("ConfigurationError", f"Ignoring invalid setting: {error}")
+            if previous is not None:
+                for name, (old_value, new_value) in previous.changes(snapshot).items():
+                    SwarmLogger.log_config_change(name, old_value, new_value)
+            SwarmConfig._snapshot = snapshot
+        SwarmMetrics.increment("config.reloads", labels={"result": "ok", "reason": reason})
+        SwarmMetrics.set_gauge("config.version", snapshot.version)
+        SwarmMetrics.set_gauge("config.invalid_settings", len(snapshot.errors))
+        if previous is not None:
+            for listener in list(SwarmConfig._reload_listeners):
+                try:
+                    listener(snapshot)
+                except Exception as e:
+                    SwarmLogger.log_error("ConfigurationError", f"Reload listener failed: {e}")
+        return snapshot
+    
+    @staticmethod
+    def add_reload_listener(listener: Callable[[ConfigSnapshot], None]) -> None:
+        """
+        Call listener with the new snapshot after each reload that replaces one.
+        
+        Listeners run outside the snapshot lock, so they may read settings.
+        """
+        SwarmConfig._reload_listeners.append(listener)
+    
+    @staticmethod
+    def reset() -> None:
+        """Drop the snapshot so the next read loads a fresh one (used by tests)."""
+        SwarmConfig._snapshot = None
+    
+    @staticmethod
+    def _get(name: str, default: Optional[str] = None) -> Optional[str]:
+        """Read a raw setting from the current snapshot."""
+        return SwarmConfig.current().get(name, default)
+    
+    @staticmethod
+    def _get_bool(name: str, default: bool) -> bool:
+        """Parse a boolean setting."""
+        value = SwarmConfig._get(name)
+        if value is None or not value.strip():
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    
+    @staticmethod
+    def _get_int(name: str, default: int) -> int:
+        """Parse an integer setting."""
+        value = SwarmConfig._get(name)
+        if value:
+            try:
+                return int(value)
             except ValueError:
-                return SwarmConfig.DEFAULT_MAX_TOKENS
-        return SwarmConfig.DEFAULT_MAX_TOKENS
+                return default
+        return default
     
     @staticmethod
-    def get_temperature() -> float:
-        """Get temperature from environment or default."""
-        temperature = os.getenv("SWARM_TEMPERATURE")
-        if temperature:
+    def _get_float(name: str, default: float) -> float:
+        """Parse a float setting."""
+        value = SwarmConfig._get(name)
+        if value:
             try:
-                return float(temperature)
+                return float(value)
             except ValueError:
-                return SwarmConfig.DEFAULT_TEMPERATURE
-        return SwarmConfig.DEFAULT_TEMPERATURE
+                return default
+        return default
+    
+    @staticmethod
+    def get_model() -> str:
+        """Get the model identifier from the settings or default."""
+        return SwarmConfig._get("SWARM_MODEL", SwarmConfig.DEFAULT_MODEL)
+    
+    @staticmethod
+    def get_model_backends() -> dict[str, dict]:
+        """
+        Get the per-model backend table from SWARM_MODEL_BACKENDS.
+        
+        SWARM_MODEL_BACKENDS holds a JSON object mapping a model identifier to
+        either a backend kind ("hf", "openai" or "local") or an object with a
+        "backend" key and backend options, e.g.
+        {"local/phi-3": {"backend": "local", "model_path": "/models/phi-3.gguf"},
+         "llama3": {"backend": "openai", "base_url": "http://127.0.0.1:11434/v1"}}.
+        Entries with an unknown backend are ignored.
+        """
+        def parse() -> dict[str, dict]:
+            backends = {}
+            raw = SwarmConfig._get("SWARM_MODEL_BACKENDS")
+            if not raw:
+                return backends
+            for model, entry in json.loads(raw).items():
+                spec = {"backend": entry} if isinstance(entry, str) else entry
+                if isinstance(spec, dict) and spec.get("backend") in SwarmConfig.BACKEND_KINDS:
+                    backends[model] = dict(spec)
+            return backends
+        
+        return dict(SwarmConfig.current().derived("model_backends", parse))
+    
+    @staticmethod
+    def get_backend(model: str) -> dict:
+        """Get the backend spec for a model ({"backend": "hf"} unless configured otherwise)."""
+        return dict(SwarmConfig.get_model_backends().get(model, {"backend": "hf"}))
+    
+    @staticmethod
+    def is_hf_model(model: str) -> bool:
+        """Whether a model is served by Hugging Face Inference (and so needs HF_TOKEN)."""
+        return SwarmConfig.get_backend(model)["backend"] == "hf"
+    
+    @staticmethod
+    def get_available_models() -> list[str]:
+        """
+        Get the selectable models.
+        
+        SWARM_MODELS (a JSON list or comma-separated names) replaces the
+        built-in AVAILABLE_MODELS; models with a configured backend are added.
+        """
+        def build() -> list[str]:
+            raw = (SwarmConfig._get("SWARM_MODELS") or "").strip()
+            if raw.startswith("["):
+                models = [str(model) for model in json.loads(raw)]
+            elif raw:
+                models = [model.strip() for model in raw.split(",") if model.strip()]
+            else:
+                models = list(SwarmConfig.AVAILABLE_MODELS)
+            models.extend(model for model in SwarmConfig.get_model_backends() if model not in models)
+            return models
+        
+        return list(SwarmConfig.current().derived("available_models", build))
+    
+    @staticmethod
+    def get_hf_models() -> list[str]:
+        """Get the selectable models served by Hugging Face Inference."""
+        return [model for model in SwarmConfig.get_available_models() if SwarmConfig.is_hf_model(model)]
     
     @staticmethod
-    def validate_token() -> tuple[bool, Optional[str]]:
+    def get_backend_timeout_seconds() -> float:
+        """Get the connect/read timeout for OpenAI-compatible HTTP backends."""
+        return max(1.0, SwarmConfig._get_float("SWARM_BACKEND_TIMEOUT_SECONDS", SwarmConfig.DEFAULT_BACKEND_TIMEOUT_SECONDS))
+    
+    @staticmethod
+    def get_token() -> Optional[str]:
+        """Get the primary Hugging Face token (HF_TOKEN, else the first pooled token)."""
+        tokens = SwarmConfig.get_tokens()
+        return tokens[0] if tokens else None
+    
+    @staticmethod
+    def get_tokens() -> list[str]:
         """
-        Validate that HF_TOKEN is set.
+        Get all configured Hugging Face tokens.
+        
+        HF_TOKEN comes first, followed by the comma- or whitespace-separated
+        HF_TOKENS pool, without duplicates.
+        """
+        tokens = []
+        for token in [SwarmConfig._get("HF_TOKEN", "")] + SwarmConfig._get("HF_TOKENS", "").replace(",", " ").split():
+            token = token.strip()
+            if token and token not in tokens:
+                tokens.append(token)
+        return tokens
+    
+    @staticmethod
+    def get_token_strategy() -> str:
+        """Get how pooled tokens are selected ("least_loaded" or "round_robin")."""
+        strategy = SwarmConfig._get("SWARM_TOKEN_STRATEGY", "least_loaded").strip().lower()
+        return strategy if strategy in SwarmConfig.TOKEN_STRATEGIES else "least_loaded"
+    
+    @staticmethod
+    def get_token_cooldown_seconds() -> float:
+        """Get how long a throttled token is rested when upstream gives no Retry-After."""
+        return max(0.0, SwarmConfig._get_float("SWARM_TOKEN_COOLDOWN_SECONDS", SwarmConfig.DEFAULT_TOKEN_COOLDOWN_SECONDS))
+    
+    @staticmethod
+    def get_split_agents() -> bool:
+        """Get whether the chat shows each agent's section as its own message."""
+        return SwarmConfig._get_bool("SWARM_SPLIT_AGENTS", True)
+    
+    @staticmethod
+    def get_collapse_agents() -> bool:
+        """Get whether finished agent messages are collapsed in the chat."""
+        return SwarmConfig._get_bool("SWARM_COLLAPSE_AGENTS", False)
+    
+    @staticmethod
+    def get_adaptive_concurrency() -> bool:
+        """Get whether upstream streams are limited per model by the adaptive (AIMD) limiter."""
+        return SwarmConfig._get_bool("SWARM_ADAPTIVE_CONCURRENCY", True)
+    
+    @staticmethod
+    def get_limiter_initial() -> int:
+        """Get the starting limit on streams in flight per model."""
+        return max(1, SwarmConfig._get_int("SWARM_LIMITER_INITIAL", SwarmConfig.DEFAULT_LIMITER_INITIAL))
+    
+    @staticmethod
+    def get_limiter_min() -> int:
+        """Get the lowest limit on streams in flight per model."""
+        return max(1, SwarmConfig._get_int("SWARM_LIMITER_MIN", SwarmConfig.DEFAULT_LIMITER_MIN))
+    
+    @staticmethod
+    def get_limiter_max() -> int:
+        """Get the highest limit on streams in flight per model."""
+        return max(1, SwarmConfig._get_int("SWARM_LIMITER_MAX", SwarmConfig.DEFAULT_LIMITER_MAX))
+    
+    @staticmethod
+    def get_limiter_ttft_slo_seconds() -> float:
+        """Get the time to first token above which the limit is cut (0 uses the model's baseline only)."""
+        return max(0.0, SwarmConfig._get_float("SWARM_LIMITER_TTFT_SLO_SECONDS", 0.0))
+    
+    @staticmethod
+    def get_limiter_queue_timeout_seconds() -> float:
+        """Get how long a request waits for a slot under the limit before failing."""
+        return max(0.0, SwarmConfig._get_float(
+            "SWARM_LIMITER_QUEUE_TIMEOUT_SECONDS", SwarmConfig.DEFAULT_LIMITER_QUEUE_TIMEOUT_SECONDS
+        ))
+    
+    @staticmethod
+    def get_max_tokens() -> int:
+        """Get max tokens from the settings or default."""
+        return SwarmConfig._get_int("SWARM_MAX_TOKENS", SwarmConfig.DEFAULT_MAX_TOKENS)
+    
+    @staticmethod
+    def get_temperature() -> float:
+        """Get temperature from the settings or default."""
+        return SwarmConfig._get_float("SWARM_TEMPERATURE", SwarmConfig.DEFAULT_TEMPERATURE)
+    
+    @staticmethod
+    def get_preview_enabled() -> bool:
+        """Get whether the fast draft preview is enabled by default."""
+        return SwarmConfig._get_bool("SWARM_PREVIEW", False)
+    
+    @staticmethod
+    def get_preview_model() -> str:
+        """Get the draft model used for fast previews."""
+        return SwarmConfig._get("SWARM_PREVIEW_MODEL", SwarmConfig.DEFAULT_PREVIEW_MODEL)
+    
+    @staticmethod
+    def get_compress_input() -> bool:
+        """Get whether long task inputs are compressed before prompting."""
+        return SwarmConfig._get_bool("SWARM_COMPRESS_INPUT", False)
+    
+    @staticmethod
+    def get_summarize_input() -> bool:
+        """Get whether compressed inputs over the threshold are summarized by the model."""
+        return SwarmConfig._get_bool("SWARM_SUMMARIZE_INPUT", False)
+    
+    @staticmethod
+    def get_summarize_threshold() -> int:
+        """Get the estimated token count above which inputs are summarized."""
+        return SwarmConfig._get_int(
+            "SWARM_SUMMARIZE_THRESHOLD_TOKENS", SwarmConfig.DEFAULT_SUMMARIZE_THRESHOLD_TOKENS
+        )
+    
+    @staticmethod
+    def get_prefill_tokens_per_second() -> float:
+        """Get the assumed prompt-processing rate used to estimate time saved."""
+        return SwarmConfig._get_float(
+            "SWARM_PREFILL_TOKENS_PER_SECOND", SwarmConfig.DEFAULT_PREFILL_TOKENS_PER_SECOND
+        )
+    
+    @staticmethod
+    def get_max_document_chars() -> int:
+        """Get the maximum document size accepted by map-reduce mode."""
+        return SwarmConfig._get_int("SWARM_MAX_DOCUMENT_CHARS", SwarmConfig.DEFAULT_MAX_DOCUMENT_CHARS)
+    
+    @staticmethod
+    def get_mapreduce_chunk_chars() -> int:
+        """Get the size of each map-reduce document chunk in characters."""
+        return SwarmConfig._get_int("SWARM_MAPREDUCE_CHUNK_CHARS", SwarmConfig.DEFAULT_MAPREDUCE_CHUNK_CHARS)
+    
+    @staticmethod
+    def get_mapreduce_overlap_chars() -> int:
+        """Get the overlap between consecutive map-reduce chunks in characters."""
+        return SwarmConfig._get_int("SWARM_MAPREDUCE_OVERLAP_CHARS", SwarmConfig.DEFAULT_MAPREDUCE_OVERLAP_CHARS)
+    
+    @staticmethod
+    def get_mapreduce_max_workers() -> int:
+        """Get the maximum number of concurrent map-reduce requests."""
+        return SwarmConfig._get_int("SWARM_MAPREDUCE_MAX_WORKERS", SwarmConfig.DEFAULT_MAPREDUCE_MAX_WORKERS)
+    
+    @staticmethod
+    def get_mapreduce_fan_in() -> int:
+        """Get how many analyses are merged by each reduce request."""
+        return SwarmConfig._get_int("SWARM_MAPREDUCE_FAN_IN", SwarmConfig.DEFAULT_MAPREDUCE_FAN_IN)
+    
+    @staticmethod
+    def get_checkpoint_dir() -> str:
+        """Get the directory where map-reduce checkpoints are stored (per user by default)."""
+        user = f"_{os.getuid()}" if hasattr(os, "getuid") else ""
+        return SwarmConfig._get(
+            "SWARM_CHECKPOINT_DIR",
+            os.path.join(tempfile.gettempdir(), f"swarmmaster_checkpoints{user}"),
+        )
+    
+    @staticmethod
+    def get_checkpoint_ttl_seconds() -> float:
+        """Get how long an unfinished map-reduce checkpoint is kept (0 keeps it forever)."""
+        return max(0.0, SwarmConfig._get_float("SWARM_CHECKPOINT_TTL_SECONDS", SwarmConfig.DEFAULT_CHECKPOINT_TTL_SECONDS))
+    
+    @staticmethod
+    def get_export_dir() -> str:
+        """Get the directory that exports and comparison reports are written to (per user by default)."""
+        user = f"_{os.getuid()}" if hasattr(os, "getuid") else ""
+        return SwarmConfig._get(
+            "SWARM_EXPORT_DIR",
+            os.path.join(tempfile.gettempdir(), f"swarmmaster_exports{user}"),
+        )
+    
+    @staticmethod
+    def get_export_ttl_seconds() -> float:
+        """Get how long an export file is kept for download (0 disables the age limit)."""
+        return max(0.0, SwarmConfig._get_float("SWARM_EXPORT_TTL_SECONDS", SwarmConfig.DEFAULT_EXPORT_TTL_SECONDS))
+    
+    @staticmethod
+    def get_export_max_files() -> int:
+        """Get the most export files kept at once."""
+        return max(1, SwarmConfig._get_int("SWARM_EXPORT_MAX_FILES", SwarmConfig.DEFAULT_EXPORT_MAX_FILES))
+    
+    @staticmethod
+    def get_ui_flush_interval_ms() -> int:
+        """Get the minimum interval between chatbot updates in milliseconds."""
+        return SwarmConfig._get_int("SWARM_UI_FLUSH_INTERVAL_MS", SwarmConfig.DEFAULT_UI_FLUSH_INTERVAL_MS)
+    
+    @staticmethod
+    def get_ui_flush_chars() -> int:
+        """Get the content growth in characters that forces a chatbot update."""
+        return SwarmConfig._get_int("SWARM_UI_FLUSH_CHARS", SwarmConfig.DEFAULT_UI_FLUSH_CHARS)
+    
+    @staticmethod
+    def get_stream_buffer_size() -> int:
+        """Get the snapshot buffer size between upstream and consumer (0 disables the reader thread)."""
+        return max(0, SwarmConfig._get_int("SWARM_STREAM_BUFFER_SIZE", SwarmConfig.DEFAULT_STREAM_BUFFER_SIZE))
+    
+    @staticmethod
+    def get_trace_file() -> Optional[str]:
+        """Get the path where request traces are exported, if tracing export is enabled."""
+        return SwarmConfig._get("SWARM_TRACE_FILE") or None
+    
+    @staticmethod
+    def get_trace_format() -> str:
+        """Get the trace export format ("chrome" or "otlp")."""
+        fmt = SwarmConfig._get("SWARM_TRACE_FORMAT", "chrome").strip().lower()
+        return fmt if fmt in SwarmConfig.TRACE_FORMATS else "chrome"
+    
+    @staticmethod
+    def get_profile_sample_rate() -> float:
+        """Get the fraction of requests to profile (0.0 disables profiling)."""
+        return min(max(SwarmConfig._get_float("SWARM_PROFILE_SAMPLE_RATE", 0.0), 0.0), 1.0)
+    
+    @staticmethod
+    def get_profile_mode() -> str:
+        """Get the profiler used for sampled requests ("cprofile" or "tracemalloc")."""
+        mode = SwarmConfig._get("SWARM_PROFILE_MODE", "cprofile").strip().lower()
+        return mode if mode in SwarmConfig.PROFILE_MODES else "cprofile"
+    
+    @staticmethod
+    def get_profile_dir() -> str:
+        """Get the directory where profiling reports are written."""
+        return SwarmConfig._get(
+            "SWARM_PROFILE_DIR",
+            os.path.join(tempfile.gettempdir(), "swarmmaster_profiles"),
+        )
+    
+    @staticmethod
+    def get_preflight_enabled() -> bool:
+        """Get whether the background startup preflight runs."""
+        return SwarmConfig._get_bool("SWARM_PREFLIGHT", True)
+    
+    @staticmethod
+    def get_preflight_slow_seconds() -> float:
+        """Get the probe latency above which a model is marked slow."""
+        return SwarmConfig._get_float("SWARM_PREFLIGHT_SLOW_SECONDS", SwarmConfig.DEFAULT_PREFLIGHT_SLOW_SECONDS)
+    
+    @staticmethod
+    def get_session_window_turns() -> int:
+        """Get how many recent turns are sent verbatim in a multi-turn session."""
+        return max(1, SwarmConfig._get_int("SWARM_SESSION_WINDOW_TURNS", SwarmConfig.DEFAULT_SESSION_WINDOW_TURNS))
+    
+    @staticmethod
+    def get_session_max_turn_chars() -> int:
+        """Get the maximum characters kept from each side of a windowed turn."""
+        return max(200, SwarmConfig._get_int("SWARM_SESSION_MAX_TURN_CHARS", SwarmConfig.DEFAULT_SESSION_MAX_TURN_CHARS))
+    
+    @staticmethod
+    def get_session_summary_tokens() -> int:
+        """Get the token budget of a session's rolling summary."""
+        return max(50, SwarmConfig._get_int("SWARM_SESSION_SUMMARY_TOKENS", SwarmConfig.DEFAULT_SESSION_SUMMARY_TOKENS))
+    
+    @staticmethod
+    def get_session_compress_min_chars() -> int:
+        """Get the response length from which session turns are stored compressed."""
+        return max(0, SwarmConfig._get_int("SWARM_SESSION_COMPRESS_MIN_CHARS", SwarmConfig.DEFAULT_SESSION_COMPRESS_MIN_CHARS))
+    
+    @staticmethod
+    def get_session_max_bytes() -> int:
+        """Get the memory budget of one session in bytes."""
+        return max(1024, SwarmConfig._get_int("SWARM_SESSION_MAX_BYTES", SwarmConfig.DEFAULT_SESSION_MAX_BYTES))
+    
+    @staticmethod
+    def get_sessions_max_bytes() -> int:
+        """Get the memory budget of all sessions held by this worker in bytes."""
+        return max(1024, SwarmConfig._get_int("SWARM_SESSIONS_MAX_BYTES", SwarmConfig.DEFAULT_SESSIONS_MAX_BYTES))
+    
+    @staticmethod
+    def get_session_idle_seconds() -> float:
+        """Get how long a session may sit idle in memory before it is spilled to disk (0 disables)."""
+        return max(0.0, SwarmConfig._get_float("SWARM_SESSION_IDLE_SECONDS", SwarmConfig.DEFAULT_SESSION_IDLE_SECONDS))
+    
+    @staticmethod
+    def get_session_spill_dir() -> str:
+        """Get the directory that evicted sessions are spilled to (per user by default)."""
+        user = f"_{os.getuid()}" if hasattr(os, "getuid") else ""
+        return SwarmConfig._get(
+            "SWARM_SESSION_SPILL_DIR",
+            os.path.join(tempfile.gettempdir(), f"swarmmaster_sessions{user}"),
+        )
+    
+    @staticmethod
+    def get_stream_usage() -> bool:
+        """Get whether streams request a final usage chunk (stream_options.include_usage)."""
+        return SwarmConfig._get_bool("SWARM_STREAM_USAGE", True)
+    
+    @staticmethod
+    def get_model_costs() -> dict[str, tuple[float, float]]:
+        """
+        Get the cost table: model -> (USD per million input, USD per million output tokens).
+        
+        SWARM_MODEL_COSTS may hold a JSON object such as {"org/model": [0.5, 1.5]}
+        whose entries override or extend the defaults.
+        """
+        def parse() -> dict[str, tuple[float, float]]:
+            costs = dict(SwarmConfig.DEFAULT_MODEL_COSTS)
+            raw = SwarmConfig._get("SWARM_MODEL_COSTS")
+            if raw:
+                try:
+                    for model, (input_cost, output_cost) in json.loads(raw).items():
+                        costs[model] = (float(input_cost), float(output_cost))
+                except (ValueError, TypeError):
+                    pass
+            return costs
+        
+        return dict(SwarmConfig.current().derived("model_costs", parse))
+    
+    @staticmethod
+    def get_usage_file() -> str:
+        """Get the file that rolling usage totals are persisted to (per user by default)."""
+        user = f"_{os.getuid()}" if hasattr(os, "getuid") else ""
+        return SwarmConfig._get("SWARM_USAGE_FILE") or os.path.join(
+            tempfile.gettempdir(), f"swarmmaster_usage{user}", "usage.json"
+        )
+    
+    @staticmethod
+    def get_usage_flush_seconds() -> float:
+        """Get the minimum interval between writes of the usage file (0 writes after every request)."""
+        return max(0.0, SwarmConfig._get_float("SWARM_USAGE_FLUSH_SECONDS", SwarmConfig.DEFAULT_USAGE_FLUSH_SECONDS))
+    
+    @staticmethod
+    def get_session_budget_usd() -> float:
+        """Get the per-session spend limit in USD (0 disables it)."""
+        return SwarmConfig._get_float("SWARM_SESSION_BUDGET_USD", 0.0)
+    
+    @staticmethod
+    def get_daily_budget_usd() -> float:
+        """Get the per-day (UTC) spend limit in USD (0 disables it)."""
+        return SwarmConfig._get_float("SWARM_DAILY_BUDGET_USD", 0.0)
+    
+    @staticmethod
+    def get_budget_action() -> str:
+        """Get what happens once a budget is used up ("reject" or "downgrade")."""
+        action = SwarmConfig._get("SWARM_BUDGET_ACTION", "reject").strip().lower()
+        return action if action in SwarmConfig.BUDGET_ACTIONS else "reject"
+    
+    @staticmethod
+    def get_budget_downgrade_model() -> str:
+        """Get the cheaper model used when a budget is used up and the action is "downgrade"."""
+        return SwarmConfig._get("SWARM_BUDGET_DOWNGRADE_MODEL", SwarmConfig.DEFAULT_BUDGET_DOWNGRADE_MODEL)
+    
+    @staticmethod
+    def get_api_max_batch() -> int:
+        """Get the maximum number of tasks accepted in one batch API request."""
+        return max(1, SwarmConfig._get_int("SWARM_API_MAX_BATCH", SwarmConfig.DEFAULT_API_MAX_BATCH))
+    
+    @staticmethod
+    def get_api_batch_max_workers() -> int:
+        """Get the maximum number of batch API tasks run concurrently."""
+        return max(1, SwarmConfig._get_int("SWARM_API_BATCH_MAX_WORKERS", SwarmConfig.DEFAULT_API_BATCH_MAX_WORKERS))
+    
+    @staticmethod
+    def get_config_file() -> Optional[str]:
+        """Get the JSON config file read alongside the environment, if any."""
+        return os.getenv("SWARM_CONFIG_FILE") or None
+    
+    @staticmethod
+    def get_config_poll_seconds() -> float:
+        """Get how often the config file is checked for changes (0 disables watching)."""
+        return max(0.0, SwarmConfig._get_float("SWARM_CONFIG_POLL_SECONDS", SwarmConfig.DEFAULT_CONFIG_POLL_SECONDS))
+    
+    @staticmethod
+    def validate_token(model: Optional[str] = None) -> tuple[bool, Optional[str]]:
+        """
+        Validate that HF_TOKEN (or an HF_TOKENS pool) is set.
+        
+        Args:
+            model: Optional model about to be used. Models served by a local or
+                OpenAI-compatible backend do not need a Hugging Face token.
         
         Returns:
             Tuple of (is_valid, error_message)
         """
+        if model is not None and not SwarmConfig.is_hf_model(model):
+            return True, None
         token = SwarmConfig.get_token()
         if not token:
             return False, "HF_TOKEN not set. Please configure your Hugging Face token."
         return True, None
 
+
+class ConfigWatcher:
+    """Reload the configuration on SIGHUP and when the config file changes."""
+
+    _lock = threading.Lock()
+    _thread: Optional[threading.Thread] = None
+    _stop = threading.Event()
+    # Set by the SIGHUP handler and by stop() to wake the watcher thread
+    _wakeup = threading.Event()
+    _sighup_pending = False
+    _previous_handler: Any = None
+
+    @staticmethod
+    def _file_state(path: Optional[str]) -> Optional[tuple[float, int]]:
+        """Modification time and size of path, or None if it does not exist."""
+        try:
+            stat = os.stat(path) if path else None
+        except OSError:
+            return None
+        return (stat.st_mtime, stat.st_size) if stat else None
+
+    @staticmethod
+    def _on_sighup(signum, frame) -> None:
+        """Ask the watcher thread to reload (the handler itself must not take locks a reload needs)."""
+        ConfigWatcher._sighup_pending = True
+        ConfigWatcher._wakeup.set()
+
+    @staticmethod
+    def _watch(path: Optional[str], state: Optional[tuple[float, int]], poll_s: float) -> None:
+        while True:
+            ConfigWatcher._wakeup.wait(poll_s if path else None)
+            ConfigWatcher._wakeup.clear()
+            if ConfigWatcher._stop.is_set():
+                return
+            if ConfigWatcher._sighup_pending:
+                ConfigWatcher._sighup_pending = False
+                SwarmConfig.reload(reason="sighup")
+                state = ConfigWatcher._file_state(path)
+                continue
+            current = ConfigWatcher._file_state(path)
+            if path and current != state:
+                state = current
+                SwarmConfig.reload(reason="file")
+
+    @staticmethod
+    def start() -> bool:
+        """
+        Start watching for configuration changes.
+
+        SIGHUP triggers a reload (when running in the main thread on a platform
+        that has it), and SWARM_CONFIG_FILE is polled every
+        SWARM_CONFIG_POLL_SECONDS. Reloads run on a watcher thread; the signal
+        handler only wakes it.
+
+        Returns:
+            True if a watcher thread was started.
+        """
+        handle_sighup = hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread()
+        poll_s = SwarmConfig.get_config_poll_seconds()
+        path = SwarmConfig.get_config_file() if poll_s > 0 else None
+        with ConfigWatcher._lock:
+            if ConfigWatcher._thread is not None or not (handle_sighup or path):
+                return False
+            ConfigWatcher._stop.clear()
+            ConfigWatcher._wakeup.clear()
+            ConfigWatcher._sighup_pending = False
+            ConfigWatcher._thread = threading.Thread(
+                target=ConfigWatcher._watch,
+                args=(path, ConfigWatcher._file_state(path), poll_s),
+                name="swarm-config-watcher",
+                daemon=True,
+            )
+            ConfigWatcher._thread.start()
+            if handle_sighup:
+                ConfigWatcher._previous_handler = signal.signal(signal.SIGHUP, ConfigWatcher._on_sighup)
+            return True
+
+    @staticmethod
+    def stop() -> None:
+        """Stop the watcher thread and restore the previous SIGHUP handler."""
+        with ConfigWatcher._lock:
+            thread, ConfigWatcher._thread = ConfigWatcher._thread, None
+            previous, ConfigWatcher._previous_handler = ConfigWatcher._previous_handler, None
+            ConfigWatcher._stop.set()
+            ConfigWatcher._wakeup.set()
+        if previous is not None and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGHUP, previous)
+        if thread is not None:
+            thread.join(timeout=5)
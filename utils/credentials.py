@@ -0,0 +1,207 @@
+"""Pool of Hugging Face tokens for spreading upstream load across accounts.
+
+Each request leases one credential from the pool. Credentials that come back
+throttled (HTTP 429, or 402 when an account's quota is used up) are rested for
+the upstream Retry-After or SWARM_TOKEN_COOLDOWN_SECONDS before they are
+handed out again. Tokens never leave this module: stats, metrics and logs
+identify credentials only by a pool index and a short hash fingerprint.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Callable, Optional
+
+from .config import SwarmConfig
+from .errors import APIError, ConfigurationError
+from .logger import SwarmLogger
+from .metrics import SwarmMetrics
+
+# Upstream statuses that mean "this account is throttled", not "this request is bad"
+THROTTLE_STATUS_CODES = (402, 429)
+
+
+class Credential:
+    """A pooled token and its usage counters."""
+
+    def __init__(self, token: str, index: int) -> None:
+        self.token = token
+        self.credential_id = f"cred-{index + 1}"
+        self.fingerprint = hashlib.sha256(token.encode("utf-8")).hexdigest()[:8]
+        self.in_flight = 0
+        self.requests = 0
+        self.successes = 0
+        self.throttled = 0
+        self.errors = 0
+        self.cooldown_until = 0.0
+
+    def __repr__(self) -> str:
+        return f"Credential({self.credential_id}, token=***)"
+
+
+class CredentialPool:
+    """Thread-safe selection of credentials with throttle cooldowns.
+
+    Args:
+        tokens: Hugging Face tokens to pool.
+        strategy: "least_loaded" picks the credential with the fewest requests
+            in flight; "round_robin" cycles through credentials in order.
+        cooldown_s: Rest period after a throttled response without Retry-After.
+        clock: Monotonic clock in seconds, injectable for tests.
+    """
+
+    _shared_lock = threading.Lock()
+    _shared: Optional["CredentialPool"] = None
+    _shared_key: Optional[tuple] = None
+
+    def __init__(
+        self,
+        tokens: list[str],
+        strategy: str = "least_loaded",
+        cooldown_s: float = SwarmConfig.DEFAULT_TOKEN_COOLDOWN_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not tokens:
+            raise ConfigurationError("Credential pool needs at least one token.")
+        self.credentials = [Credential(token, index) for index, token in enumerate(tokens)]
+        self.strategy = strategy
+        self.cooldown_s = cooldown_s
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._next = 0
+
+    @property
+    def size(self) -> int:
+        """Number of pooled credentials."""
+        return len(self.credentials)
+
+    def acquire(self) -> Credential:
+        """
+        Lease a credential that is not cooling down.
+
+        Every acquire must be paired with a release.
+
+        Returns:
+            The selected credential.
+
+        Raises:
+            APIError: If every credential is cooling down (status_code 429,
+                retry_after set to the shortest remaining cooldown).
+        """
+        with self._lock:
+            now = self.clock()
+            ready = [c for c in self.credentials if c.cooldown_until <= now]
+            if not ready:
+                wait = min(c.cooldown_until for c in self.credentials) - now
+                SwarmMetrics.increment("credentials.exhausted")
+                raise APIError(
+                    f"All {self.size} credentials are rate limited; retry in {wait:.0f}s",
+                    status_code=429,
+                    retry_after=wait,
+                    upstream=False,
+                )
+
+            if self.strategy == "round_robin":
+                credential = None
+                for offset in range(self.size):
+                    candidate = self.credentials[(self._next + offset) % self.size]
+                    if candidate.cooldown_until <= now:
+                        credential = candidate
+                        self._next = (self._next + offset + 1) % self.size
+                        break
+            else:
+                credential = min(ready, key=lambda c: (c.in_flight, c.requests))
+
+            credential.in_flight += 1
+            credential.requests += 1
+            in_flight = credential.in_flight
+
+        SwarmMetrics.increment("credentials.requests", labels={"credential": credential.credential_id})
+        SwarmMetrics.set_gauge("credentials.in_flight", in_flight, labels={"credential": credential.credential_id})
+        return credential
+
+    def release(
+        self,
+        credential: Credential,
+        throttled: bool = False,
+        failed: bool = False,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """
+        Return a leased credential and record how the request went.
+
+        Args:
+            credential: The credential returned by acquire.
+            throttled: The upstream throttled this credential; it is cooled down.
+            failed: The request failed for another reason.
+            status_code: Upstream HTTP status, for logging.
+            retry_after: Upstream Retry-After in seconds, overriding the default cooldown.
+        """
+        cooldown = 0.0
+        with self._lock:
+            credential.in_flight = max(0, credential.in_flight - 1)
+            if throttled:
+                credential.throttled += 1
+                cooldown = retry_after if retry_after is not None and retry_after > 0 else self.cooldown_s
+                credential.cooldown_until = max(credential.cooldown_until, self.clock() + cooldown)
+            elif failed:
+                credential.errors += 1
+            else:
+                credential.successes += 1
+            in_flight = credential.in_flight
+
+        labels = {"credential": credential.credential_id}
+        SwarmMetrics.set_gauge("credentials.in_flight", in_flight, labels=labels)
+        if throttled:
+            SwarmMetrics.increment("credentials.throttled", labels=labels)
+            SwarmLogger.log_credential_throttled(credential.credential_id, status_code, cooldown)
+        elif failed:
+            SwarmMetrics.increment("credentials.errors", labels=labels)
+
+    def stats(self) -> list[dict]:
+        """Per-credential usage, identified by ID and fingerprint (tokens are never included)."""
+        with self._lock:
+            now = self.clock()
+            return [
+                {
+                    "credential": c.credential_id,
+                    "fingerprint": c.fingerprint,
+                    "in_flight": c.in_flight,
+                    "requests": c.requests,
+                    "successes": c.successes,
+                    "throttled": c.throttled,
+                    "errors": c.errors,
+                    "cooldown_remaining_s": round(max(0.0, c.cooldown_until - now), 1),
+                }
+                for c in self.credentials
+            ]
+
+    @staticmethod
+    def shared() -> Optional["CredentialPool"]:
+        """
+        Get the process-wide pool built from HF_TOKEN/HF_TOKENS.
+
+        The pool is rebuilt (and its stats reset) when the token configuration changes.
+
+        Returns:
+            The shared pool, or None if no token is configured.
+        """
+        tokens = SwarmConfig.get_tokens()
+        if not tokens:
+            return None
+        key = (tuple(tokens), SwarmConfig.get_token_strategy(), SwarmConfig.get_token_cooldown_seconds())
+        with CredentialPool._shared_lock:
+            if CredentialPool._shared is None or CredentialPool._shared_key != key:
+                if CredentialPool._shared is not None:
+                    SwarmLogger.log_config_change("HF_TOKENS", "***", "***")
+                CredentialPool._shared = CredentialPool(tokens, key[1], key[2])
+                CredentialPool._shared_key = key
+            return CredentialPool._shared
+
+    @staticmethod
+    def reset_shared() -> None:
+        """Forget the process-wide pool (used by tests)."""
+        with CredentialPool._shared_lock:
+            CredentialPool._shared = None
+            CredentialPool._shared_key = None
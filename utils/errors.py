@@ -1,5 +1,7 @@
 """Custom error classes for SwarmMaster."""
 
+from typing import Optional
+
 
 class SwarmError(Exception):
     """Base exception for SwarmMaster errors."""
@@ -12,8 +14,27 @@ class ConfigurationError(SwarmError):
 
 
 class APIError(SwarmError):
-    """Raised when API calls fail."""
-    pass
+    """Raised when API calls fail.
+    
+    Attributes:
+        status_code: HTTP status of the upstream response, if known.
+        retry_after: Seconds the upstream asked us to wait before retrying, if given.
+        upstream: False if SwarmMaster raised the error itself without an
+            upstream response (e.g. an exhausted credential pool); status_code
+            is then only the status to report to our own callers.
+    """
+    
+    def __init__(
+        self,
+        message: str = "",
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        upstream: bool = True,
+    ) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.upstream = upstream
 
 
 class ValidationError(SwarmError):
@@ -1,8 +1,14 @@
 """Export utilities for SwarmMaster results."""
 
+import os
+import tempfile
+import time
 from datetime import datetime
 from typing import Optional
 
+from .config import SwarmConfig
+from .files import ensure_private_dir
+
 
 def format_export_content(task: str, response: str, model: str, metadata: Optional[dict] = None) -> str:
     """
@@ -66,3 +72,65 @@ def export_to_file(content: str, filename: Optional[str] = None) -> str:
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     return f"swarmmaster_export_{timestamp}.txt"
 
+
+def prune_exports(directory: str, ttl_s: float, keep: int, now: Optional[float] = None) -> int:
+    """
+    Delete export files older than ttl_s, and all but the newest keep files.
+
+    Args:
+        directory: Export directory.
+        ttl_s: Age in seconds after which an export is deleted (0 disables the age limit).
+        keep: Most files to leave in place.
+        now: Current time (defaults to time.time()).
+
+    Returns:
+        Number of files removed.
+    """
+    now = time.time() if now is None else now
+    try:
+        names = [name for name in os.listdir(directory) if name.startswith("swarmmaster_") and name.endswith(".txt")]
+    except OSError:
+        return 0
+    files = []
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            files.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    files.sort(reverse=True)
+    removed = 0
+    for index, (mtime, path) in enumerate(files):
+        if index >= keep or (ttl_s > 0 and now - mtime > ttl_s):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                continue
+    return removed
+
+
+def save_export(content: str, prefix: str = "swarmmaster_") -> str:
+    """
+    Write content to a new file in the export directory for download.
+
+    Earlier exports past SWARM_EXPORT_TTL_SECONDS, or beyond the newest
+    SWARM_EXPORT_MAX_FILES, are deleted first, so downloads never pile up.
+
+    Args:
+        content: The text to write.
+        prefix: File name prefix (must start with "swarmmaster_").
+
+    Returns:
+        Path to the written file.
+
+    Raises:
+        OSError: If the file cannot be written.
+    """
+    directory = SwarmConfig.get_export_dir()
+    ensure_private_dir(directory)
+    prune_exports(directory, SwarmConfig.get_export_ttl_seconds(), SwarmConfig.get_export_max_files() - 1)
+    fd, path = tempfile.mkstemp(suffix=".txt", prefix=prefix, dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
@@ -0,0 +1,72 @@
+"""Private on-disk state for SwarmMaster.
+
+Usage totals, spilled sessions and map-reduce checkpoints default to the
+shared system temp dir, so they live in directories only the running user can
+read, and files are replaced through unique 0o600 temp files rather than fixed
+names another user could pre-create or link.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Generator
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+
+def ensure_private_dir(directory: str) -> None:
+    """
+    Create directory readable only by this user, or check that it already is.
+
+    Raises:
+        OSError: If it cannot be created or belongs to another user.
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if hasattr(os, "getuid"):
+        if info.st_uid != os.getuid():
+            raise OSError(f"{directory} is owned by another user")
+        if info.st_mode & 0o077:
+            os.chmod(directory, 0o700)
+
+
+def write_private_file(path: str, data: bytes) -> None:
+    """
+    Atomically replace path with data, via a unique 0o600 temp file beside it.
+
+    Raises:
+        OSError: If the file cannot be written.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def file_lock(path: str) -> Generator[None, None, None]:
+    """
+    Hold an exclusive advisory lock on path across processes (a no-op where fcntl is unavailable).
+
+    Raises:
+        OSError: If the lock file cannot be opened.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
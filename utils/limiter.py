@@ -0,0 +1,222 @@
+"""Adaptive upstream concurrency limits per model (AIMD).
+
+Instead of a fixed concurrency guess, each model gets a limit on streams in
+flight that is tuned from upstream feedback, like TCP congestion control:
+
+- Additive increase: every healthy response while at least half the limit
+  is in use adds 1/limit, so the limit grows by about one per limit's worth
+  of requests, and idle headroom does not inflate it.
+- Multiplicative decrease: a 429 or 5xx response, or a time to first token
+  far above the model's recent baseline (or above the configured SLO), cuts
+  the limit by DECREASE_FACTOR. Only responses to requests started after the
+  previous cut can cut again, so one burst of failures counts once.
+
+Requests over the limit wait for a slot (up to a timeout) instead of adding
+load to an endpoint that is already struggling.
+"""
+
+import math
+import threading
+import time
+from typing import Callable, Optional
+
+from .config import SwarmConfig
+from .errors import APIError
+from .metrics import SwarmMetrics
+
+# Upstream statuses that mean the endpoint is overloaded
+OVERLOAD_STATUS_CODES = (429,)
+
+
+class Permit:
+    """A slot held by one upstream request."""
+
+    def __init__(self, started: float, saturated: bool) -> None:
+        self.started = started
+        # Whether at least half the limit was in use when the slot was taken (only then may it grow)
+        self.saturated = saturated
+
+
+class AIMDLimiter:
+    """
+    Additive-increase/multiplicative-decrease limit on a model's in-flight streams.
+
+    Args:
+        model: Model the limit applies to (used as a metric label).
+        initial: Starting limit.
+        min_limit: Lowest limit a decrease can reach.
+        max_limit: Highest limit an increase can reach.
+        ttft_slo_s: Time to first token above which a response counts as a
+            latency spike (0 relies on the baseline only).
+        clock: Monotonic clock in seconds, injectable for tests.
+    """
+
+    DECREASE_FACTOR = 0.5
+    # A TTFT this many times the recent baseline counts as a latency spike
+    SPIKE_RATIO = 3.0
+    # Healthy TTFT samples needed before the baseline is trusted
+    MIN_BASELINE_SAMPLES = 5
+    # Smoothing factor of the TTFT baseline (exponentially weighted moving average)
+    BASELINE_ALPHA = 0.2
+
+    def __init__(
+        self,
+        model: str,
+        initial: int = SwarmConfig.DEFAULT_LIMITER_INITIAL,
+        min_limit: int = SwarmConfig.DEFAULT_LIMITER_MIN,
+        max_limit: int = SwarmConfig.DEFAULT_LIMITER_MAX,
+        ttft_slo_s: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.model = model
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.ttft_slo_s = ttft_slo_s
+        self.clock = clock
+        self.in_flight = 0
+        self.ttft_baseline_s: Optional[float] = None
+        self.baseline_samples = 0
+        self.increases = 0
+        self.decreases = 0
+        self.last_decrease = -math.inf
+        self._condition = threading.Condition()
+        self._publish()
+
+    @property
+    def current_limit(self) -> int:
+        """Streams allowed in flight right now."""
+        return int(self.limit)
+
+    def acquire(self, timeout_s: Optional[float] = None) -> Permit:
+        """
+        Wait for a slot under the current limit.
+
+        Args:
+            timeout_s: Longest time to wait (None waits indefinitely).
+
+        Returns:
+            The permit to hand back to release().
+
+        Raises:
+            APIError: If no slot frees up within timeout_s (status 503).
+        """
+        started = self.clock()
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < self.current_limit, timeout=timeout_s):
+                SwarmMetrics.increment("limiter.rejected", labels={"model": self.model})
+                raise APIError(
+                    f"Too many concurrent requests to {self.model} (limit {self.current_limit}); please retry shortly.",
+                    status_code=503,
+                    upstream=False,
+                )
+            self.in_flight += 1
+            permit = Permit(self.clock(), saturated=2 * self.in_flight >= self.current_limit)
+            self._publish()
+        SwarmMetrics.observe("limiter.wait_seconds", permit.started - started, labels={"model": self.model})
+        return permit
+
+    def release(self, permit: Permit, ttft_s: Optional[float] = None, status_code: Optional[int] = None) -> None:
+        """
+        Hand back a slot and adapt the limit to how the request went.
+
+        Args:
+            permit: The permit returned by acquire().
+            ttft_s: Time to first token, if any token arrived.
+            status_code: HTTP status of a failed request, if it failed.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            reason = None
+            if status_code is not None and (status_code in OVERLOAD_STATUS_CODES or status_code >= 500):
+                reason = "throttled" if status_code in OVERLOAD_STATUS_CODES else "server_error"
+            elif ttft_s is not None and self._is_spike(ttft_s):
+                reason = "latency"
+
+            if reason is not None:
+                # Requests started before the last cut saw the old limit; don't cut twice for them
+                if permit.started > self.last_decrease:
+                    self.limit = max(float(self.min_limit), math.floor(self.limit * self.DECREASE_FACTOR))
+                    self.last_decrease = self.clock()
+                    self.decreases += 1
+                    SwarmMetrics.increment("limiter.decreases", labels={"model": self.model, "reason": reason})
+            elif ttft_s is not None:
+                self._update_baseline(ttft_s)
+                if permit.saturated and self.limit < self.max_limit:
+                    self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+                    self.increases += 1
+            self._publish()
+            self._condition.notify_all()
+
+    def _is_spike(self, ttft_s: float) -> bool:
+        """Whether a time to first token is far above the SLO or the recent baseline."""
+        if self.ttft_slo_s > 0 and ttft_s > self.ttft_slo_s:
+            return True
+        return (
+            self.baseline_samples >= self.MIN_BASELINE_SAMPLES
+            and ttft_s > self.SPIKE_RATIO * self.ttft_baseline_s
+        )
+
+    def _update_baseline(self, ttft_s: float) -> None:
+        """Fold a healthy time to first token into the baseline."""
+        if self.ttft_baseline_s is None:
+            self.ttft_baseline_s = ttft_s
+        else:
+            self.ttft_baseline_s += self.BASELINE_ALPHA * (ttft_s - self.ttft_baseline_s)
+        self.baseline_samples += 1
+
+    def _publish(self) -> None:
+        """Expose the limit and load as gauges (condition held)."""
+        labels = {"model": self.model}
+        SwarmMetrics.set_gauge("limiter.limit", self.current_limit, labels=labels)
+        SwarmMetrics.set_gauge("limiter.in_flight", self.in_flight, labels=labels)
+
+    def stats(self) -> dict:
+        """Current limit, load and adaptation counts."""
+        with self._condition:
+            return {
+                "model": self.model,
+                "limit": self.current_limit,
+                "in_flight": self.in_flight,
+                "ttft_baseline_s": self.ttft_baseline_s,
+                "increases": self.increases,
+                "decreases": self.decreases,
+            }
+
+
+class AdaptiveLimiters:
+    """Process-wide AIMD limiter per model, created with the configured bounds."""
+
+    _lock = threading.Lock()
+    _limiters: dict[str, AIMDLimiter] = {}
+
+    @staticmethod
+    def for_model(model: str) -> Optional[AIMDLimiter]:
+        """Get the model's limiter, or None if adaptive concurrency is disabled."""
+        if not SwarmConfig.get_adaptive_concurrency():
+            return None
+        with AdaptiveLimiters._lock:
+            limiter = AdaptiveLimiters._limiters.get(model)
+            if limiter is None:
+                limiter = AIMDLimiter(
+                    model,
+                    initial=SwarmConfig.get_limiter_initial(),
+                    min_limit=SwarmConfig.get_limiter_min(),
+                    max_limit=SwarmConfig.get_limiter_max(),
+                    ttft_slo_s=SwarmConfig.get_limiter_ttft_slo_seconds(),
+                )
+                AdaptiveLimiters._limiters[model] = limiter
+            return limiter
+
+    @staticmethod
+    def stats() -> list[dict]:
+        """Stats of every model's limiter."""
+        with AdaptiveLimiters._lock:
+            limiters = list(AdaptiveLimiters._limiters.values())
+        return [limiter.stats() for limiter in limiters]
+
+    @staticmethod
+    def reset() -> None:
+        """Forget all limiters (used by tests)."""
+        with AdaptiveLimiters._lock:
+            AdaptiveLimiters._limiters.clear()
@@ -46,6 +46,119 @@ class SwarmLogger:
         logger = SwarmLogger._get_logger()
         logger.info(f"Swarm completed - Response length: {response_length} chars")
     
+    @staticmethod
+    def log_preview_complete(
+        draft_model: str,
+        first_content_s: Optional[float],
+        primary_first_token_s: Optional[float],
+        draft_chunks: int,
+        draft_error: Optional[str] = None,
+    ) -> None:
+        """Log the timings of a speculative draft preview."""
+        logger = SwarmLogger._get_logger()
+        first_content = f"{first_content_s:.2f}s" if first_content_s is not None else "n/a"
+        primary_ttft = f"{primary_first_token_s:.2f}s" if primary_first_token_s is not None else "n/a"
+        error_info = f", Draft error: {draft_error[:100]}" if draft_error else ""
+        logger.info(
+            f"Preview finished - Draft model: {draft_model}, First content: {first_content}, "
+            f"Primary TTFT: {primary_ttft}, Draft chunks: {draft_chunks}{error_info}"
+        )
+    
+    @staticmethod
+    def log_compression(
+        original_tokens: int,
+        compressed_tokens: int,
+        ratio: float,
+        elapsed_s: float,
+        seconds_saved: float,
+        summarized: bool,
+    ) -> None:
+        """Log the effect of input compression."""
+        logger = SwarmLogger._get_logger()
+        logger.info(
+            f"Input compressed - Tokens: {original_tokens} -> {compressed_tokens} (ratio {ratio:.2f}), "
+            f"Took: {elapsed_s:.3f}s, Est. prefill saved: {seconds_saved:.2f}s, Summarized: {summarized}"
+        )
+    
+    @staticmethod
+    def log_map_reduce_start(document_length: int, chunk_count: int, resumed_steps: int) -> None:
+        """Log the start of a map-reduce document run."""
+        logger = SwarmLogger._get_logger()
+        logger.info(
+            f"Map-reduce started - Document length: {document_length} chars, "
+            f"Chunks: {chunk_count}, Resumed steps: {resumed_steps}"
+        )
+    
+    @staticmethod
+    def log_preflight_token(
+        valid: Optional[bool],
+        error_message: Optional[str] = None,
+        credential: Optional[str] = None,
+    ) -> None:
+        """Log the preflight verification result of the primary or a pooled token (never the token itself)."""
+        logger = SwarmLogger._get_logger()
+        name = f"Token {credential}" if credential else "Token"
+        if valid:
+            logger.info(f"Preflight - {name} verified")
+        elif valid is None:
+            logger.warning(f"Preflight - {name} could not be verified: {(error_message or '')[:100]}")
+        else:
+            logger.warning(f"Preflight - {name} rejected: {(error_message or '')[:100]}")
+    
+    @staticmethod
+    def log_preflight_model(
+        model: str,
+        available: bool,
+        latency_s: Optional[float] = None,
+        error_message: Optional[str] = None,
+    ) -> None:
+        """Log the preflight probe result for a model."""
+        logger = SwarmLogger._get_logger()
+        if available:
+            logger.info(f"Preflight - Model: {model}, Available, Latency: {latency_s:.2f}s")
+        else:
+            logger.warning(f"Preflight - Model: {model}, Unavailable: {(error_message or '')[:100]}")
+    
+    @staticmethod
+    def log_session_summary(
+        turn_count: int,
+        summarized_turns: int,
+        summary_chars: int,
+        elapsed_s: float,
+        model_written: bool,
+    ) -> None:
+        """Log an incremental update of a session's rolling summary."""
+        logger = SwarmLogger._get_logger()
+        source = "model" if model_written else "extractive"
+        logger.info(
+            f"Session summarized - Turns: {turn_count}, Newly summarized: {summarized_turns}, "
+            f"Summary length: {summary_chars} chars ({source}), Took: {elapsed_s:.2f}s"
+        )
+    
+    @staticmethod
+    def log_usage(
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        estimated: bool,
+        cost_usd: float,
+        tokens_per_second: Optional[float] = None,
+    ) -> None:
+        """Log token usage and cost for a request."""
+        logger = SwarmLogger._get_logger()
+        source = "estimated" if estimated else "reported"
+        throughput = f", Throughput: {tokens_per_second:.1f} tok/s" if tokens_per_second is not None else ""
+        logger.info(
+            f"Usage - Model: {model}, Prompt tokens: {prompt_tokens}, Completion tokens: {completion_tokens} "
+            f"({source}), Cost: ${cost_usd:.6f}{throughput}"
+        )
+    
+    @staticmethod
+    def log_credential_throttled(credential_id: str, status_code: Optional[int], cooldown_s: float) -> None:
+        """Log that a pooled credential was throttled (identified by ID, never by token)."""
+        logger = SwarmLogger._get_logger()
+        logger.warning(f"Credential throttled - Credential: {credential_id}, Status: {status_code}, Cooldown: {cooldown_s:.0f}s")
+    
     @staticmethod
     def log_error(error_type: str, error_message: str, task: Optional[str] = None) -> None:
         """Log an error without exposing sensitive information."""
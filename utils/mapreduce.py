@@ -0,0 +1,348 @@
+"""Map-reduce execution of swarms over documents larger than a single prompt.
+
+The document is split into overlapping chunks, each chunk is analysed in a
+bounded-parallel map step, the analyses are merged hierarchically, and the
+merged analysis is handed to a final swarm synthesis. Completed map and reduce
+results are checkpointed so a run that partially failed can be resumed.
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Generator, Optional
+
+from .api import SwarmClient
+from .config import SwarmConfig
+from .errors import APIError
+from .files import ensure_private_dir
+from .logger import SwarmLogger
+from .prompts import build_chunk_prompt, build_reduce_prompt, build_swarm_prompt
+
+# Output budget for intermediate map and reduce requests
+INTERMEDIATE_MAX_TOKENS = 1024
+
+
+def chunk_text(text: str, chunk_chars: int, overlap_chars: int = 0) -> list[str]:
+    """
+    Split text into chunks of at most chunk_chars with optional overlap.
+
+    Chunk ends are moved back to the nearest line break (or space) in the
+    second half of the window so sections do not start mid-sentence.
+
+    Args:
+        text: The text to split.
+        chunk_chars: Maximum characters per chunk.
+        overlap_chars: Characters repeated from the end of the previous chunk.
+
+    Returns:
+        List of chunks in document order.
+    """
+    if chunk_chars <= 0:
+        raise ValueError("chunk_chars must be positive")
+    overlap_chars = max(0, min(overlap_chars, chunk_chars // 2))
+
+    chunks: list[str] = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_chars, length)
+        if end < length:
+            floor = start + chunk_chars // 2
+            boundary = text.rfind("\n", floor, end)
+            if boundary == -1:
+                boundary = text.rfind(" ", floor, end)
+            if boundary != -1:
+                end = boundary + 1
+        chunks.append(text[start:end])
+        if end >= length:
+            break
+        start = max(end - overlap_chars, start + 1)
+    return chunks
+
+
+def _private_dir(directory: str) -> bool:
+    """
+    Create directory readable only by this user, or check that it already is.
+
+    Returns:
+        False (and logs why) if it cannot be created or belongs to another user.
+    """
+    try:
+        ensure_private_dir(directory)
+    except OSError as e:
+        SwarmLogger.log_error("ConfigurationError", f"Map-reduce checkpoints disabled: {str(e)}")
+        return False
+    return True
+
+
+def prune_checkpoints(directory: str, ttl_s: float, now: Optional[float] = None) -> int:
+    """
+    Delete checkpoints of runs that were not resumed within ttl_s.
+
+    Args:
+        directory: Checkpoint directory.
+        ttl_s: Age in seconds (since the last completed step) after which a checkpoint expires.
+        now: Current time (defaults to time.time()).
+
+    Returns:
+        Number of files removed.
+    """
+    now = time.time() if now is None else now
+    removed = 0
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    for name in names:
+        if not name.startswith("mapreduce_"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if now - os.path.getmtime(path) > ttl_s:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+class MapReduceCheckpoint:
+    """
+    JSON checkpoint of completed map and reduce results for one run.
+
+    Checkpoints live in a directory private to this user. Opening one first
+    deletes the checkpoints of other runs older than ttl_s.
+
+    Args:
+        directory: Checkpoint directory (None disables checkpoints).
+        key: Key of the run (see checkpoint_key).
+        ttl_s: Age after which unfinished checkpoints expire (0 keeps them).
+    """
+
+    def __init__(self, directory: Optional[str], key: str, ttl_s: float = 0.0) -> None:
+        self.key = key
+        self.path = None
+        self.results: dict[str, str] = {}
+        if not directory or not _private_dir(directory):
+            return
+        if ttl_s > 0:
+            prune_checkpoints(directory, ttl_s)
+        self.path = os.path.join(directory, f"mapreduce_{key}.json")
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("key") == key:
+                    self.results = dict(data.get("results", {}))
+            except (OSError, ValueError):
+                self.results = {}
+
+    def get(self, step: str) -> Optional[str]:
+        """Get a completed result for a step, if any."""
+        return self.results.get(step)
+
+    def put(self, step: str, result: str) -> None:
+        """Record a completed step and persist the checkpoint atomically."""
+        self.results[step] = result
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+            json.dump({"key": self.key, "results": self.results}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        """Remove the checkpoint once the run has completed."""
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def checkpoint_key(task: str, document: str, chunk_chars: int, overlap_chars: int, model: str) -> str:
+    """Build a stable key identifying a map-reduce run for resumption."""
+    digest = hashlib.sha256()
+    for part in (model, str(chunk_chars), str(overlap_chars), task, document):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+def _complete(client: SwarmClient, prompt: str, temperature: float) -> str:
+    """Run one intermediate request to completion and return its text."""
+    result = ""
+    for chunk in client.stream_swarm_response(
+        prompt,
+        max_tokens=INTERMEDIATE_MAX_TOKENS,
+        temperature=temperature,
+    ):
+        result = chunk
+    return result.strip()
+
+
+def _run_steps(
+    steps: list[tuple[str, Callable[[], str]]],
+    checkpoint: MapReduceCheckpoint,
+    max_workers: int,
+) -> Generator[tuple[str, Optional[str], Optional[Exception]], None, None]:
+    """
+    Run pending steps with bounded parallelism.
+
+    Yields:
+        (step, result, error) for every step as it finishes. Steps already in
+        the checkpoint are yielded first without being re-run.
+    """
+    pending = []
+    for step, fn in steps:
+        cached = checkpoint.get(step)
+        if cached is not None:
+            yield step, cached, None
+        else:
+            pending.append((step, fn))
+
+    if not pending:
+        return
+
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="swarm-mapreduce")
+    finished = False
+    try:
+        futures = {pool.submit(fn): step for step, fn in pending}
+        for future in as_completed(futures):
+            step = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                yield step, None, e
+                continue
+            checkpoint.put(step, result)
+            yield step, result, None
+        finished = True
+    finally:
+        # A closed (abandoned) run drops queued steps and does not wait for running ones
+        pool.shutdown(wait=finished, cancel_futures=not finished)
+
+
+def run_map_reduce(
+    task: str,
+    document: str,
+    client: SwarmClient,
+    max_tokens: int = 4096,
+    temperature: float = 0.7,
+    chunk_chars: int = 6000,
+    overlap_chars: int = 500,
+    max_workers: int = 4,
+    fan_in: int = 4,
+    checkpoint_dir: Optional[str] = None,
+    checkpoint_ttl_s: float = SwarmConfig.DEFAULT_CHECKPOINT_TTL_SECONDS,
+) -> Generator[str, None, None]:
+    """
+    Run a swarm over a large document using map-reduce.
+
+    Args:
+        task: The user's task description.
+        document: The document to analyse.
+        client: Client used for every map, reduce and synthesis request.
+        max_tokens: Maximum tokens for the final swarm synthesis.
+        temperature: Sampling temperature.
+        chunk_chars: Maximum characters per document chunk.
+        overlap_chars: Characters of overlap between consecutive chunks.
+        max_workers: Maximum concurrent upstream requests.
+        fan_in: Number of analyses merged per reduce request.
+        checkpoint_dir: Directory for resumable checkpoints (None disables them).
+            The checkpoint is deleted once the run completes.
+        checkpoint_ttl_s: Age after which unfinished checkpoints are deleted (0 keeps them).
+
+    Yields:
+        Accumulated progress text, followed by the streamed final synthesis.
+
+    Raises:
+        APIError: If any map or reduce step fails. Completed steps are kept in
+            the checkpoint so re-running the same request resumes from them.
+    """
+    fan_in = max(2, fan_in)
+    chunks = chunk_text(document, chunk_chars, overlap_chars)
+    total = len(chunks)
+    key = checkpoint_key(task, document, chunk_chars, overlap_chars, client.model)
+    checkpoint = MapReduceCheckpoint(checkpoint_dir, key, ttl_s=checkpoint_ttl_s)
+    resumed = len(checkpoint.results)
+
+    progress = [f"📄 Document split into {total} sections ({len(document):,} chars)"]
+    if resumed:
+        progress.append(f"♻️ Resuming: {resumed} completed steps restored from checkpoint")
+    SwarmLogger.log_map_reduce_start(len(document), total, resumed)
+    yield "\n".join(progress)
+
+    # Map: analyse every chunk in parallel
+    map_steps = [
+        (
+            f"map:{i}",
+            lambda i=i, chunk=chunk: _complete(
+                client, build_chunk_prompt(task, chunk, i + 1, total), temperature
+            ),
+        )
+        for i, chunk in enumerate(chunks)
+    ]
+    analyses: dict[int, str] = {}
+    failures: list[str] = []
+    progress.append(f"🗺️ Map: 0/{total} sections analysed")
+    for step, result, error in _run_steps(map_steps, checkpoint, max_workers):
+        if error is not None:
+            failures.append(step)
+            SwarmLogger.log_error("APIError", f"Map step {step} failed: {str(error)}", task)
+        else:
+            analyses[int(step.split(":")[1])] = result
+        progress[-1] = f"🗺️ Map: {len(analyses)}/{total} sections analysed" + (
+            f" ({len(failures)} failed)" if failures else ""
+        )
+        yield "\n".join(progress)
+
+    if failures:
+        raise APIError(
+            f"{len(failures)} of {total} sections failed; run the same request again to resume"
+        )
+
+    # Reduce: merge analyses hierarchically until one group fits in a single prompt
+    level = 0
+    items = [analyses[i] for i in range(total)]
+    while len(items) > fan_in:
+        level += 1
+        groups = [items[i:i + fan_in] for i in range(0, len(items), fan_in)]
+        reduce_steps = [
+            (
+                f"reduce:{level}:{g}",
+                lambda group=group: _complete(client, build_reduce_prompt(task, group), temperature),
+            )
+            for g, group in enumerate(groups)
+        ]
+        merged: dict[int, str] = {}
+        progress.append(f"🔗 Reduce level {level}: 0/{len(groups)} merges")
+        for step, result, error in _run_steps(reduce_steps, checkpoint, max_workers):
+            if error is not None:
+                failures.append(step)
+                SwarmLogger.log_error("APIError", f"Reduce step {step} failed: {str(error)}", task)
+            else:
+                merged[int(step.split(":")[2])] = result
+            progress[-1] = f"🔗 Reduce level {level}: {len(merged)}/{len(groups)} merges"
+            yield "\n".join(progress)
+        if failures:
+            raise APIError(
+                f"{len(failures)} merge steps failed; run the same request again to resume"
+            )
+        items = [merged[g] for g in range(len(groups))]
+
+    # Final swarm synthesis over the merged analyses
+    progress.append("🚀 Deploying Builder Swarm on the merged analysis...")
+    header = "\n".join(progress) + "\n\n"
+    yield header
+    analysis_text = "\n\n".join(
+        f"### Analysis {i}\n{item}" for i, item in enumerate(items, start=1)
+    )
+    synthesis_task = f"{task}\n\nConsolidated analysis of the source document:\n\n{analysis_text}"
+    for chunk in client.stream_swarm_response(
+        build_swarm_prompt(synthesis_task),
+        max_tokens=max_tokens,
+        temperature=temperature,
+    ):
+        yield header + chunk
+
+    checkpoint.clear()
@@ -0,0 +1,114 @@
+"""In-process metrics collection for SwarmMaster."""
+
+import os
+import threading
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def process_memory() -> dict:
+    """
+    Get this worker's memory use.
+
+    Returns:
+        Dictionary with the worker "pid", its current resident set size
+        "rss_bytes" (None where /proc is unavailable) and its peak resident
+        set size "peak_rss_bytes" (None where resource is unavailable).
+    """
+    rss_bytes = None
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            rss_bytes = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    peak_rss_bytes = None
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss_bytes = peak if os.uname().sysname == "Darwin" else peak * 1024
+    return {"pid": os.getpid(), "rss_bytes": rss_bytes, "peak_rss_bytes": peak_rss_bytes}
+
+
+class SwarmMetrics:
+    """Thread-safe counters, gauges and timing observations shared by the app."""
+
+    # Keep only the most recent observations per series to bound memory
+    MAX_OBSERVATIONS = 1000
+
+    _lock = threading.Lock()
+    _counters: dict[str, float] = {}
+    _gauges: dict[str, float] = {}
+    _observations: dict[str, list[float]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Optional[dict] = None) -> str:
+        """Build the series key for a metric name and optional labels."""
+        if not labels:
+            return name
+        label_str = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+        return f"{name}{{{label_str}}}"
+
+    @staticmethod
+    def increment(name: str, value: float = 1, labels: Optional[dict] = None) -> None:
+        """Increase a counter by the given value."""
+        key = SwarmMetrics._key(name, labels)
+        with SwarmMetrics._lock:
+            SwarmMetrics._counters[key] = SwarmMetrics._counters.get(key, 0) + value
+
+    @staticmethod
+    def set_gauge(name: str, value: float, labels: Optional[dict] = None) -> None:
+        """Set a gauge to the given value."""
+        key = SwarmMetrics._key(name, labels)
+        with SwarmMetrics._lock:
+            SwarmMetrics._gauges[key] = value
+
+    @staticmethod
+    def observe(name: str, value: float, labels: Optional[dict] = None) -> None:
+        """Record a single observation (e.g. a latency in seconds)."""
+        key = SwarmMetrics._key(name, labels)
+        with SwarmMetrics._lock:
+            values = SwarmMetrics._observations.setdefault(key, [])
+            values.append(value)
+            if len(values) > SwarmMetrics.MAX_OBSERVATIONS:
+                del values[: len(values) - SwarmMetrics.MAX_OBSERVATIONS]
+
+    @staticmethod
+    def snapshot() -> dict:
+        """
+        Get a point-in-time copy of all metrics.
+
+        Returns:
+            Dictionary with "counters", "gauges" and "observations", where each
+            observation series is summarised as count/mean/p50/p95/max.
+        """
+        with SwarmMetrics._lock:
+            counters = dict(SwarmMetrics._counters)
+            gauges = dict(SwarmMetrics._gauges)
+            observations = {key: list(values) for key, values in SwarmMetrics._observations.items()}
+
+        summaries = {}
+        for key, values in observations.items():
+            if not values:
+                continue
+            ordered = sorted(values)
+            summaries[key] = {
+                "count": len(ordered),
+                "mean": sum(ordered) / len(ordered),
+                "p50": ordered[int(0.50 * (len(ordered) - 1))],
+                "p95": ordered[int(0.95 * (len(ordered) - 1))],
+                "max": ordered[-1],
+            }
+
+        return {"counters": counters, "gauges": gauges, "observations": summaries}
+
+    @staticmethod
+    def reset() -> None:
+        """Clear all recorded metrics."""
+        with SwarmMetrics._lock:
+            SwarmMetrics._counters.clear()
+            SwarmMetrics._gauges.clear()
+            SwarmMetrics._observations.clear()
@@ -0,0 +1,280 @@
+"""Background startup preflight: token verification and model warm-up probes.
+
+The first swarm after a deploy otherwise pays for DNS, TLS, Hugging Face auth
+and model cold-start all at once. The preflight runs in a daemon thread at
+startup, verifies the token (and every pooled HF_TOKENS token), and sends a
+minimal request to every configured model to warm connections and measure
+availability and latency. Results feed the model dropdown and the logs;
+startup never waits for them. A config reload runs it again only when the
+tokens, models or backend mapping changed.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from huggingface_hub import InferenceClient, whoami
+from huggingface_hub.utils import HfHubHTTPError
+
+from .config import ConfigSnapshot, SwarmConfig
+from .credentials import Credential
+from .logger import SwarmLogger
+from .metrics import SwarmMetrics
+
+
+class ModelStatus:
+    """Availability and latency of a single model as seen by the preflight."""
+
+    def __init__(
+        self,
+        model: str,
+        available: bool,
+        latency_s: Optional[float] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        self.model = model
+        self.available = available
+        self.latency_s = latency_s
+        self.error = error
+
+    def label(self, slow_threshold_s: float) -> str:
+        """Dropdown label marking slow or unavailable models."""
+        if not self.available:
+            return f"{self.model} (unavailable)"
+        if self.latency_s is not None and self.latency_s >= slow_threshold_s:
+            return f"{self.model} (slow, {self.latency_s:.1f}s)"
+        return self.model
+
+
+class PreflightResults:
+    """Results of a preflight run, filled in incrementally as probes finish."""
+
+    def __init__(self) -> None:
+        # True if verified, False if rejected, None while pending or unknown (verification failed to run)
+        self.token_valid: Optional[bool] = None
+        self.token_error: Optional[str] = None
+        # Verification result (as token_valid) of each other pooled token, by credential ID
+        self.pooled_tokens: dict[str, Optional[bool]] = {}
+        self.models: dict[str, ModelStatus] = {}
+        self.done = threading.Event()
+
+
+# Statuses with which Hugging Face rejects a token
+TOKEN_REJECTED_STATUS_CODES = (401, 403)
+
+# Settings whose change makes a reload run the preflight again
+PREFLIGHT_SETTINGS = ("HF_TOKEN", "HF_TOKENS", "SWARM_MODELS", "SWARM_MODEL_BACKENDS")
+
+
+def verify_token(token: Optional[str]) -> None:
+    """Verify a Hugging Face token, raising if it is missing or rejected."""
+    if not token:
+        raise ValueError("HF_TOKEN not set")
+    whoami(token=token)
+
+
+def is_token_rejection(error: Exception) -> bool:
+    """
+    Whether a verification error means the token itself is bad.
+
+    Only a missing token or a 401/403 from Hugging Face counts; network
+    failures, timeouts and server errors say nothing about the token.
+    """
+    if isinstance(error, ValueError):
+        return True
+    status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(error, HfHubHTTPError) and status_code in TOKEN_REJECTED_STATUS_CODES
+
+
+def probe_model(model: str, token: Optional[str]) -> float:
+    """
+    Send a minimal one-token request to a model.
+
+    Args:
+        model: The model identifier to probe.
+        token: Hugging Face token.
+
+    Returns:
+        Round-trip latency in seconds.
+    """
+    client = InferenceClient(model=model, token=token)
+    started = time.perf_counter()
+    client.chat_completion(messages=[{"role": "user", "content": "Hi"}], max_tokens=1)
+    return time.perf_counter() - started
+
+
+def run_preflight(
+    models: list[str],
+    token: Optional[str],
+    results: Optional[PreflightResults] = None,
+    max_workers: int = 4,
+    verify: Optional[Callable[[Optional[str]], None]] = None,
+    probe: Optional[Callable[[str, Optional[str]], float]] = None,
+    pool_tokens: Optional[list[str]] = None,
+) -> PreflightResults:
+    """
+    Verify the tokens and probe every model, recording results as they arrive.
+
+    Args:
+        models: Model identifiers to probe.
+        token: Hugging Face token.
+        results: Results object to fill in (a new one is created if None).
+        max_workers: Maximum concurrent probes.
+        verify: Token verification function (raises on failure); defaults to verify_token.
+        probe: Model probe function returning latency in seconds; defaults to probe_model.
+        pool_tokens: All pooled tokens, in pool order (SwarmConfig.get_tokens());
+            those other than token are verified alongside the probes.
+
+    Returns:
+        The completed results.
+    """
+    results = results or PreflightResults()
+    verify = verify or verify_token
+    probe = probe or probe_model
+
+    try:
+        verify(token)
+        results.token_valid = True
+    except Exception as e:
+        # Unknown (None) unless Hugging Face rejected the token, so outages never block requests
+        results.token_valid = False if is_token_rejection(e) else None
+        results.token_error = str(e)[:200]
+    SwarmLogger.log_preflight_token(results.token_valid, results.token_error)
+
+    def verify_pooled(credential_id: str, pooled: str) -> None:
+        error = None
+        try:
+            verify(pooled)
+            valid = True
+        except Exception as e:
+            valid = False if is_token_rejection(e) else None
+            error = str(e)[:200]
+        results.pooled_tokens[credential_id] = valid
+        if valid is False:
+            SwarmMetrics.increment("preflight.tokens_rejected", labels={"credential": credential_id})
+        SwarmLogger.log_preflight_token(valid, error, credential=credential_id)
+
+    def run_probe(model: str) -> None:
+        try:
+            latency = probe(model, token)
+            status = ModelStatus(model, True, latency)
+            SwarmMetrics.observe("preflight.latency_seconds", latency, labels={"model": model})
+        except Exception as e:
+            status = ModelStatus(model, False, error=str(e)[:200])
+        SwarmMetrics.set_gauge("preflight.available", 1 if status.available else 0, labels={"model": model})
+        results.models[model] = status
+        SwarmLogger.log_preflight_model(model, status.available, status.latency_s, status.error)
+
+    pooled = [
+        (Credential(pooled_token, index).credential_id, pooled_token)
+        for index, pooled_token in enumerate(pool_tokens or [])
+        if pooled_token != token
+    ]
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="swarm-preflight") as pool:
+        for credential_id, pooled_token in pooled:
+            pool.submit(verify_pooled, credential_id, pooled_token)
+        if results.token_valid is not False:
+            for model in models:
+                pool.submit(run_probe, model)
+
+    results.done.set()
+    return results
+
+
+class Preflight:
+    """Process-wide background preflight started once at application startup."""
+
+    _lock = threading.Lock()
+    _results: Optional[PreflightResults] = None
+    # Config the current results were checked against
+    _snapshot: Optional[ConfigSnapshot] = None
+    _watching_config = False
+
+    @staticmethod
+    def start(
+        models: list[str],
+        token: Optional[str],
+        max_workers: int = 4,
+        pool_tokens: Optional[list[str]] = None,
+    ) -> PreflightResults:
+        """
+        Start the preflight in a daemon thread without blocking.
+
+        Calling start again while a preflight exists returns the existing
+        results. A config reload that changes PREFLIGHT_SETTINGS discards
+        them and runs the preflight again with the reloaded models and tokens.
+
+        Args:
+            models: Model identifiers to probe.
+            token: Hugging Face token.
+            max_workers: Maximum concurrent probes.
+            pool_tokens: All pooled tokens (SwarmConfig.get_tokens()), verified too.
+
+        Returns:
+            The results object, which fills in as probes complete.
+        """
+        with Preflight._lock:
+            if Preflight._results is not None:
+                return Preflight._results
+            results = PreflightResults()
+            Preflight._results = results
+            Preflight._snapshot = SwarmConfig.current()
+            if not Preflight._watching_config:
+                Preflight._watching_config = True
+                SwarmConfig.add_reload_listener(Preflight._on_config_reload)
+        threading.Thread(
+            target=run_preflight,
+            args=(list(models), token, results, max_workers),
+            kwargs={"pool_tokens": list(pool_tokens or [])},
+            name="swarm-preflight",
+            daemon=True,
+        ).start()
+        return results
+
+    @staticmethod
+    def _on_config_reload(snapshot: ConfigSnapshot) -> None:
+        """Drop results that no longer hold (tokens, models or backends changed) and run the preflight again."""
+        with Preflight._lock:
+            if Preflight._results is None:
+                return
+            previous = Preflight._snapshot
+            if previous is not None and not set(previous.changes(snapshot)) & set(PREFLIGHT_SETTINGS):
+                Preflight._snapshot = snapshot
+                return
+            Preflight._results = None
+        Preflight.start(SwarmConfig.get_hf_models(), SwarmConfig.get_token(), pool_tokens=SwarmConfig.get_tokens())
+
+    @staticmethod
+    def results() -> Optional[PreflightResults]:
+        """Get the current preflight results, or None if it was never started."""
+        return Preflight._results
+
+    @staticmethod
+    def reset() -> None:
+        """Forget any previous preflight (used by tests)."""
+        with Preflight._lock:
+            Preflight._results = None
+            Preflight._snapshot = None
+
+    @staticmethod
+    def token_error() -> Optional[str]:
+        """Get the token rejection message if the preflight rejected the token."""
+        results = Preflight._results
+        if results is not None and results.token_valid is False:
+            return results.token_error
+        return None
+
+    @staticmethod
+    def model_choices(models: list[str], slow_threshold_s: float) -> list[tuple[str, str]]:
+        """
+        Build (label, value) dropdown choices annotated with preflight status.
+
+        Models without a result yet keep their plain name.
+        """
+        results = Preflight._results
+        choices = []
+        for model in models:
+            status = results.models.get(model) if results is not None else None
+            choices.append((status.label(slow_threshold_s) if status else model, model))
+        return choices
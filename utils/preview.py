@@ -0,0 +1,146 @@
+"""Speculative preview streaming for SwarmMaster.
+
+A small draft model is streamed while the selected (usually much larger) model
+is still warming up. The draft is shown immediately and is replaced as soon as
+the primary model produces its first token, at which point the draft request
+is cancelled.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Generator, Iterable, Optional
+
+from .api import SwarmClient
+from .logger import SwarmLogger
+from .metrics import SwarmMetrics
+from .streaming import pump_stream
+
+DRAFT = "draft"
+PRIMARY = "primary"
+
+# Longest wait for a cancelled draft to close its stream and record its usage
+DRAFT_CLOSE_TIMEOUT_S = 2.0
+
+
+class PreviewStats:
+    """Timing measurements for a single preview run (seconds since start)."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.draft_first_token_s: Optional[float] = None
+        self.primary_first_token_s: Optional[float] = None
+        self.draft_chunks = 0
+        self.draft_cancelled = False
+        self.draft_error: Optional[str] = None
+
+    def elapsed(self) -> float:
+        """Seconds elapsed since the preview started."""
+        return time.perf_counter() - self.started
+
+    @property
+    def first_content_s(self) -> Optional[float]:
+        """Time until the user saw any content, from either model."""
+        times = [t for t in (self.draft_first_token_s, self.primary_first_token_s) if t is not None]
+        return min(times) if times else None
+
+
+def stream_with_preview(
+    primary: SwarmClient,
+    draft: SwarmClient,
+    prompt: str,
+    max_tokens: int = 4096,
+    temperature: float = 0.7,
+    stats: Optional[PreviewStats] = None,
+    messages: Optional[list[dict]] = None,
+    step_hook: Optional[Callable[[Iterable[str]], Iterable[str]]] = None,
+) -> Generator[tuple[str, bool], None, None]:
+    """
+    Stream a draft from a fast model until the primary model starts responding.
+
+    Args:
+        primary: Client for the model whose output is authoritative.
+        draft: Client for the fast draft model.
+        prompt: The full prompt to send to both models.
+        max_tokens: Maximum tokens to generate.
+        temperature: Sampling temperature.
+        stats: Optional stats object to populate with timings.
+        messages: Optional conversation to send instead of the single prompt
+            (for multi-turn sessions).
+        step_hook: Optional wrapper applied to each model's stream on its pump
+            thread (e.g. RequestProfiler.profile_steps).
+
+    Yields:
+        Tuples of (accumulated_text, is_draft). Once the first primary chunk
+        is yielded, no further draft chunks are produced.
+
+    Raises:
+        APIError: If the primary model stream fails.
+    """
+    stats = stats or PreviewStats()
+    events: queue.Queue = queue.Queue()
+    cancel_draft = threading.Event()
+    cancel_primary = threading.Event()
+
+    for client, source, cancel in (
+        (draft, DRAFT, cancel_draft),
+        (primary, PRIMARY, cancel_primary),
+    ):
+        threading.Thread(
+            target=pump_stream,
+            args=(client, source, prompt, max_tokens, temperature, events, cancel, messages, step_hook),
+            name=f"swarm-preview-{source}",
+            daemon=True,
+        ).start()
+
+    primary_started = False
+    try:
+        while True:
+            kind, source, payload = events.get()
+
+            if source == DRAFT:
+                if kind == "chunk" and not primary_started:
+                    if stats.draft_first_token_s is None:
+                        stats.draft_first_token_s = stats.elapsed()
+                    stats.draft_chunks += 1
+                    yield payload, True
+                elif kind == "error" and not primary_started:
+                    # A failed draft only costs us the preview, never the swarm
+                    stats.draft_error = str(payload)
+                continue
+
+            if kind == "chunk":
+                if not primary_started:
+                    primary_started = True
+                    stats.primary_first_token_s = stats.elapsed()
+                    stats.draft_cancelled = True
+                    # Close the draft stream now rather than on its next chunk, which may never come
+                    cancel_draft.set()
+                    draft.cancel()
+                yield payload, False
+            elif kind == "done":
+                break
+            else:
+                raise payload
+    finally:
+        cancel_draft.set()
+        cancel_primary.set()
+        draft.cancel()
+        _record_stats(draft.model, stats)
+
+
+def _record_stats(draft_model: str, stats: PreviewStats) -> None:
+    """Publish preview timings to metrics and logs."""
+    if stats.draft_first_token_s is not None:
+        SwarmMetrics.observe("preview.draft_ttft_seconds", stats.draft_first_token_s)
+    if stats.primary_first_token_s is not None:
+        SwarmMetrics.observe("preview.primary_ttft_seconds", stats.primary_first_token_s)
+    if stats.draft_cancelled:
+        SwarmMetrics.increment("preview.drafts_cancelled")
+    SwarmLogger.log_preview_complete(
+        draft_model,
+        stats.first_content_s,
+        stats.primary_first_token_s,
+        stats.draft_chunks,
+        stats.draft_error,
+    )
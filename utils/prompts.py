@@ -1,5 +1,8 @@
 """Prompt building utilities for SwarmMaster."""
 
+# Label that opens every agent's heading ("**Agent: Role Name**"); the UI splits responses on it
+AGENT_HEADING_LABEL = "Agent"
+
 SWARMMASTER_PROMPT = """
 You are SwarmMaster, an advanced multi-agent orchestration system designed to produce exceptionally high-quality, professional-grade outputs for complex creative and technical tasks.
 
@@ -8,7 +11,7 @@ When given any task, immediately deploy a "Builder Swarm" of 5-10 specialized ag
 Process:
 1. First, analyze the task and user intent deeply.
 2. Generate a list of 5-10 specialized agents needed.
-3. Execute the swarm in sequence: Each agent speaks in first person, clearly labeled with their role.
+3. Execute the swarm in sequence: Each agent speaks in first person under its own "**Agent: Role Name**" heading.
 4. Final agent synthesizes everything into a cohesive deliverable.
 5. End with "Swarm Complete" and offer clear next steps.
 
@@ -19,7 +22,7 @@ Rules:
 - Always conclude with actionable next steps.
 
 Response format:
-**Agent Role Name:**
+**Agent: Role Name**
 [Agent's reasoned contribution]
 
 **Swarm Complete:**
@@ -41,3 +44,154 @@ def build_swarm_prompt(user_task: str) -> str:
     """
     return SWARMMASTER_PROMPT.format(user_task=user_task)
 
+
+SUMMARY_PROMPT = """
+Condense the following text so it can be passed to a multi-agent planning system.
+
+Rules:
+- Keep every instruction, requirement, constraint, name, number and error message.
+- Collapse repeated log lines, stack frames and boilerplate into a short description.
+- Do not add commentary, answer the task, or invent details.
+- Respond with the condensed text only.
+
+Text:
+{text}
+"""
+
+
+def build_summary_prompt(text: str) -> str:
+    """
+    Build the prompt used to condense a long input before swarm execution.
+    
+    Args:
+        text: The text to condense.
+        
+    Returns:
+        The formatted prompt string.
+    """
+    return SUMMARY_PROMPT.format(text=text)
+
+
+CHUNK_ANALYSIS_PROMPT = """
+You are one analyst in a team reviewing a large document in sections for SwarmMaster.
+
+Overall task: {user_task}
+
+You are reading section {index} of {total}. Sections overlap slightly at the edges.
+Extract everything in this section that is relevant to the task: key facts, figures,
+decisions, risks, open questions and direct quotes worth keeping. Be concise and do
+not speculate about other sections.
+
+Section {index}/{total}:
+{chunk}
+"""
+
+REDUCE_PROMPT = """
+You are merging section analyses of a large document for SwarmMaster.
+
+Overall task: {user_task}
+
+Combine the analyses below into a single consolidated analysis. Remove duplicates
+introduced by overlapping sections, keep all task-relevant facts, figures, risks
+and open questions, and preserve the original order where it matters.
+
+{analyses}
+"""
+
+
+def build_chunk_prompt(user_task: str, chunk: str, index: int, total: int) -> str:
+    """
+    Build the map-step prompt for analysing one section of a large document.
+    
+    Args:
+        user_task: The task description from the user.
+        chunk: The document section to analyse.
+        index: 1-based section number.
+        total: Total number of sections.
+        
+    Returns:
+        The formatted prompt string.
+    """
+    return CHUNK_ANALYSIS_PROMPT.format(user_task=user_task, chunk=chunk, index=index, total=total)
+
+
+def build_reduce_prompt(user_task: str, analyses: list[str]) -> str:
+    """
+    Build the reduce-step prompt that merges several section analyses.
+    
+    Args:
+        user_task: The task description from the user.
+        analyses: The analyses to merge, in document order.
+        
+    Returns:
+        The formatted prompt string.
+    """
+    sections = "\n\n".join(
+        f"### Analysis {i}\n{analysis}" for i, analysis in enumerate(analyses, start=1)
+    )
+    return REDUCE_PROMPT.format(user_task=user_task, analyses=sections)
+
+
+FOLLOW_UP_PROMPT = """
+You are SwarmMaster, continuing a multi-turn session with the same user. The most
+recent turns of the conversation are above.
+
+Treat the request below as a follow-up: refine, extend or correct the previous swarm
+output instead of starting over. Redeploy only the agents the follow-up needs, keep
+earlier decisions unless the user changes them, and use the same response format:
+
+**Agent: Role Name**
+[Agent's reasoned contribution]
+
+**Swarm Complete:**
+[Final output + next steps]
+{summary_section}
+Follow-up: {user_task}
+"""
+
+SESSION_SUMMARY_PROMPT = """
+You maintain the running summary of a SwarmMaster multi-turn session.
+
+Update the summary with the new turns below. Keep the user's goals, requirements,
+constraints, decisions, agreed deliverables and open questions; drop agent chatter
+and repetition. Stay under {max_words} words and respond with the updated summary only.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+"""
+
+
+def build_follow_up_prompt(user_task: str, summary: str = "") -> str:
+    """
+    Build the prompt for a follow-up turn in a multi-turn session.
+    
+    Args:
+        user_task: The follow-up request from the user.
+        summary: Rolling summary of turns that no longer fit in the window.
+        
+    Returns:
+        The formatted prompt string.
+    """
+    summary_section = f"\nSummary of earlier turns:\n{summary}\n" if summary else ""
+    return FOLLOW_UP_PROMPT.format(user_task=user_task, summary_section=summary_section)
+
+
+def build_session_summary_prompt(summary: str, turns: list[tuple[str, str]], max_words: int) -> str:
+    """
+    Build the prompt that folds older turns into a session's rolling summary.
+    
+    Args:
+        summary: The current rolling summary (may be empty).
+        turns: (user_task, swarm_response) pairs leaving the context window.
+        max_words: Target maximum length of the updated summary.
+        
+    Returns:
+        The formatted prompt string.
+    """
+    turn_text = "\n\n".join(
+        f"User: {task}\nSwarm: {response}" for task, response in turns
+    )
+    return SESSION_SUMMARY_PROMPT.format(summary=summary or "(none yet)", turns=turn_text, max_words=max_words)
@@ -0,0 +1,582 @@
+"""Multi-turn swarm sessions with bounded context.
+
+A session sends its most recent turns to the model verbatim (a sliding
+window) and folds older turns into a rolling summary. The summary is updated
+incrementally, only with the turns leaving the window, and cached on the
+session, so the prompt stays roughly the same size however long the
+conversation runs.
+
+Session memory is bounded too. Turns are stored clipped to what a prompt can
+use, long responses are zlib-compressed, and a session over its byte budget
+folds old turns into its summary. SwarmSessions spills idle and least
+recently used sessions to disk once the worker's global budget is reached,
+and restores them transparently on their next turn.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Generator, Optional, Union
+
+from .config import SwarmConfig
+from .errors import APIError
+from .files import ensure_private_dir, write_private_file
+from .logger import SwarmLogger
+from .metrics import SwarmMetrics, process_memory
+from .prompts import build_follow_up_prompt, build_session_summary_prompt, build_swarm_prompt
+from .tokens import CHARS_PER_TOKEN
+
+SESSION_FILE_VERSION = 1
+
+
+def _clip(text: str, max_chars: int, keep: str = "tail") -> str:
+    """Shorten text to max_chars, keeping its start ("head") or its end ("tail")."""
+    if len(text) <= max_chars:
+        return text
+    marker = "[...]"
+    if keep == "head":
+        return text[: max_chars - len(marker)] + marker
+    return marker + text[-(max_chars - len(marker)):]
+
+
+def _pack(text: str, compress_min_chars: int) -> Union[str, bytes]:
+    """Store text as-is, or zlib-compressed if it is at least compress_min_chars long."""
+    if compress_min_chars and len(text) >= compress_min_chars:
+        return zlib.compress(text.encode("utf-8"), 6)
+    return text
+
+
+def _unpack(stored: Union[str, bytes]) -> str:
+    """Recover text stored by _pack."""
+    return zlib.decompress(stored).decode("utf-8") if isinstance(stored, bytes) else stored
+
+
+def _stored_size(stored: Union[str, bytes]) -> int:
+    """Approximate memory taken by a stored value, in bytes."""
+    return len(stored) if isinstance(stored, bytes) else len(stored.encode("utf-8"))
+
+
+class SwarmSession:
+    """Conversation state for one multi-turn swarm session.
+
+    Args:
+        session_id: Identifier of the session.
+        window_turns: Number of recent turns sent verbatim.
+        max_turn_chars: Maximum characters kept from each task and response
+            in the window. Responses keep their end, where the swarm's final
+            synthesis is.
+        summary_tokens: Token budget of the rolling summary.
+        compress_min_chars: Responses at least this long are stored
+            compressed (0 disables compression).
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        window_turns: int = SwarmConfig.DEFAULT_SESSION_WINDOW_TURNS,
+        max_turn_chars: int = SwarmConfig.DEFAULT_SESSION_MAX_TURN_CHARS,
+        summary_tokens: int = SwarmConfig.DEFAULT_SESSION_SUMMARY_TOKENS,
+        compress_min_chars: int = SwarmConfig.DEFAULT_SESSION_COMPRESS_MIN_CHARS,
+    ) -> None:
+        self.session_id = session_id
+        self.window_turns = window_turns
+        self.max_turn_chars = max_turn_chars
+        self.summary_tokens = summary_tokens
+        self.compress_min_chars = compress_min_chars
+        self.summary = ""
+        self.summarized_turns = 0
+        # Guards the turns and summary; never held across a model request
+        self.lock = threading.RLock()
+        # (task, response) pairs; responses may be compressed (see _pack)
+        self._turns: list[tuple[str, Union[str, bytes]]] = []
+        # Bytes held by the turns and summary, kept up to date under lock so
+        # SwarmSessions can read it without taking the session lock
+        self.stored_bytes = 0
+        self._compacting = False
+        # Requests currently using the session; SwarmSessions never spills it meanwhile
+        self.leases = 0
+        # Spill writes of this session still in progress (guarded by SwarmSessions._lock)
+        self.pending_spills = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def turns(self) -> list[tuple[str, str]]:
+        """Unsummarized turns as (task, response) pairs, oldest first."""
+        with self.lock:
+            return [(task, _unpack(response)) for task, response in self._turns]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the session's text, in bytes (read without locking)."""
+        return self.stored_bytes
+
+    def _recount(self) -> None:
+        """Recompute stored_bytes (lock held)."""
+        turn_bytes = sum(_stored_size(task) + _stored_size(response) for task, response in self._turns)
+        self.stored_bytes = turn_bytes + _stored_size(self.summary)
+
+    @property
+    def turn_count(self) -> int:
+        """Total number of completed turns, including summarized ones."""
+        return self.summarized_turns + len(self._turns)
+
+    @property
+    def needs_compaction(self) -> bool:
+        """Whether some turns have left the window and are not summarized yet."""
+        return len(self._turns) > self.window_turns
+
+    def add_turn(self, task: str, response: str) -> None:
+        """
+        Record a completed turn.
+
+        Only the part of each side a prompt can use is kept: the start of the
+        task and the end of the response, where the swarm's final synthesis is.
+        """
+        task = _clip(task, self.max_turn_chars, "head")
+        response = _pack(_clip(response, self.max_turn_chars), self.compress_min_chars)
+        with self.lock:
+            self._turns.append((task, response))
+            self.stored_bytes += _stored_size(task) + _stored_size(response)
+            self.last_used = time.monotonic()
+
+    def compact(self, client=None, keep: Optional[int] = None) -> bool:
+        """
+        Fold the turns that left the window into the rolling summary.
+
+        Only the evicted turns and the previous summary are sent to the model,
+        so each update costs about the same regardless of session length.
+
+        Args:
+            client: Optional SwarmClient used to write the summary. Without one,
+                or if the request fails, an extractive summary is kept instead.
+            keep: Number of recent turns to keep verbatim (default: the window).
+
+        Returns:
+            True if the summary was written by the model.
+        """
+        keep = self.window_turns if keep is None else max(0, keep)
+        # Snapshot the evicted turns, then write the summary without holding the lock,
+        # so a slow model request does not block other users of the session
+        with self.lock:
+            if self._compacting or len(self._turns) <= keep:
+                return False
+            self._compacting = True
+            count = len(self._turns) - keep
+            evicted = [(task, _unpack(response)) for task, response in self._turns[:count]]
+            previous = self.summary
+        try:
+            max_chars = self.summary_tokens * CHARS_PER_TOKEN
+            started = time.perf_counter()
+
+            summary = None
+            if client is not None:
+                prompt = build_session_summary_prompt(previous, evicted, max_words=self.summary_tokens * 3 // 4)
+                try:
+                    for chunk in client.stream_swarm_response(prompt, max_tokens=self.summary_tokens, temperature=0.2):
+                        summary = chunk
+                except APIError as e:
+                    SwarmLogger.log_error("APIError", f"Session summary failed, using extractive summary: {e}")
+                    summary = None
+
+            summarized = bool(summary and summary.strip())
+            if not summarized:
+                lines = [previous] if previous else []
+                for task, response in evicted:
+                    lines.append(f"- User asked: {_clip(task, 200, 'head')} | Swarm concluded: {_clip(response, 300)}")
+                summary = "\n".join(lines)
+
+            # Only compact() removes turns, so the evicted ones are still the oldest
+            with self.lock:
+                self.summary = _clip(summary.strip(), max_chars)
+                self.summarized_turns += count
+                self._turns = self._turns[count:]
+                self._recount()
+            elapsed_s = time.perf_counter() - started
+        finally:
+            with self.lock:
+                self._compacting = False
+
+        SwarmMetrics.increment("session.summaries", labels={"source": "model" if summarized else "extractive"})
+        SwarmMetrics.observe("session.summary_seconds", elapsed_s)
+        SwarmLogger.log_session_summary(self.turn_count, len(evicted), len(self.summary), elapsed_s, summarized)
+        return summarized
+
+    def shrink_to(self, max_bytes: int) -> int:
+        """
+        Fold the oldest turns into the summary (extractively) until the
+        session fits in max_bytes, or no turns are left.
+
+        Args:
+            max_bytes: The session's memory budget.
+
+        Returns:
+            Number of turns folded.
+        """
+        folded = 0
+        with self.lock:
+            while self._turns and self.nbytes > max_bytes:
+                remaining = len(self._turns)
+                self.compact(keep=remaining - 1)
+                if len(self._turns) == remaining:
+                    # Another request is compacting the session right now
+                    break
+                folded += 1
+        if folded:
+            SwarmMetrics.increment("session.turns_shrunk", folded)
+        return folded
+
+    def to_dict(self) -> dict:
+        """Serialise the session for spilling to disk."""
+        with self.lock:
+            return {
+                "version": SESSION_FILE_VERSION,
+                "session_id": self.session_id,
+                "window_turns": self.window_turns,
+                "max_turn_chars": self.max_turn_chars,
+                "summary_tokens": self.summary_tokens,
+                "summary": self.summary,
+                "summarized_turns": self.summarized_turns,
+                "turns": [[task, _unpack(response)] for task, response in self._turns],
+            }
+
+    @classmethod
+    def from_dict(cls, data: dict, compress_min_chars: int = SwarmConfig.DEFAULT_SESSION_COMPRESS_MIN_CHARS) -> "SwarmSession":
+        """Restore a session serialised by to_dict."""
+        if data.get("version") != SESSION_FILE_VERSION:
+            raise ValueError(f"Unsupported session file version: {data.get('version')}")
+        session = cls(
+            data["session_id"],
+            window_turns=data["window_turns"],
+            max_turn_chars=data["max_turn_chars"],
+            summary_tokens=data["summary_tokens"],
+            compress_min_chars=compress_min_chars,
+        )
+        session.summary = data.get("summary", "")
+        session.summarized_turns = data.get("summarized_turns", 0)
+        for task, response in data.get("turns", []):
+            session.add_turn(task, response)
+        with session.lock:
+            session._recount()
+        return session
+
+    def build_messages(self, task: str) -> list[dict]:
+        """
+        Build the chat messages for the next turn.
+
+        The first turn is the usual single swarm prompt. Later turns send the
+        windowed turns as user/assistant messages, followed by a follow-up
+        prompt that carries the rolling summary.
+
+        Args:
+            task: The new user request.
+
+        Returns:
+            Chat messages ending with the new user message.
+        """
+        with self.lock:
+            if not self._turns and not self.summary:
+                return [{"role": "user", "content": build_swarm_prompt(task)}]
+
+            messages = []
+            for turn_task, response in self._turns[-self.window_turns:]:
+                messages.append({"role": "user", "content": turn_task})
+                messages.append({"role": "assistant", "content": _unpack(response)})
+            messages.append({"role": "user", "content": build_follow_up_prompt(task, self.summary)})
+
+        SwarmMetrics.observe("session.prompt_chars", sum(len(m["content"]) for m in messages))
+        return messages
+
+
+class SwarmSessions:
+    """
+    Process-wide store of multi-turn sessions with bounded memory.
+
+    Sessions idle for longer than SWARM_SESSION_IDLE_SECONDS, and the least
+    recently used ones once SWARM_SESSIONS_MAX_BYTES or MAX_SESSIONS is
+    exceeded, are spilled to SWARM_SESSION_SPILL_DIR and restored from there
+    on their next use. Sessions in use by a request are never spilled.
+    """
+
+    # Most sessions held in memory at once
+    MAX_SESSIONS = 500
+    # Spilled sessions untouched for this long are deleted
+    MAX_SPILL_AGE_SECONDS = 7 * 24 * 3600
+
+    # Guards the maps below; session locks are never taken while it is held
+    _lock = threading.Lock()
+    _sessions: "OrderedDict[str, SwarmSession]" = OrderedDict()
+    # Sessions chosen for spilling whose files are still being written
+    _spilling: dict[str, SwarmSession] = {}
+    _spills = 0
+    _restores = 0
+    _last_prune = 0.0
+
+    @staticmethod
+    def new_session_id() -> str:
+        """Generate an identifier for a new session."""
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def _spill_path(session_id: str) -> str:
+        """File a session is spilled to (IDs that are not safe file names are hashed)."""
+        name = session_id if re.fullmatch(r"[A-Za-z0-9_-]{1,128}", session_id) else hashlib.sha256(
+            session_id.encode("utf-8")
+        ).hexdigest()
+        return os.path.join(SwarmConfig.get_session_spill_dir(), f"{name}.json.gz")
+
+    @staticmethod
+    def _spill_version(path: str) -> Optional[tuple[int, int, int]]:
+        """Identify the spill file currently at path, or None if there is none."""
+        try:
+            info = os.stat(path)
+        except OSError:
+            return None
+        return info.st_ino, info.st_mtime_ns, info.st_size
+
+    @staticmethod
+    def _read_spill(path: str) -> Optional[SwarmSession]:
+        """Load a spilled session (lock not held); None if the file is unreadable."""
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return SwarmSession.from_dict(json.load(f), SwarmConfig.get_session_compress_min_chars())
+        except (OSError, ValueError, KeyError) as e:
+            SwarmLogger.log_error("SessionRestoreError", str(e))
+            return None
+
+    @staticmethod
+    def _spill(victims: list[tuple[SwarmSession, str]]) -> None:
+        """
+        Write sessions chosen by _enforce to disk (lock not held).
+
+        A session checked out again while its file was being written stays in
+        memory, and the file is removed.
+        """
+        for session, reason in victims:
+            path = SwarmSessions._spill_path(session.session_id)
+            written = False
+            try:
+                ensure_private_dir(os.path.dirname(path))
+                with session.lock:
+                    data = gzip.compress(json.dumps(session.to_dict()).encode("utf-8"))
+                    write_private_file(path, data)
+                written = True
+            except OSError as e:
+                SwarmLogger.log_error("SessionSpillError", str(e))
+            with SwarmSessions._lock:
+                session.pending_spills -= 1
+                if session.pending_spills:
+                    # A later spill of the same session writes its final state
+                    continue
+                if SwarmSessions._spilling.get(session.session_id) is session:
+                    del SwarmSessions._spilling[session.session_id]
+                else:
+                    # Checked out again (the in-memory session is authoritative) or discarded
+                    if written:
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                    continue
+                if not written:
+                    SwarmMetrics.increment("session.dropped", labels={"reason": reason})
+                    continue
+                SwarmSessions._spills += 1
+                SwarmMetrics.increment("session.spilled", labels={"reason": reason})
+
+    @staticmethod
+    def _prune_spilled() -> None:
+        """Delete spilled sessions older than MAX_SPILL_AGE_SECONDS, at most hourly (lock held)."""
+        now = time.time()
+        if now - SwarmSessions._last_prune < 3600:
+            return
+        SwarmSessions._last_prune = now
+        directory = SwarmConfig.get_session_spill_dir()
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                if now - os.path.getmtime(path) > SwarmSessions.MAX_SPILL_AGE_SECONDS:
+                    os.remove(path)
+            except OSError:
+                continue
+
+    @staticmethod
+    def _enforce(protect: Optional[str] = None) -> list[tuple[SwarmSession, str]]:
+        """
+        Choose idle sessions, then least recently used ones while over budget, for spilling (lock held).
+
+        Leased sessions and the protect session (about to be returned to a caller)
+        stay. The chosen sessions leave the in-memory map; pass them to _spill
+        once the lock is released.
+
+        Returns:
+            (session, reason) pairs to spill.
+        """
+        sessions = SwarmSessions._sessions
+        victims = []
+
+        def evict(session: SwarmSession, reason: str) -> None:
+            del sessions[session.session_id]
+            SwarmSessions._spilling[session.session_id] = session
+            session.pending_spills += 1
+            victims.append((session, reason))
+
+        evictable = [s for s in sessions.values() if s.leases == 0 and s.session_id != protect]
+        idle_s = SwarmConfig.get_session_idle_seconds()
+        if idle_s > 0:
+            cutoff = time.monotonic() - idle_s
+            for session in [s for s in evictable if s.last_used < cutoff]:
+                evict(session, "idle")
+
+        max_bytes = SwarmConfig.get_sessions_max_bytes()
+        total = sum(session.nbytes for session in sessions.values())
+        for session in [s for s in evictable if s.session_id in sessions]:
+            if total <= max_bytes and len(sessions) <= SwarmSessions.MAX_SESSIONS:
+                break
+            total -= session.nbytes
+            evict(session, "budget")
+
+        if SwarmSessions._spills:
+            SwarmSessions._prune_spilled()
+        SwarmMetrics.set_gauge("session.active", len(sessions))
+        SwarmMetrics.set_gauge("session.resident_bytes", total)
+        return victims
+
+    @staticmethod
+    def get(session_id: str) -> SwarmSession:
+        """
+        Get a session, restoring it from disk or creating it with the configured limits if needed.
+
+        Args:
+            session_id: Identifier of the session.
+
+        Returns:
+            The session.
+        """
+        return SwarmSessions._checkout(session_id)
+
+    @staticmethod
+    def _new_session(session_id: str) -> SwarmSession:
+        """Create an empty session with the configured limits."""
+        return SwarmSession(
+            session_id,
+            window_turns=SwarmConfig.get_session_window_turns(),
+            max_turn_chars=SwarmConfig.get_session_max_turn_chars(),
+            summary_tokens=SwarmConfig.get_session_summary_tokens(),
+            compress_min_chars=SwarmConfig.get_session_compress_min_chars(),
+        )
+
+    @staticmethod
+    def _checkout(session_id: str, lease: bool = False) -> SwarmSession:
+        """
+        Get a session as most recently used, optionally leasing it in the same step.
+
+        A spilled session's file is read without holding the lock; the
+        session is only taken from it if, once the lock is held again, the
+        session is still not in memory and the file was not replaced meanwhile.
+        """
+        path = SwarmSessions._spill_path(session_id)
+        # (version of the spill file, session read from it)
+        spilled: Optional[tuple[tuple[int, int, int], Optional[SwarmSession]]] = None
+        while True:
+            with SwarmSessions._lock:
+                session = SwarmSessions._sessions.pop(session_id, None) or SwarmSessions._spilling.pop(session_id, None)
+                version = None
+                if session is None:
+                    version = SwarmSessions._spill_version(path)
+                    if version is None:
+                        session = SwarmSessions._new_session(session_id)
+                    elif spilled is not None and spilled[0] == version:
+                        session = spilled[1] or SwarmSessions._new_session(session_id)
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                        if spilled[1] is not None:
+                            SwarmSessions._restores += 1
+                            SwarmMetrics.increment("session.restored")
+                if session is not None:
+                    session.last_used = time.monotonic()
+                    if lease:
+                        session.leases += 1
+                    SwarmSessions._sessions[session_id] = session
+                    victims = SwarmSessions._enforce(protect=session_id)
+                    break
+            spilled = (version, SwarmSessions._read_spill(path))
+        SwarmSessions._spill(victims)
+        return session
+
+    @staticmethod
+    @contextmanager
+    def use(session_id: str) -> Generator[SwarmSession, None, None]:
+        """
+        Hold a session for the duration of a request.
+
+        The session is not spilled while held. Afterwards it is shrunk to
+        SWARM_SESSION_MAX_BYTES and the global budget is enforced.
+
+        Args:
+            session_id: Identifier of the session.
+
+        Yields:
+            The session.
+        """
+        session = SwarmSessions._checkout(session_id, lease=True)
+        try:
+            yield session
+        finally:
+            session.shrink_to(SwarmConfig.get_session_max_bytes())
+            with SwarmSessions._lock:
+                session.leases -= 1
+                session.last_used = time.monotonic()
+                victims = SwarmSessions._enforce()
+            SwarmSessions._spill(victims)
+
+    @staticmethod
+    def discard(session_id: Optional[str]) -> None:
+        """Forget a session, in memory and on disk (e.g. when the user clears the chat)."""
+        if not session_id:
+            return
+        with SwarmSessions._lock:
+            SwarmSessions._sessions.pop(session_id, None)
+            SwarmSessions._spilling.pop(session_id, None)
+            try:
+                os.remove(SwarmSessions._spill_path(session_id))
+            except OSError:
+                pass
+            SwarmMetrics.set_gauge("session.active", len(SwarmSessions._sessions))
+
+    @staticmethod
+    def stats() -> dict:
+        """Get session memory use and this worker's resident memory."""
+        with SwarmSessions._lock:
+            resident = list(SwarmSessions._sessions.values())
+            stats = {
+                "resident_sessions": len(resident),
+                "resident_bytes": sum(session.nbytes for session in resident),
+                "spilled": SwarmSessions._spills,
+                "restored": SwarmSessions._restores,
+            }
+        memory = process_memory()
+        if memory["rss_bytes"] is not None:
+            SwarmMetrics.set_gauge("process.rss_bytes", memory["rss_bytes"], labels={"pid": memory["pid"]})
+        return {**stats, "process": memory}
+
+    @staticmethod
+    def clear() -> None:
+        """Forget all in-memory sessions (used by tests)."""
+        with SwarmSessions._lock:
+            SwarmSessions._sessions.clear()
+            SwarmSessions._spilling.clear()
+            SwarmSessions._spills = SwarmSessions._restores = 0
@@ -0,0 +1,343 @@
+"""Stream shaping utilities between upstream model streams and the UI."""
+
+import html
+import queue
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Generator, Hashable, Iterable, Optional, TypeVar
+
+from .api import SwarmClient
+from .prompts import AGENT_HEADING_LABEL
+
+T = TypeVar("T")
+
+
+class CoalesceStats:
+    """Counts of snapshots received from upstream and emitted downstream."""
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.emitted = 0
+
+    @property
+    def reduction(self) -> float:
+        """Fraction of upstream snapshots that were never sent downstream."""
+        if not self.received:
+            return 0.0
+        return 1 - self.emitted / self.received
+
+
+def coalesce_stream(
+    stream: Iterable[T],
+    min_interval_ms: float = 0,
+    min_chars: int = 0,
+    stats: Optional[CoalesceStats] = None,
+    size: Callable[[T], int] = len,
+    clock: Callable[[], float] = time.monotonic,
+) -> Generator[T, None, None]:
+    """
+    Throttle a stream of accumulated snapshots.
+
+    Each item from an accumulating stream supersedes the previous one, so
+    intermediate items can be skipped without losing content. The first item
+    is emitted immediately; after that an item is emitted once min_interval_ms
+    has passed or min_chars of new content has arrived since the last emit,
+    whichever comes first. The last item is always flushed at the end.
+
+    Args:
+        stream: Accumulated snapshots (e.g. from SwarmClient.stream_swarm_response).
+        min_interval_ms: Minimum time between emits; 0 disables the time trigger.
+        min_chars: Content growth that forces an emit; 0 disables the size trigger.
+        stats: Optional stats object to populate with received/emitted counts.
+        size: Function measuring the content size of an item.
+        clock: Monotonic clock in seconds, injectable for tests.
+
+    Yields:
+        A subset of the input items, always including the first and the last.
+
+    Raises:
+        Exception: Any error from the upstream stream, after flushing the
+            pending item.
+    """
+    stats = stats if stats is not None else CoalesceStats()
+    throttled = min_interval_ms > 0 or min_chars > 0
+
+    last_emit_time: Optional[float] = None
+    last_emit_size = 0
+    pending = None
+    has_pending = False
+
+    try:
+        for item in stream:
+            stats.received += 1
+            if throttled and last_emit_time is not None:
+                now = clock()
+                due = (
+                    (min_interval_ms > 0 and (now - last_emit_time) * 1000 >= min_interval_ms)
+                    or (min_chars > 0 and size(item) - last_emit_size >= min_chars)
+                )
+                if not due:
+                    pending, has_pending = item, True
+                    continue
+
+            has_pending = False
+            last_emit_time = clock()
+            last_emit_size = size(item)
+            stats.emitted += 1
+            yield item
+    except Exception:
+        # Show whatever arrived before the upstream failure, then re-raise
+        if has_pending:
+            stats.emitted += 1
+            yield pending
+        raise
+    finally:
+        # Propagate early consumer exit to the upstream generator
+        close = getattr(stream, "close", None)
+        if callable(close):
+            close()
+
+    if has_pending:
+        stats.emitted += 1
+        yield pending
+
+
+class BufferStats:
+    """Counts and high-water mark of a buffered stream."""
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.emitted = 0
+        self.dropped = 0
+        self.high_water = 0
+
+
+def buffered_stream(
+    stream: Iterable[T],
+    max_items: int = 16,
+    stats: Optional[BufferStats] = None,
+    name: str = "stream",
+    step_hook: Optional[Callable[[Iterable[T]], Iterable[T]]] = None,
+) -> Generator[T, None, None]:
+    """
+    Drain a stream of accumulated snapshots on a producer thread.
+
+    The producer reads upstream as fast as it produces, so a slow consumer
+    never stalls the upstream connection. Snapshots wait in a bounded buffer;
+    when it is full the oldest one is dropped, because every snapshot
+    supersedes the ones before it. A slow consumer therefore skips stale
+    intermediate frames and always moves on to the latest state.
+
+    Args:
+        stream: Accumulated snapshots (e.g. from SwarmClient.stream_swarm_response).
+        max_items: Buffer capacity; 0 disables buffering and passes items through.
+        stats: Optional stats object to populate with counts and the high-water mark.
+        name: Label for the producer thread.
+        step_hook: Optional wrapper applied to the stream on the producer thread,
+            where the upstream work runs (e.g. RequestProfiler.profile_steps).
+            Unused when buffering is disabled, since the stream then runs on
+            the consumer's thread.
+
+    Yields:
+        The input items in order, minus any dropped while the buffer was full.
+        The last item is never dropped.
+
+    Raises:
+        Exception: Any error from the upstream stream, after the items
+            buffered before it.
+    """
+    stats = stats if stats is not None else BufferStats()
+    if max_items <= 0:
+        for item in stream:
+            stats.received += 1
+            stats.emitted += 1
+            yield item
+        return
+
+    buffer: deque = deque()
+    condition = threading.Condition()
+    cancelled = threading.Event()
+    state: dict = {"done": False, "error": None}
+
+    def produce() -> None:
+        source = step_hook(stream) if step_hook is not None else stream
+        try:
+            for item in source:
+                if cancelled.is_set():
+                    break
+                with condition:
+                    stats.received += 1
+                    if len(buffer) >= max_items:
+                        buffer.popleft()
+                        stats.dropped += 1
+                    buffer.append(item)
+                    stats.high_water = max(stats.high_water, len(buffer))
+                    condition.notify()
+        except Exception as e:
+            state["error"] = e
+        finally:
+            # Generators can only be closed from the thread running them
+            for opened in (source, stream):
+                close = getattr(opened, "close", None)
+                if callable(close):
+                    close()
+            with condition:
+                state["done"] = True
+                condition.notify()
+
+    threading.Thread(target=produce, name=f"swarm-{name}-producer", daemon=True).start()
+
+    try:
+        while True:
+            with condition:
+                while not buffer and not state["done"]:
+                    condition.wait()
+                if buffer:
+                    item = buffer.popleft()
+                elif state["error"] is not None:
+                    raise state["error"]
+                else:
+                    return
+            stats.emitted += 1
+            yield item
+    finally:
+        # Stop the producer if the consumer went away early
+        cancelled.set()
+
+
+def pump_stream(
+    client: SwarmClient,
+    source: Hashable,
+    prompt: str,
+    max_tokens: int,
+    temperature: float,
+    events: queue.Queue,
+    cancel: threading.Event,
+    messages: Optional[list[dict]] = None,
+    step_hook: Optional[Callable[[Iterable[str]], Iterable[str]]] = None,
+) -> None:
+    """
+    Drain one model's stream into a queue shared with other streams until cancelled.
+
+    Meant to run on its own thread, one per model. Puts ("chunk", source, text)
+    for every snapshot, then ("done", source, None) or ("error", source, exception).
+
+    Args:
+        client: Client for the model.
+        source: Tag identifying this stream in the events.
+        prompt: Task prompt, used unless messages is given.
+        max_tokens: Maximum tokens to generate.
+        temperature: Sampling temperature.
+        events: Queue receiving the events.
+        cancel: Set to stop forwarding chunks and close the stream.
+        messages: Full chat messages to send instead of the prompt.
+        step_hook: Optional wrapper applied to the model's stream on this thread
+            (e.g. RequestProfiler.profile_steps).
+    """
+    stream = reader = None
+    try:
+        if messages is not None:
+            stream = client.stream_chat_response(messages, max_tokens=max_tokens, temperature=temperature)
+        else:
+            stream = client.stream_swarm_response(prompt, max_tokens=max_tokens, temperature=temperature)
+        reader = step_hook(stream) if step_hook is not None else stream
+        for text in reader:
+            if cancel.is_set():
+                break
+            events.put(("chunk", source, text))
+        events.put(("done", source, None))
+    except Exception as e:
+        events.put(("error", source, e))
+    finally:
+        for opened in (reader, stream):
+            close = getattr(opened, "close", None)
+            if callable(close):
+                close()
+
+
+# A "**Agent: Role Name**" heading at the start of a line opens a new agent section; other
+# bold labels ("**Risks:**", "**Swarm Complete:**") stay inside the current section
+AGENT_HEADING = re.compile(
+    rf"^\*\*{re.escape(AGENT_HEADING_LABEL)}:[ \t]*([^*\n]{{1,80}}?):?\*\*", re.MULTILINE
+)
+# Earlier prompts asked for "**Role Name:**" on a line of its own; responses in that format
+# (e.g. from a customized prompt) split there instead. The newline must have arrived, so a
+# streamed inline label ("**Risks:** ...") is never mistaken for one.
+LEGACY_AGENT_HEADING = re.compile(r"^\*\*([^*\n:]{1,80}):\*\*[ \t]*(?=\n)", re.MULTILINE)
+_COLLAPSED = re.compile(r"\A<details><summary>[^<]*</summary>\n\n(.*)\n</details>\Z", re.DOTALL)
+
+
+def collapse_section(section: str) -> str:
+    """Wrap a finished agent section in a collapsed <details> block titled by its heading."""
+    match = AGENT_HEADING.match(section) or LEGACY_AGENT_HEADING.match(section)
+    if match is None:
+        return section
+    return f"<details><summary>{html.escape(match.group(1))}</summary>\n\n{section}\n</details>"
+
+
+def expand_section(message: str) -> str:
+    """Undo collapse_section, returning the section text unchanged otherwise."""
+    match = _COLLAPSED.match(message)
+    return match.group(1) if match else message
+
+
+class AgentSections:
+    """
+    Split an accumulating swarm response into one chat message per agent.
+
+    Sections start at AGENT_HEADING, or at LEGACY_AGENT_HEADING when the
+    response's first heading is in that format; text before the first
+    heading (status lines) stays with the first section. Once the next heading arrives a
+    section is finished: its message string is built once and reused on every
+    later update, so only the active section changes between snapshots.
+    Concatenating the (expanded) sections gives back the full response.
+
+    Args:
+        collapse: Collapse finished sections (see collapse_section).
+    """
+
+    def __init__(self, collapse: bool = False) -> None:
+        self.collapse = collapse
+        self.text = ""
+        self.finished: list[str] = []
+        self._active_start = 0
+        # Heading format of this response, chosen by its first heading
+        self._heading: Optional[re.Pattern] = None
+
+    def update(self, text: str) -> list[str]:
+        """
+        Take the latest accumulated snapshot.
+
+        Args:
+            text: The full response so far.
+
+        Returns:
+            The finished section messages followed by the active section.
+        """
+        if not text.startswith(self.text):
+            # The snapshot replaced the response (draft handed over, or an error)
+            self.finished = []
+            self._active_start = 0
+            self._heading = None
+        self.text = text
+        if self._heading is None:
+            agent = AGENT_HEADING.search(text)
+            legacy = LEGACY_AGENT_HEADING.search(text)
+            if agent is None and legacy is None:
+                return [text]
+            if agent is not None and (legacy is None or agent.start() <= legacy.start()):
+                self._heading = AGENT_HEADING
+            else:
+                self._heading = LEGACY_AGENT_HEADING
+        # Only the active section can gain headings; leading status lines join the first agent
+        has_heading = self._heading.match(text, self._active_start) is not None
+        for match in self._heading.finditer(text, self._active_start + 1):
+            if not has_heading:
+                has_heading = True
+                continue
+            section = text[self._active_start:match.start()]
+            self.finished.append(collapse_section(section) if self.collapse else section)
+            self._active_start = match.start()
+        return self.finished + [text[self._active_start:]]
@@ -0,0 +1,19 @@
+"""Token counting helpers for SwarmMaster."""
+
+# Rough average for English text and code with Llama-style BPE tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text.
+    
+    Args:
+        text: The text to measure.
+        
+    Returns:
+        Estimated token count (0 for empty text).
+    """
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
@@ -0,0 +1,400 @@
+"""Lightweight request tracing and on-demand profiling for SwarmMaster.
+
+Each request gets a RequestTrace with a request-scoped ID. Spans are plain
+timestamp pairs, so they can stay open across generator yields. Finished traces
+are buffered in SwarmTracer and can be exported as a Chrome trace (load it in
+chrome://tracing or Perfetto) or as OTLP-JSON.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Generator, Iterable, Optional, TypeVar
+
+from .config import SwarmConfig
+from .logger import SwarmLogger
+from .metrics import SwarmMetrics
+
+T = TypeVar("T")
+
+
+class Span:
+    """A named, timed section of a request."""
+
+    def __init__(self, trace: "RequestTrace", name: str, parent_id: Optional[str], attrs: dict) -> None:
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attrs = dict(attrs)
+        self.thread_id = threading.get_ident()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+
+    @property
+    def duration_ns(self) -> int:
+        """Span duration in nanoseconds (up to now if still open)."""
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return end - self.start_ns
+
+    def set(self, **attrs: Any) -> None:
+        """Add attributes to the span."""
+        self.attrs.update(attrs)
+
+    def end(self) -> None:
+        """Close the span; closing twice is a no-op."""
+        if self.end_ns is None:
+            self.end_ns = time.perf_counter_ns()
+
+
+class RequestTrace:
+    """All spans recorded for a single request."""
+
+    def __init__(self, name: str, request_id: Optional[str] = None, **attrs: Any) -> None:
+        self.request_id = request_id or uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._epoch_unix_ns = time.time_ns()
+        self._epoch_perf_ns = time.perf_counter_ns()
+        self.spans: list[Span] = []
+        self.root = self.start_span(name, **attrs)
+
+    def start_span(self, name: str, **attrs: Any) -> Span:
+        """Open a span that must be closed with Span.end()."""
+        parent_id = self.root.span_id if self.spans else None
+        span = Span(self, name, parent_id, attrs)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Generator[Span, None, None]:
+        """Context manager that records a span around its body."""
+        span = self.start_span(name, **attrs)
+        try:
+            yield span
+        finally:
+            span.end()
+
+    def unix_ns(self, perf_ns: int) -> int:
+        """Convert a perf_counter timestamp from this trace to Unix nanoseconds."""
+        return self._epoch_unix_ns + (perf_ns - self._epoch_perf_ns)
+
+    def finish(self) -> None:
+        """Close any open spans and hand the trace to SwarmTracer."""
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            span.end()
+        SwarmTracer.record(self)
+
+
+def span(trace: Optional[RequestTrace], name: str, **attrs: Any) -> ContextManager:
+    """Record a span on trace, or do nothing when tracing is not in use."""
+    if trace is None:
+        return nullcontext()
+    return trace.span(name, **attrs)
+
+
+class SwarmTracer:
+    """Process-wide buffer of finished traces with file export."""
+
+    # Only the most recent spans are kept so the buffer stays bounded
+    MAX_BUFFERED_SPANS = 10000
+
+    _lock = threading.Lock()
+    _export_lock = threading.Lock()
+    _spans: deque = deque(maxlen=MAX_BUFFERED_SPANS)
+
+    @staticmethod
+    def record(trace: RequestTrace) -> None:
+        """Buffer a finished trace, publish span timings, and append it to the trace file if configured."""
+        with SwarmTracer._lock:
+            SwarmTracer._spans.extend(trace.spans)
+        for finished in trace.spans:
+            SwarmMetrics.observe(f"trace.{finished.name}_seconds", finished.duration_ns / 1e9)
+
+        path = SwarmConfig.get_trace_file()
+        if path:
+            SwarmTracer.append(path, trace.spans, SwarmConfig.get_trace_format())
+
+    @staticmethod
+    def append(path: str, spans: list[Span], fmt: str = "chrome") -> None:
+        """
+        Append spans to a trace file, so each request costs only its own spans.
+
+        Chrome traces use the JSON array format, which chrome://tracing and
+        Perfetto load without the closing bracket; OTLP traces are written as
+        JSON Lines, one export request per line.
+
+        A file that cannot be written is logged and skipped, so tracing never
+        fails the request being traced.
+
+        Args:
+            path: Output file path.
+            spans: The spans to add.
+            fmt: "chrome" for Chrome trace events or "otlp" for OTLP-JSON.
+        """
+        if fmt == "otlp":
+            text = json.dumps(SwarmTracer.to_otlp_json(spans)) + "\n"
+        else:
+            text = "".join(json.dumps(event) + ",\n" for event in SwarmTracer.to_chrome_trace(spans)["traceEvents"])
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with SwarmTracer._export_lock:
+                with open(path, "a", encoding="utf-8") as f:
+                    if fmt != "otlp" and f.tell() == 0:
+                        f.write("[\n")
+                    f.write(text)
+        except OSError as e:
+            SwarmMetrics.increment("trace.export_errors")
+            SwarmLogger.log_error("TracingError", f"Could not append to trace file {path}: {str(e)}")
+
+    @staticmethod
+    def spans() -> list[Span]:
+        """Get a copy of the buffered spans."""
+        with SwarmTracer._lock:
+            return list(SwarmTracer._spans)
+
+    @staticmethod
+    def clear() -> None:
+        """Drop all buffered spans."""
+        with SwarmTracer._lock:
+            SwarmTracer._spans.clear()
+
+    @staticmethod
+    def to_chrome_trace(spans: list[Span]) -> dict:
+        """Convert spans to the Chrome trace event format."""
+        pid = os.getpid()
+        events = []
+        for s in spans:
+            events.append({
+                "name": s.name,
+                "cat": "swarm",
+                "ph": "X",
+                "ts": s.trace.unix_ns(s.start_ns) / 1000,
+                "dur": s.duration_ns / 1000,
+                "pid": pid,
+                "tid": s.thread_id,
+                "args": {"request_id": s.trace.request_id, **s.attrs},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    @staticmethod
+    def to_otlp_json(spans: list[Span]) -> dict:
+        """Convert spans to the OTLP-JSON trace export format."""
+
+        def attribute(key: str, value: Any) -> dict:
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        otlp_spans = []
+        for s in spans:
+            otlp_span = {
+                "traceId": s.trace.request_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.trace.unix_ns(s.start_ns)),
+                "endTimeUnixNano": str(s.trace.unix_ns(s.start_ns + s.duration_ns)),
+                "attributes": [attribute(key, value) for key, value in s.attrs.items()],
+            }
+            if s.parent_id:
+                otlp_span["parentSpanId"] = s.parent_id
+            otlp_spans.append(otlp_span)
+
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [attribute("service.name", "swarmmaster")]},
+                "scopeSpans": [{"scope": {"name": "swarmmaster"}, "spans": otlp_spans}],
+            }]
+        }
+
+    @staticmethod
+    def export(path: str, fmt: str = "chrome") -> None:
+        """
+        Write all buffered spans to a trace file.
+
+        Args:
+            path: Output file path.
+            fmt: "chrome" for Chrome trace events or "otlp" for OTLP-JSON.
+        """
+        spans = SwarmTracer.spans()
+        data = SwarmTracer.to_otlp_json(spans) if fmt == "otlp" else SwarmTracer.to_chrome_trace(spans)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with SwarmTracer._export_lock:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+
+
+class RequestProfiler:
+    """Opt-in cProfile or tracemalloc profiling of a sampled request.
+
+    A streaming request's generator steps may run on different server threads,
+    and cProfile only observes the thread that enables it. profile_steps
+    therefore enables cProfile around each step on the thread running it and
+    disables it before yielding, so no thread is left profiled. The request's
+    work also runs on producer and pump threads (see buffered_stream), so each
+    stream wrapped with profile_steps gets its own cProfile profile and the
+    report merges them all. tracemalloc is process-wide, so at most one
+    tracemalloc profile runs at a time.
+    """
+
+    _tracemalloc_lock = threading.Lock()
+
+    def __init__(self, request_id: str, mode: str, directory: str) -> None:
+        self.request_id = request_id
+        self.mode = mode
+        self.directory = directory
+        self._profiling = False
+        self._profiles: list[cProfile.Profile] = []
+        self._profiles_lock = threading.Lock()
+        self._active = threading.local()
+        self._owns_tracemalloc = False
+
+    @staticmethod
+    def maybe_start(request_id: str) -> Optional["RequestProfiler"]:
+        """
+        Start profiling this request if it is selected by the sample rate.
+
+        Args:
+            request_id: ID used to name the report files.
+
+        Returns:
+            A running profiler, or None if the request was not sampled.
+        """
+        rate = SwarmConfig.get_profile_sample_rate()
+        if rate <= 0 or random.random() >= rate:
+            return None
+        profiler = RequestProfiler(request_id, SwarmConfig.get_profile_mode(), SwarmConfig.get_profile_dir())
+        return profiler if profiler.start() else None
+
+    def start(self) -> bool:
+        """Begin profiling; returns False if the profiler could not start."""
+        if self.mode == "tracemalloc":
+            if tracemalloc.is_tracing() or not RequestProfiler._tracemalloc_lock.acquire(blocking=False):
+                return False
+            self._owns_tracemalloc = True
+            tracemalloc.start(25)
+            return True
+        self._profiling = True
+        return True
+
+    def profile_steps(self, stream: Iterable[T]) -> Generator[T, None, None]:
+        """
+        Yield from stream, profiling each step on the thread that runs it.
+
+        Usable as a stream hook on other threads (buffered_stream's producer,
+        preview pumps); each call records into its own profile.
+
+        Args:
+            stream: The request's response stream, or an upstream stream it reads.
+
+        Yields:
+            The stream's items.
+        """
+        iterator = iter(stream)
+        if not self._profiling:
+            yield from iterator
+            return
+        profile = cProfile.Profile()
+        with self._profiles_lock:
+            self._profiles.append(profile)
+        try:
+            while True:
+                enabled = False
+                # A stream nested in another profiled step on this thread is already covered
+                if not getattr(self._active, "step", False):
+                    try:
+                        profile.enable()
+                        enabled = True
+                        self._active.step = True
+                    except ValueError:
+                        # Another profiler is active (e.g. a concurrent sampled request on 3.12+)
+                        pass
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    if enabled:
+                        profile.disable()
+                        self._active.step = False
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if callable(close):
+                close()
+
+    def stop(self) -> Optional[str]:
+        """
+        Stop profiling and write the report.
+
+        A report that cannot be written is logged and skipped, so profiling
+        never fails the request being profiled.
+
+        Returns:
+            Path to the written report, or None if nothing was written.
+        """
+        if self._owns_tracemalloc:
+            try:
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+                RequestProfiler._tracemalloc_lock.release()
+            path = os.path.join(self.directory, f"{self.request_id}.tracemalloc.txt")
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(f"request_id: {self.request_id}\ncurrent: {current} bytes\npeak: {peak} bytes\n\n")
+                    for stat in snapshot.statistics("lineno")[:25]:
+                        f.write(f"{stat}\n")
+            except OSError as e:
+                SwarmLogger.log_error("TracingError", f"Could not write profile {path}: {str(e)}")
+                return None
+            return path
+
+        with self._profiles_lock:
+            profiles, self._profiles = self._profiles, []
+        self._profiling = False
+        # Profiles of threads that never ran a step have no stats to merge
+        profiles = [profile for profile in profiles if profile.getstats()]
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        path = os.path.join(self.directory, f"{self.request_id}.cprofile.txt")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stats.dump_stats(os.path.join(self.directory, f"{self.request_id}.prof"))
+            report = io.StringIO()
+            stats.stream = report
+            stats.sort_stats("cumulative").print_stats(40)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(report.getvalue())
+        except OSError as e:
+            SwarmLogger.log_error("TracingError", f"Could not write profile {path}: {str(e)}")
+            return None
+        return path
@@ -0,0 +1,318 @@
+"""Token usage, cost accounting and budgets for SwarmMaster.
+
+SwarmClient reports prompt and completion tokens from the stream's usage chunk
+when the endpoint sends one, and estimates them from text length otherwise.
+UsageLedger aggregates usage per model, per UTC day and per session, prices it
+with the cost table from SwarmConfig, persists the model and daily totals to
+SWARM_USAGE_FILE, and enforces the session and daily budgets.
+
+Workers sharing SWARM_USAGE_FILE each add only their new totals to the file,
+at most every SWARM_USAGE_FLUSH_SECONDS and at exit, merging under a file lock
+so they never overwrite each other; daily budgets therefore see other
+workers' spend as of their last flush.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from .config import SwarmConfig
+from .files import ensure_private_dir, file_lock, write_private_file
+from .logger import SwarmLogger
+from .metrics import SwarmMetrics
+from .tokens import estimate_tokens
+
+USAGE_FILE_VERSION = 1
+
+
+class TokenUsage:
+    """Prompt and completion token counts for one or more requests."""
+
+    def __init__(self, prompt_tokens: int = 0, completion_tokens: int = 0, estimated: bool = False) -> None:
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.estimated = estimated
+
+    @property
+    def total_tokens(self) -> int:
+        """Prompt plus completion tokens."""
+        return self.prompt_tokens + self.completion_tokens
+
+    @classmethod
+    def estimate(cls, prompt: str, completion: str) -> "TokenUsage":
+        """Estimate usage from text when the upstream reports none."""
+        return cls(estimate_tokens(prompt), estimate_tokens(completion), estimated=True)
+
+    @classmethod
+    def from_stream(cls, usage: Any) -> Optional["TokenUsage"]:
+        """Read a usage object from a chat_completion stream chunk, if it carries counts."""
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if isinstance(prompt_tokens, int) and isinstance(completion_tokens, int):
+            return cls(prompt_tokens, completion_tokens)
+        return None
+
+    def add(self, other: "TokenUsage") -> None:
+        """Add another usage to this one; the sum is estimated if either part was."""
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.estimated = self.estimated or other.estimated
+
+    def cost_usd(self, model: str) -> float:
+        """Price this usage with the model's entry in the cost table (0 if unlisted)."""
+        input_per_million, output_per_million = SwarmConfig.get_model_costs().get(model, (0.0, 0.0))
+        return (self.prompt_tokens * input_per_million + self.completion_tokens * output_per_million) / 1_000_000
+
+
+def _empty_totals() -> dict:
+    return {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "estimated_requests": 0, "cost_usd": 0.0}
+
+
+def _add_totals(totals: dict, usage: TokenUsage, cost: float) -> None:
+    totals["requests"] += 1
+    totals["prompt_tokens"] += usage.prompt_tokens
+    totals["completion_tokens"] += usage.completion_tokens
+    totals["estimated_requests"] += 1 if usage.estimated else 0
+    totals["cost_usd"] = round(totals["cost_usd"] + cost, 6)
+
+
+def _add_usage(models: dict, days: dict, day: str, model: str, usage: TokenUsage, cost: float) -> None:
+    _add_totals(models.setdefault(model, _empty_totals()), usage, cost)
+    day_totals = days.setdefault(day, {"cost_usd": 0.0, "models": {}})
+    day_totals["cost_usd"] = round(day_totals["cost_usd"] + cost, 6)
+    _add_totals(day_totals["models"].setdefault(model, _empty_totals()), usage, cost)
+
+
+def _merge_totals(models: dict, days: dict, more_models: dict, more_days: dict) -> None:
+    """Add the model and daily totals in more_models/more_days to models/days."""
+
+    def merge(totals: dict, more: dict) -> None:
+        for key, value in more.items():
+            totals[key] = round(totals.get(key, 0) + value, 6) if key == "cost_usd" else totals.get(key, 0) + value
+
+    for model, more in more_models.items():
+        merge(models.setdefault(model, _empty_totals()), more)
+    for day, more in more_days.items():
+        day_totals = days.setdefault(day, {"cost_usd": 0.0, "models": {}})
+        day_totals["cost_usd"] = round(day_totals["cost_usd"] + more["cost_usd"], 6)
+        for model, more_model in more["models"].items():
+            merge(day_totals["models"].setdefault(model, _empty_totals()), more_model)
+
+
+class UsageLedger:
+    """Process-wide usage totals per model, day and session, with budgets."""
+
+    # Daily totals older than this are dropped from the usage file
+    MAX_DAYS = 31
+    # Only the most recently active sessions are tracked
+    MAX_SESSIONS = 1000
+
+    _lock = threading.Lock()
+    # Serializes flushes, so a failed one can put its totals back before the next starts
+    _flush_lock = threading.Lock()
+    _path: Optional[str] = None
+    _models: dict[str, dict] = {}
+    _days: dict[str, dict] = {}
+    _sessions: "OrderedDict[str, dict]" = OrderedDict()
+    # Totals recorded since the last flush, not yet in the usage file
+    _pending_models: dict[str, dict] = {}
+    _pending_days: dict[str, dict] = {}
+    _last_flush = 0.0
+
+    @staticmethod
+    def _today() -> str:
+        """Current UTC date as YYYY-MM-DD."""
+        return datetime.now(timezone.utc).date().isoformat()
+
+    @staticmethod
+    def _ensure_loaded() -> None:
+        """Load persisted totals when first used or when SWARM_USAGE_FILE changes (lock held)."""
+        path = SwarmConfig.get_usage_file()
+        if path == UsageLedger._path:
+            return
+        UsageLedger._path = path
+        UsageLedger._models, UsageLedger._days = UsageLedger._read(path)
+        UsageLedger._sessions = OrderedDict()
+        UsageLedger._pending_models, UsageLedger._pending_days = {}, {}
+
+    @staticmethod
+    def _read(path: str) -> tuple[dict, dict]:
+        """Read the model and daily totals from a usage file (empty if missing or unreadable)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}, {}
+        if not isinstance(data, dict) or data.get("version") != USAGE_FILE_VERSION:
+            return {}, {}
+        return data.get("models", {}), data.get("days", {})
+
+    @staticmethod
+    def _merge_into_file(path: str, models: dict, days: dict) -> tuple[dict, dict]:
+        """
+        Add totals to those in the usage file and write it back, holding its file lock.
+
+        Returns:
+            The file's new model and daily totals.
+
+        Raises:
+            OSError: If the file cannot be written.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            ensure_private_dir(directory)
+        with file_lock(f"{path}.lock"):
+            file_models, file_days = UsageLedger._read(path)
+            _merge_totals(file_models, file_days, models, days)
+            for day in sorted(file_days)[: -UsageLedger.MAX_DAYS]:
+                del file_days[day]
+            data = {"version": USAGE_FILE_VERSION, "models": file_models, "days": file_days}
+            write_private_file(path, json.dumps(data).encode("utf-8"))
+        return file_models, file_days
+
+    @staticmethod
+    def flush() -> None:
+        """Add the totals recorded since the last flush to the usage file, picking up other workers' totals."""
+        with UsageLedger._flush_lock:
+            with UsageLedger._lock:
+                path = UsageLedger._path
+                models, days = UsageLedger._pending_models, UsageLedger._pending_days
+                UsageLedger._pending_models, UsageLedger._pending_days = {}, {}
+                UsageLedger._last_flush = time.monotonic()
+            if path is None or not models:
+                return
+            try:
+                file_models, file_days = UsageLedger._merge_into_file(path, models, days)
+            except OSError as e:
+                SwarmLogger.log_error("UsagePersistError", str(e))
+                with UsageLedger._lock:
+                    if UsageLedger._path == path:
+                        # Keep the totals for the next flush
+                        _merge_totals(UsageLedger._pending_models, UsageLedger._pending_days, models, days)
+                return
+            with UsageLedger._lock:
+                if UsageLedger._path == path:
+                    # Requests recorded while the file was written are not in it yet
+                    _merge_totals(file_models, file_days, UsageLedger._pending_models, UsageLedger._pending_days)
+                    UsageLedger._models, UsageLedger._days = file_models, file_days
+
+    @staticmethod
+    def record(
+        model: str,
+        usage: TokenUsage,
+        session_id: Optional[str] = None,
+        elapsed_s: Optional[float] = None,
+    ) -> float:
+        """
+        Add a request's usage to the model, daily and session totals.
+
+        Args:
+            model: The model that served the request.
+            usage: Tokens used by the request.
+            session_id: Session to charge, if known.
+            elapsed_s: Request duration, used for the throughput metric.
+
+        Returns:
+            The request's cost in USD.
+        """
+        cost = usage.cost_usd(model)
+        today = UsageLedger._today()
+        with UsageLedger._lock:
+            UsageLedger._ensure_loaded()
+            _add_usage(UsageLedger._models, UsageLedger._days, today, model, usage, cost)
+            _add_usage(UsageLedger._pending_models, UsageLedger._pending_days, today, model, usage, cost)
+            if session_id:
+                session = UsageLedger._sessions.pop(session_id, None) or _empty_totals()
+                _add_totals(session, usage, cost)
+                UsageLedger._sessions[session_id] = session
+                while len(UsageLedger._sessions) > UsageLedger.MAX_SESSIONS:
+                    UsageLedger._sessions.popitem(last=False)
+            flush_due = time.monotonic() - UsageLedger._last_flush >= SwarmConfig.get_usage_flush_seconds()
+        if flush_due:
+            UsageLedger.flush()
+
+        labels = {"model": model}
+        SwarmMetrics.increment("usage.prompt_tokens", usage.prompt_tokens, labels=labels)
+        SwarmMetrics.increment("usage.completion_tokens", usage.completion_tokens, labels=labels)
+        SwarmMetrics.increment("usage.cost_usd", cost, labels=labels)
+        tokens_per_second = None
+        if elapsed_s and elapsed_s > 0:
+            tokens_per_second = usage.completion_tokens / elapsed_s
+            SwarmMetrics.observe("usage.completion_tokens_per_second", tokens_per_second, labels=labels)
+        SwarmLogger.log_usage(model, usage.prompt_tokens, usage.completion_tokens, usage.estimated, cost, tokens_per_second)
+        return cost
+
+    @staticmethod
+    def session_cost(session_id: Optional[str]) -> float:
+        """Total cost charged to a session in USD."""
+        with UsageLedger._lock:
+            UsageLedger._ensure_loaded()
+            session = UsageLedger._sessions.get(session_id) if session_id else None
+            return session["cost_usd"] if session else 0.0
+
+    @staticmethod
+    def day_cost() -> float:
+        """Total cost charged today (UTC) in USD."""
+        with UsageLedger._lock:
+            UsageLedger._ensure_loaded()
+            return UsageLedger._days.get(UsageLedger._today(), {}).get("cost_usd", 0.0)
+
+    @staticmethod
+    def check_budget(model: str, session_id: Optional[str] = None) -> tuple[bool, str, Optional[str]]:
+        """
+        Check the daily and session budgets before a request.
+
+        Args:
+            model: The requested model.
+            session_id: The requesting session, if known.
+
+        Returns:
+            Tuple of (allowed, model_to_use, message). When a budget is used up
+            and SWARM_BUDGET_ACTION is "downgrade", the request is allowed on
+            the downgrade model with an explanatory message; otherwise it is
+            rejected.
+        """
+        daily_budget = SwarmConfig.get_daily_budget_usd()
+        session_budget = SwarmConfig.get_session_budget_usd()
+        exceeded = None
+        if daily_budget > 0 and UsageLedger.day_cost() >= daily_budget:
+            exceeded = f"Daily budget of ${daily_budget:.2f} is used up"
+        elif session_budget > 0 and session_id and UsageLedger.session_cost(session_id) >= session_budget:
+            exceeded = f"Session budget of ${session_budget:.2f} is used up"
+        if exceeded is None:
+            return True, model, None
+
+        SwarmMetrics.increment("usage.budget_exceeded", labels={"action": SwarmConfig.get_budget_action()})
+        fallback = SwarmConfig.get_budget_downgrade_model()
+        if SwarmConfig.get_budget_action() == "downgrade" and fallback != model:
+            return True, fallback, f"{exceeded}; using {fallback} instead."
+        return False, model, f"{exceeded}. Please try again later."
+
+    @staticmethod
+    def summary() -> dict:
+        """Get model totals, today's totals and the number of tracked sessions."""
+        with UsageLedger._lock:
+            UsageLedger._ensure_loaded()
+            return {
+                "models": json.loads(json.dumps(UsageLedger._models)),
+                "today": json.loads(json.dumps(UsageLedger._days.get(UsageLedger._today(), {}))),
+                "sessions": len(UsageLedger._sessions),
+            }
+
+    @staticmethod
+    def reset() -> None:
+        """Forget all in-memory totals, including unflushed ones, so they are reloaded from disk (used by tests)."""
+        with UsageLedger._lock:
+            UsageLedger._path = None
+            UsageLedger._models, UsageLedger._days = {}, {}
+            UsageLedger._sessions = OrderedDict()
+            UsageLedger._pending_models, UsageLedger._pending_days = {}, {}
+            UsageLedger._last_flush = 0.0
+
+
+atexit.register(UsageLedger.flush)
@@ -29,6 +29,26 @@ def validate_task(task: Optional[str]) -> tuple[bool, Optional[str]]:
     return True, None
 
 
+def validate_document(document: Optional[str], max_chars: int) -> tuple[bool, Optional[str]]:
+    """
+    Validate a large document submitted for map-reduce analysis.
+    
+    Args:
+        document: The document text to validate.
+        max_chars: Maximum accepted document length.
+        
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    if not document or not document.strip():
+        return False, "Please provide a document to analyze."
+    
+    if len(document) > max_chars:
+        return False, f"Document is too long (maximum {max_chars:,} characters)."
+    
+    return True, None
+
+
 def validate_model(model: str, available_models: list[str]) -> tuple[bool, Optional[str]]:
     """
     Validate a model identifier.
@@ -49,6 +69,39 @@ def validate_model(model: str, available_models: list[str]) -> tuple[bool, Optio
     return True, None
 
 
+def validate_compare_models(
+    models: Optional[list[str]],
+    available_models: list[str],
+    max_models: int,
+) -> tuple[bool, Optional[str]]:
+    """
+    Validate the models selected for a side-by-side comparison.
+    
+    Args:
+        models: The selected model identifiers.
+        available_models: List of available model identifiers.
+        max_models: Maximum number of models compared at once.
+        
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    if not models or len(models) < 2:
+        return False, "Please select at least two models to compare."
+    
+    if len(models) > max_models:
+        return False, f"Too many models selected (maximum {max_models})."
+    
+    if len(set(models)) != len(models):
+        return False, "Each model can only be selected once."
+    
+    for model in models:
+        is_valid, error_msg = validate_model(model, available_models)
+        if not is_valid:
+            return False, error_msg
+    
+    return True, None
+
+
 def validate_temperature(temperature: float) -> tuple[bool, Optional[str]]:
     """
     Validate temperature parameter.